@@ -0,0 +1,223 @@
+"""JSON HTTP API over the extraction pipeline.
+
+    POST /v1/extract  {"text": ...} or {"url": ...}, optional "engine", "long_mode"
+                      -> {"keywords": [...], "note": ..., "seconds": ...}
+    POST /v1/explain  {"keywords": [...], "question": ...} -> {"text": ...}
+    POST /v1/compare  {"documents": [{"label", "keywords"}, ...]} or {"doc_ids": [...]} (corpus ids)
+                      -> similarity matrices, most similar pairs, shared and unique keywords
+    GET  /v1/corpus/docs?keyword=...&before=...   documents containing a keyword, newest first
+    GET  /v1/corpus/top?days=7&page=0             top keywords over recent days
+    GET  /v1/corpus/cooccur?keyword=...&page=0    keywords found alongside a keyword
+    GET  /healthz     GET /metrics
+
+Every /v1 route needs ``Authorization: Bearer $LEXIS_API_TOKEN`` when a token is
+set. The corpus routes and /v1/compare read documents other clients analyzed,
+so without a token they answer 403 instead of serving them to anyone.
+
+    python api.py            # LEXIS_API_PORT, default 8080
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from compare import MAX_DOCS, compare
+from corpus import PER_PAGE, get_corpus, record
+from fetcher import PageRejected
+from metrics import registry
+from pipeline import ENGINES, analyze, analyze_url, explain_keywords, publish_gauges
+
+API_PORT        = int(os.environ.get("LEXIS_API_PORT", "8080"))
+API_TOKEN       = os.environ.get("LEXIS_API_TOKEN")
+# requests past this many are turned away with 503 rather than queued
+API_CONCURRENCY = int(os.environ.get("LEXIS_API_CONCURRENCY", "32"))
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _valid_keywords(kws):
+    return isinstance(kws, list) and all(isinstance(k, dict) and "keyword" in k for k in kws)
+
+def handle_extract(body):
+    engine    = body.get("engine", "LLM only")
+    long_mode = bool(body.get("long_mode", False))
+    if engine not in ENGINES:
+        raise ApiError(400, f"engine must be one of {ENGINES}")
+    if body.get("url"):
+        url = str(body["url"])
+        if not url.startswith(("http://", "https://")):
+            raise ApiError(400, "url must start with http(s)://")
+        try:
+            kws, note = analyze_url(url, long_mode, engine)
+        except PageRejected as e:
+            raise ApiError(422, str(e))
+        record("url", url, kws, engine, "api")
+    elif str(body.get("text") or "").strip():
+        kws, note = analyze(str(body["text"]), long_mode, engine)
+        record("text", body["text"], kws, engine, "api")
+    else:
+        raise ApiError(400, "provide 'text' or 'url'")
+    return {"keywords": kws, "note": note}
+
+def handle_explain(body):
+    kws = body.get("keywords")
+    if not _valid_keywords(kws):
+        raise ApiError(400, "'keywords' must be a list of {\"keyword\",\"score\"} objects")
+    return {"text": explain_keywords(kws, body.get("question") or None).strip()}
+
+def handle_compare(body):
+    if body.get("doc_ids") is not None:
+        ids = body["doc_ids"]
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise ApiError(400, "'doc_ids' must be a list of integers")
+        found = get_corpus().documents(ids[:MAX_DOCS])
+        docs  = [{"label": str(i), "keywords": found[i]["keywords"]} for i in ids[:MAX_DOCS] if i in found]
+    else:
+        docs = body.get("documents")
+        if not isinstance(docs, list) or not all(isinstance(d, dict) and _valid_keywords(d.get("keywords"))
+                                                 for d in docs):
+            raise ApiError(400, "'documents' must be a list of {\"label\",\"keywords\"} objects")
+        docs = [{"label": str(d.get("label", i)), "keywords": d["keywords"]} for i, d in enumerate(docs[:MAX_DOCS])]
+    if len(docs) < 2:
+        raise ApiError(400, "compare needs at least two documents")
+    return compare(docs)
+
+ROUTES = {"/v1/extract": handle_extract, "/v1/explain": handle_explain, "/v1/compare": handle_compare}
+
+
+def _int_arg(args, name, default=None):
+    value = args.get(name, [None])[0]
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+
+def _keyword_arg(args):
+    keyword = (args.get("keyword", [""])[0]).strip()
+    if not keyword:
+        raise ApiError(400, "provide 'keyword'")
+    return keyword
+
+def handle_corpus_docs(args):
+    return get_corpus().documents_with(_keyword_arg(args), _int_arg(args, "before"),
+                                       _int_arg(args, "per_page", PER_PAGE))
+
+def handle_corpus_top(args):
+    return get_corpus().top_keywords(_int_arg(args, "days", 7), _int_arg(args, "page", 0),
+                                     _int_arg(args, "per_page", PER_PAGE))
+
+def handle_corpus_cooccur(args):
+    return get_corpus().cooccurring(_keyword_arg(args), _int_arg(args, "page", 0),
+                                    _int_arg(args, "per_page", PER_PAGE))
+
+GET_ROUTES = {"/v1/corpus/docs": handle_corpus_docs, "/v1/corpus/top": handle_corpus_top,
+              "/v1/corpus/cooccur": handle_corpus_cooccur}
+# routes that expose the shared corpus; closed unless a token is configured
+CORPUS_ROUTES = {"/v1/compare", *GET_ROUTES}
+
+
+def authorize(route, header):
+    """Raise ApiError unless the Authorization ``header`` may use ``route``"""
+    if not API_TOKEN:
+        if route in CORPUS_ROUTES:
+            raise ApiError(403, "corpus routes are disabled; set LEXIS_API_TOKEN to enable them")
+        return
+    if header != f"Bearer {API_TOKEN}":
+        raise ApiError(401, "missing or invalid bearer token")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    slots = threading.BoundedSemaphore(API_CONCURRENCY)
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path  = parts.path
+        if path == "/healthz":
+            self._send(200, {"ok": True})
+        elif path == "/metrics":
+            publish_gauges()
+            self._send(200, registry.render().encode(), "text/plain; version=0.0.4")
+        elif path in GET_ROUTES:
+            t0 = time.perf_counter()
+            try:
+                authorize(path, self.headers.get("Authorization"))
+                status, result = 200, GET_ROUTES[path](parse_qs(parts.query))
+            except ApiError as e:
+                status, result = e.status, {"error": str(e)}
+            registry.observe("lexis_api_seconds", time.perf_counter() - t0, route=path, status=status)
+            self._send(status, result)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        route = self.path.split("?")[0]
+        t0    = time.perf_counter()
+        try:
+            handler = ROUTES.get(route)
+            if handler is None:
+                raise ApiError(404, "not found")
+            authorize(route, self.headers.get("Authorization"))
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                raise ApiError(413, "request body too large")
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise ApiError(400, "body is not valid JSON")
+            if not isinstance(body, dict):
+                raise ApiError(400, "body must be a JSON object")
+            if not self.slots.acquire(blocking=False):
+                raise ApiError(503, "server busy, retry later")
+            try:
+                result = handler(body)
+            finally:
+                self.slots.release()
+            result["seconds"] = round(time.perf_counter() - t0, 3)
+            status = 200
+        except ApiError as e:
+            status, result = e.status, {"error": str(e)}
+            # the body may be unread, so don't reuse the connection
+            self.close_connection = True
+        except Exception as e:
+            status, result = 502, {"error": f"{type(e).__name__}: {str(e)[:300]}"}
+        registry.observe("lexis_api_seconds", time.perf_counter() - t0,
+                         route=route if route in ROUTES else "other", status=status)
+        self._send(status, result)
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write("%s - %s\n" % (self.address_string(), fmt % args))
+
+
+def serve(port=API_PORT, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    print(f"LEXIS API listening on {host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else API_PORT)
@@ -1,12 +1,29 @@
 import streamlit as st
-from groq import Groq
+import streamlit.components.v1 as components
+import hashlib
+from html import escape
 import json
-import re
-import urllib.request
-from urllib.error import HTTPError, URLError
-import csv
-import io
 import os
+import re
+import time
+import uuid
+from functools import wraps
+from kwcache import get_cache
+from statestore import get_store
+from fetcher import PageRejected
+from jobs import get_runner, submit_batch, submit_crawl, submit_explanation, submit_extraction
+from sessmem import SESSION_TTL, get_memory
+from render import render_accuracy_summary, render_chat_msg, render_kw_cards
+from pipeline import ENGINES, get_llm, publish_gauges
+import metrics
+from metrics import registry
+from httpclient import get_client as get_http_client
+from assets import STATIC_URL, build_stylesheet
+from exporters import BATCH_FIELDS, FORMATS, KEYWORD_FIELDS, SITE_FIELDS, batch_rows, export, keyword_rows
+from batch import BATCH_RPM, BATCH_WORKERS, new_results_path, parse_upload, prune_results, remove_results
+from crawl import CRAWL_PAGES, MAX_PAGES
+from corpus import MAX_PER_PAGE, get_corpus
+from compare import MAX_DOCS, compare
 
 # ── PAGE CONFIG ─────────────────────────
 st.set_page_config(
@@ -15,6 +32,32 @@ st.set_page_config(
     layout="wide"
 )
 
+# ── RUN METRICS ────────────────────────
+# wall time and HTML bytes per script run, so full-page and fragment reruns can be compared
+RUN_T0 = time.perf_counter()
+st.session_state["_run_bytes"] = 0
+
+def html_block(markup):
+    """st.markdown for trusted HTML, counting the bytes sent to the browser"""
+    st.session_state["_run_bytes"] = st.session_state.get("_run_bytes", 0) + len(markup.encode())
+    st.markdown(markup, unsafe_allow_html=True)
+
+def run_scope(scope):
+    """Record duration and HTML bytes of each (fragment) run under ``scope``"""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            t0, b0 = time.perf_counter(), st.session_state.get("_run_bytes", 0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # st.rerun() raises, so record in finally
+                registry.observe("lexis_stage_seconds", time.perf_counter() - t0, stage=f"run_{scope}")
+                registry.observe("lexis_run_bytes", st.session_state.get("_run_bytes", 0) - b0,
+                                 buckets=metrics.BYTE_BUCKETS, scope=scope)
+        return inner
+    return wrap
+
 # ── LOAD API KEY ───────────────────────
 api_key = os.environ.get("GROQ_API_KEY")
 if not api_key:
@@ -27,479 +70,176 @@ if not api_key:
     st.error("⚠️ GROQ_API_KEY missing. Add it in Render → Environment Variables.")
     st.stop()
 
-client = Groq(api_key=api_key)
+llm = get_llm(api_key)
+
+@st.cache_resource
+def start_metrics_server():
+    return metrics.start_server()
+
+start_metrics_server()
 
 # ── STYLING ─────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700;800&family=DM+Sans:wght@300;400;500;600&family=DM+Mono:wght@400;500&display=swap');
-
-*, *::before, *::after { box-sizing: border-box; }
-
-/* ══════════════════════════════
-   BASE
-══════════════════════════════ */
-.stApp {
-    background: #f0f4f8 !important;
-    color: #1a2332 !important;
-    font-family: 'DM Sans', sans-serif !important;
-    font-size: 15px !important;
-}
-
-.stApp::before {
-    content: '';
-    position: fixed;
-    inset: 0;
-    background:
-        radial-gradient(ellipse 1000px 700px at 20% 0%,   rgba(186,230,255,0.55) 0%, transparent 60%),
-        radial-gradient(ellipse  800px 600px at 85% 10%,  rgba(199,210,254,0.45) 0%, transparent 60%),
-        radial-gradient(ellipse  700px 600px at 10% 90%,  rgba(167,243,208,0.30) 0%, transparent 60%),
-        radial-gradient(ellipse  900px 500px at 90% 95%,  rgba(196,181,253,0.25) 0%, transparent 60%);
-    pointer-events: none;
-    z-index: 0;
-}
-
-.block-container {
-    padding-top: 0 !important;
-    padding-bottom: 3rem !important;
-    max-width: 1260px !important;
-    position: relative;
-    z-index: 1;
-}
-
-#MainMenu, footer, header { visibility: hidden; }
-.stDeployButton { display: none; }
-
-::-webkit-scrollbar { width: 5px; }
-::-webkit-scrollbar-track { background: transparent; }
-::-webkit-scrollbar-thumb { background: #cbd5e1; border-radius: 10px; }
-
-/* ══════════════════════════════
-   NAV
-══════════════════════════════ */
-.lx-nav {
-    display: flex;
-    align-items: center;
-    justify-content: space-between;
-    padding: 1.1rem 0;
-    border-bottom: 1px solid rgba(0,0,0,0.06);
-    margin-bottom: 0;
-    background: rgba(255,255,255,0.7);
-    backdrop-filter: blur(12px);
-}
-.lx-logo-wrap { display: flex; align-items: center; gap: 0.5rem; }
-.lx-logo-icon {
-    width: 30px; height: 30px;
-    background: linear-gradient(135deg, #3b82f6, #06b6d4);
-    border-radius: 8px;
-    display: flex; align-items: center; justify-content: center;
-    font-size: 0.85rem;
-    box-shadow: 0 3px 10px rgba(59,130,246,0.3);
-}
-.lx-logo-text {
-    font-family: 'Plus Jakarta Sans', sans-serif;
-    font-size: 1.05rem;
-    font-weight: 700;
-    color: #1a2332;
-}
-.lx-nav-badge {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.65rem;
-    letter-spacing: 0.18em;
-    text-transform: uppercase;
-    color: #64748b;
-    border: 1px solid #e2e8f0;
-    background: rgba(255,255,255,0.8);
-    padding: 0.28rem 0.9rem;
-    border-radius: 100px;
-}
-.lx-status {
-    display: flex; align-items: center; gap: 0.4rem;
-    font-size: 0.78rem; font-weight: 500; color: #64748b;
-}
-.lx-status-dot {
-    width: 7px; height: 7px; background: #22c55e;
-    border-radius: 50%; box-shadow: 0 0 6px rgba(34,197,94,0.6);
-    animation: sDot 2.5s ease-in-out infinite;
-}
-@keyframes sDot { 0%,100%{opacity:1;} 50%{opacity:0.4;} }
-
-/* ══════════════════════════════
-   HERO
-══════════════════════════════ */
-.lx-hero { text-align: center; padding: 3rem 0 2.5rem; }
-.lx-hero-tag {
-    display: inline-flex; align-items: center; gap: 0.4rem;
-    background: rgba(255,255,255,0.85); border: 1px solid #e2e8f0;
-    border-radius: 100px; padding: 0.3rem 0.9rem;
-    font-size: 0.78rem; font-weight: 600; color: #475569;
-    margin-bottom: 1.3rem; box-shadow: 0 1px 4px rgba(0,0,0,0.06);
-}
-.lx-hero-tag::before {
-    content: ''; width: 6px; height: 6px;
-    background: linear-gradient(135deg, #3b82f6, #06b6d4);
-    border-radius: 50%; flex-shrink: 0;
-}
-.lx-h1 {
-    font-family: 'Plus Jakarta Sans', sans-serif;
-    font-size: clamp(2.4rem, 5vw, 3.8rem);
-    font-weight: 800; line-height: 1.12; letter-spacing: -1px;
-    color: #0f172a; margin-bottom: 0;
-}
-.lx-h1-accent {
-    font-family: 'Plus Jakarta Sans', sans-serif;
-    font-size: clamp(2.4rem, 5vw, 3.8rem);
-    font-weight: 800; line-height: 1.12; letter-spacing: -1px;
-    background: linear-gradient(90deg, #3b82f6, #06b6d4);
-    -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-    background-clip: text; display: block; margin-bottom: 1rem;
-}
-.lx-hero-sub {
-    font-size: 1rem; color: #64748b;
-    max-width: 420px; margin: 0 auto; line-height: 1.7;
-}
-
-/* ══════════════════════════════
-   MAIN CARD
-══════════════════════════════ */
-.lx-card {
-    background: rgba(255,255,255,0.82);
-    border: 1px solid rgba(255,255,255,0.9);
-    border-radius: 16px; padding: 1.5rem 1.5rem 1rem;
-    margin-bottom: 1rem;
-    box-shadow: 0 4px 24px rgba(0,0,0,0.06), 0 1px 4px rgba(0,0,0,0.04);
-    backdrop-filter: blur(12px);
-}
-
-/* ══════════════════════════════
-   TABS
-══════════════════════════════ */
-div[data-baseweb="tab-list"] {
-    background: #f1f5f9 !important; border-radius: 10px !important;
-    padding: 4px !important; border: 1px solid #e2e8f0 !important;
-    gap: 2px !important; margin-bottom: 1rem !important; width: fit-content !important;
-}
-div[data-baseweb="tab"] {
-    border-radius: 7px !important; color: #94a3b8 !important;
-    font-weight: 600 !important; font-family: 'DM Sans', sans-serif !important;
-    font-size: 0.9rem !important; padding: 0.42rem 1.1rem !important; transition: all 0.18s !important;
-}
-div[aria-selected="true"] {
-    background: linear-gradient(135deg, #3b82f6, #06b6d4) !important;
-    color: white !important; box-shadow: 0 2px 8px rgba(59,130,246,0.3) !important;
-}
-div[data-baseweb="tab-panel"] { background: transparent !important; padding: 0 !important; }
-
-/* ══════════════════════════════
-   INPUTS
-══════════════════════════════ */
-textarea, .stTextInput input {
-    background: #ffffff !important; border: 1.5px solid #e2e8f0 !important;
-    border-radius: 10px !important; color: #1a2332 !important;
-    font-family: 'DM Sans', sans-serif !important; font-size: 0.97rem !important;
-    padding: 0.85rem 1rem !important; line-height: 1.6 !important;
-    box-shadow: 0 1px 3px rgba(0,0,0,0.04) inset !important;
-    transition: border-color 0.2s, box-shadow 0.2s !important;
-}
-textarea:focus, .stTextInput input:focus {
-    border-color: #3b82f6 !important;
-    box-shadow: 0 0 0 3px rgba(59,130,246,0.1) !important; outline: none !important;
-}
-textarea::placeholder, .stTextInput input::placeholder { color: #94a3b8 !important; }
-
-/* ══════════════════════════════
-   PRIMARY BUTTON
-══════════════════════════════ */
-.stButton > button {
-    width: 100% !important;
-    background: linear-gradient(90deg, #3b82f6, #06b6d4) !important;
-    border: none !important; border-radius: 10px !important; color: #fff !important;
-    font-family: 'Plus Jakarta Sans', sans-serif !important; font-weight: 700 !important;
-    font-size: 1rem !important; padding: 0.8rem 1.5rem !important;
-    margin-top: 0.65rem !important; cursor: pointer !important; transition: all 0.2s !important;
-    box-shadow: 0 3px 12px rgba(59,130,246,0.28) !important;
-}
-.stButton > button:hover {
-    opacity: 0.92 !important; transform: translateY(-1px) !important;
-    box-shadow: 0 6px 20px rgba(59,130,246,0.38) !important;
-}
-.stButton > button:active { transform: translateY(0) !important; }
-
-/* ══════════════════════════════
-   DOWNLOAD BUTTONS
-══════════════════════════════ */
-.stDownloadButton > button {
-    background: #ffffff !important; border: 1.5px solid #e2e8f0 !important;
-    color: #475569 !important; font-family: 'DM Sans', sans-serif !important;
-    font-weight: 600 !important; border-radius: 8px !important;
-    padding: 0.45rem 0.9rem !important; font-size: 0.82rem !important;
-    box-shadow: 0 1px 4px rgba(0,0,0,0.05) !important; transition: all 0.18s !important;
-}
-.stDownloadButton > button:hover {
-    border-color: #3b82f6 !important; color: #3b82f6 !important; background: #eff6ff !important;
-}
-
-/* ══════════════════════════════
-   KEYWORD ROWS — with accuracy
-══════════════════════════════ */
-.kw-row {
-    display: flex; align-items: center; gap: 0.75rem;
-    padding: 0.62rem 0.9rem; border-radius: 9px; margin-bottom: 0.32rem;
-    background: #ffffff; border: 1px solid #f1f5f9;
-    transition: all 0.18s; cursor: default;
-    box-shadow: 0 1px 3px rgba(0,0,0,0.04);
-}
-.kw-row:hover {
-    border-color: #bfdbfe; background: #eff6ff;
-    transform: translateX(3px); box-shadow: 0 2px 8px rgba(59,130,246,0.1);
-}
-.kw-num { font-family:'DM Mono',monospace; font-size:0.68rem; color:#94a3b8; min-width:24px; }
-.kw-word { flex:1; font-size:0.95rem; font-weight:600; color:#1e293b; }
-.kw-bar-wrap { display:flex; align-items:center; gap:0.5rem; min-width:110px; }
-.kw-bar-bg { flex:1; height:4px; background:#e2e8f0; border-radius:100px; overflow:hidden; }
-.kw-bar-fill { height:100%; border-radius:100px; }
-.kw-sc { font-family:'DM Mono',monospace; font-size:0.72rem; min-width:28px; text-align:right; font-weight:500; }
-
-/* accuracy pill */
-.kw-acc {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.66rem;
-    font-weight: 600;
-    padding: 0.15rem 0.45rem;
-    border-radius: 4px;
-    min-width: 48px;
-    text-align: center;
-    white-space: nowrap;
-}
-.kw-acc.high  { background:#dcfce7; color:#15803d; border:1px solid #bbf7d0; }
-.kw-acc.mid   { background:#dbeafe; color:#1d4ed8; border:1px solid #bfdbfe; }
-.kw-acc.low   { background:#f1f5f9; color:#64748b; border:1px solid #e2e8f0; }
-
-/* rank bar colours */
-.r0 .kw-bar-fill{background:linear-gradient(90deg,#2563eb,#06b6d4);} .r0 .kw-sc{color:#2563eb;}
-.r1 .kw-bar-fill{background:linear-gradient(90deg,#3b82f6,#0ea5e9);} .r1 .kw-sc{color:#3b82f6;}
-.r2 .kw-bar-fill{background:linear-gradient(90deg,#0ea5e9,#06b6d4);} .r2 .kw-sc{color:#0ea5e9;}
-.r3 .kw-bar-fill{background:linear-gradient(90deg,#06b6d4,#22d3ee);} .r3 .kw-sc{color:#06b6d4;}
-.r4 .kw-bar-fill{background:linear-gradient(90deg,#22d3ee,#67e8f9);} .r4 .kw-sc{color:#0891b2;}
-.r5 .kw-bar-fill,.r6 .kw-bar-fill,.r7 .kw-bar-fill,
-.r8 .kw-bar-fill,.r9 .kw-bar-fill{background:#cbd5e1;}
-.r5 .kw-sc,.r6 .kw-sc,.r7 .kw-sc,.r8 .kw-sc,.r9 .kw-sc{color:#94a3b8;}
-
-/* ── accuracy summary bar ── */
-.acc-summary {
-    display: flex; align-items: center; gap: 1.2rem;
-    background: #f8fafc; border: 1px solid #e2e8f0;
-    border-radius: 10px; padding: 0.65rem 1rem;
-    margin-bottom: 0.85rem;
-}
-.acc-stat { text-align: center; }
-.acc-stat-val {
-    font-family: 'Plus Jakarta Sans', sans-serif;
-    font-size: 1.15rem; font-weight: 800; line-height: 1;
-    margin-bottom: 0.1rem;
-}
-.acc-stat-lbl {
-    font-family: 'DM Mono', monospace;
-    font-size: 0.58rem; letter-spacing: 0.1em;
-    text-transform: uppercase; color: #94a3b8;
-}
-.acc-divider { width: 1px; height: 30px; background: #e2e8f0; flex-shrink: 0; }
-
-/* ══════════════════════════════
-   CHAT
-══════════════════════════════ */
-.chat-from {
-    font-family: 'DM Mono', monospace; font-size: 0.62rem;
-    letter-spacing: 0.15em; text-transform: uppercase; color: #94a3b8; margin-bottom: 0.2rem;
-}
-.chat-from.you { text-align:right; color:#3b82f6; }
-.chat-msg {
-    padding: 0.75rem 1rem; border-radius: 12px;
-    font-size: 0.93rem; line-height: 1.65; max-width: 85%; margin-bottom: 0.55rem;
-}
-.chat-msg.you {
-    background: linear-gradient(135deg, #2563eb, #0891b2); color:#fff;
-    margin-left:auto; border-bottom-right-radius:3px;
-    box-shadow: 0 3px 10px rgba(37,99,235,0.2);
-}
-.chat-msg.ai {
-    background:#ffffff; border:1px solid #e2e8f0; color:#334155;
-    border-bottom-left-radius:3px; box-shadow:0 1px 4px rgba(0,0,0,0.05);
-}
-
-div[data-testid="stForm"] {
-    background:transparent !important; border:none !important;
-    box-shadow:none !important; padding:0 !important;
-}
-div[data-testid="stForm"] .stButton > button {
-    background:#f1f5f9 !important; border:1.5px solid #e2e8f0 !important;
-    color:#475569 !important; box-shadow:none !important; margin-top:0 !important;
-    font-size:1rem !important; padding:0.72rem 1rem !important;
-    border-radius:9px !important; font-family:'DM Sans',sans-serif !important;
-}
-div[data-testid="stForm"] .stButton > button:hover {
-    background:#eff6ff !important; border-color:#3b82f6 !important;
-    color:#3b82f6 !important; transform:none !important; box-shadow:none !important;
-}
-
-/* ══════════════════════════════
-   SIDEBAR CARDS
-══════════════════════════════ */
-.sc {
-    background: rgba(255,255,255,0.85); border: 1px solid rgba(255,255,255,0.9);
-    border-radius: 14px; padding: 1.1rem 1.15rem; margin-bottom: 0.85rem;
-    box-shadow: 0 3px 16px rgba(0,0,0,0.06), 0 1px 3px rgba(0,0,0,0.04);
-    backdrop-filter: blur(10px);
-}
-.sc-ttl {
-    font-family: 'Plus Jakarta Sans', sans-serif; font-size: 0.75rem;
-    font-weight: 700; letter-spacing: 0.06em; text-transform: uppercase;
-    color: #475569; margin-bottom: 0.85rem; display:flex; align-items:center; gap:0.45rem;
-}
-.sc-ttl::after { content:''; flex:1; height:1px; background:#e2e8f0; }
-
-.sg { display:grid; grid-template-columns:1fr 1fr; gap:0.5rem; margin-bottom:0.6rem; }
-.si { background:#f8fafc; border:1px solid #e2e8f0; border-radius:10px; padding:0.7rem 0.8rem; text-align:center; }
-.sv { font-family:'Plus Jakarta Sans',sans-serif; font-size:1.5rem; font-weight:800; line-height:1; margin-bottom:0.2rem; }
-.sl { font-size:0.6rem; font-weight:600; letter-spacing:0.1em; text-transform:uppercase; color:#94a3b8; }
-.tkb { background:#f8fafc; border:1px solid #e2e8f0; border-radius:10px; padding:0.7rem 0.9rem; }
-.tkl { font-size:0.6rem; font-weight:600; letter-spacing:0.1em; text-transform:uppercase; color:#94a3b8; margin-bottom:0.22rem; }
-.tkv { font-size:1.02rem; font-weight:700; color:#2563eb; }
-
-.lr { display:flex; align-items:center; gap:0.7rem; margin-bottom:0.5rem; font-size:0.85rem; color:#475569; font-family:'DM Sans',sans-serif; }
-.ld { width:8px; height:8px; border-radius:50%; flex-shrink:0; }
-
-.lx-sec-label {
-    font-family: 'Plus Jakarta Sans', sans-serif; font-size: 0.68rem;
-    font-weight: 700; letter-spacing: 0.1em; text-transform: uppercase;
-    color: #64748b; margin-bottom: 0.75rem; display:flex; align-items:center; gap:0.5rem;
-}
-.lx-sec-label::after { content:''; flex:1; height:1px; background:#e2e8f0; }
-
-.stAlert { background:#eff6ff !important; border:1px solid #bfdbfe !important; border-radius:10px !important; color:#1e40af !important; }
-.stSpinner > div { border-top-color: #3b82f6 !important; }
-div[data-testid="stHorizontalBlock"] > div[data-testid="column"] { background:transparent !important; }
-</style>
-""", unsafe_allow_html=True)
+# The stylesheet is a static, content-hashed file. A zero-height component
+# fetches it once per browser tab and pins it in <head>, so reruns only send
+# this small loader instead of the whole <style> block.
+STYLE_LOADER = """<script>
+(function () {
+  var doc = window.parent.document, id = "lexis-css-__DIGEST__";
+  if (doc.getElementById(id)) return;
+  fetch(new URL("__HREF__", doc.baseURI)).then(function (r) { return r.text(); }).then(function (css) {
+    doc.querySelectorAll("style[id^='lexis-css-']").forEach(function (el) { el.remove(); });
+    var el = doc.createElement("style");
+    el.id = id; el.textContent = css;
+    doc.head.appendChild(el);
+  });
+})();
+</script>"""
+
+@st.cache_resource
+def stylesheet():
+    return build_stylesheet()
+
+def load_styles():
+    """Inject the hashed stylesheet; inline <style> when static serving is off"""
+    name, css = stylesheet()
+    if not st.get_option("server.enableStaticServing"):
+        html_block(f"<style>{css}</style>")
+        return
+    digest = name.split(".")[1]
+    # Tornado serves ?v= requests with a far-future Cache-Control
+    loader = STYLE_LOADER.replace("__DIGEST__", digest).replace("__HREF__", f"{STATIC_URL}/{name}?v={digest}")
+    st.session_state["_run_bytes"] = st.session_state.get("_run_bytes", 0) + len(loader)
+    components.html(loader, height=0)
+
+load_styles()
 
 
 # ── HELPERS ──────────────────────────────────────────────────────────────────
-def score_to_accuracy(score):
-    """Convert 0-1 score to accuracy percentage with label"""
-    pct = round(score * 100, 1)
-    if score >= 0.75:
-        cls = "high"
-    elif score >= 0.45:
-        cls = "mid"
-    else:
-        cls = "low"
-    return pct, cls
-
-def render_kw_cards(kws):
-    html = ""
-    for i, k in enumerate(kws):
-        rc    = f"r{min(i,9)}"
-        score = float(k.get("score", 0))
-        pct   = int(score * 100)
-        acc_pct, acc_cls = score_to_accuracy(score)
-        html += f"""
-<div class="kw-row {rc}">
-  <span class="kw-num">#{i+1:02d}</span>
-  <span class="kw-word">{k['keyword']}</span>
-  <div class="kw-bar-wrap">
-    <div class="kw-bar-bg"><div class="kw-bar-fill" style="width:{pct}%"></div></div>
-    <span class="kw-sc">{score:.2f}</span>
-  </div>
-  <span class="kw-acc {acc_cls}">{acc_pct}%</span>
-</div>"""
-    return html
-
-def render_accuracy_summary(kws):
-    """Render accuracy metrics summary bar above results"""
-    scores   = [float(k.get("score", 0)) for k in kws]
-    avg_acc  = round(sum(scores) / len(scores) * 100, 1)
-    high_ct  = sum(1 for s in scores if s >= 0.75)
-    top_acc  = round(max(scores) * 100, 1)
-    # confidence formula: ratio of high-accuracy keywords
-    conf_pct = round((high_ct / len(scores)) * 100, 1)
-
-    return f"""
-<div class="acc-summary">
-  <div class="acc-stat">
-    <div class="acc-stat-val" style="color:#2563eb;">{top_acc}%</div>
-    <div class="acc-stat-lbl">Peak Accuracy</div>
-  </div>
-  <div class="acc-divider"></div>
-  <div class="acc-stat">
-    <div class="acc-stat-val" style="color:#0891b2;">{avg_acc}%</div>
-    <div class="acc-stat-lbl">Avg Accuracy</div>
-  </div>
-  <div class="acc-divider"></div>
-  <div class="acc-stat">
-    <div class="acc-stat-val" style="color:#16a34a;">{high_ct}/{len(scores)}</div>
-    <div class="acc-stat-lbl">High Confidence</div>
-  </div>
-  <div class="acc-divider"></div>
-  <div class="acc-stat">
-    <div class="acc-stat-val" style="color:#7c3aed;">{conf_pct}%</div>
-    <div class="acc-stat-lbl">Confidence Rate</div>
-  </div>
-</div>"""
-
-def kws_to_csv(kws):
-    buf = io.StringIO()
-    w   = csv.DictWriter(buf, fieldnames=["rank","keyword","score","accuracy_%"])
-    w.writeheader()
-    for i, k in enumerate(kws, 1):
-        sc  = float(k.get("score","0"))
-        acc = round(sc * 100, 1)
-        w.writerow({"rank":i, "keyword":k["keyword"], "score":f"{sc:.4f}", "accuracy_%":f"{acc}%"})
-    return buf.getvalue().encode()
-
-def kws_to_plain(kws):
-    return "\n".join(
-        f"{i+1}. {k['keyword']}  score={float(k.get('score',0)):.4f}  accuracy={round(float(k.get('score',0))*100,1)}%"
-        for i, k in enumerate(kws)
-    )
-
-def extract_keywords(text):
-    prompt = f"""Extract top 10 important keywords from the following text.
-Return ONLY a JSON array. No explanation. No markdown. Example:
-[{{"keyword":"example","score":0.95}}]
-
-TEXT:
-{text[:6000]}"""
-    r = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role":"user","content":prompt}],
-        temperature=0.2, max_tokens=800
-    )
-    cleaned = re.sub(r'```json|```','', r.choices[0].message.content.strip())
-    return json.loads(cleaned)
-
-def explain_keywords(kws, user_question=None):
-    kw_list = ", ".join(k["keyword"] for k in kws)
-    q = user_question or f"Explain why these keywords are significant and what themes they reveal: {kw_list}"
-    r = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role":"system","content":"You are LEXIS, an expert in text analysis and keyword intelligence. Be insightful, concise, and conversational."},
-            {"role":"user","content":f"The extracted keywords are: {kw_list}\n\n{q}"}
-        ],
-        temperature=0.6, max_tokens=600
-    )
-    return r.choices[0].message.content.strip()
+JOB_POLL_S  = 0.5
+CHAT_POLL_S = 0.1
+
+def start_extraction(kind, value, long_mode, engine):
+    """Hand extraction to the background runner; the job panel polls it until it finishes"""
+    get_runner().cancel(st.session_state.get("extract_job"))
+    st.session_state.extract_job = submit_extraction(kind, value, long_mode, engine).id
+
+def follow_reply(job):
+    """Mirror a running explanation job into a placeholder; returns the finished chat message or None"""
+    slot = st.empty()
+    while job.live:
+        slot.markdown(render_chat_msg({"role":"ai","text":job.partial or ""}, cursor=True),
+                      unsafe_allow_html=True)
+        time.sleep(CHAT_POLL_S)
+    slot.empty()
+    if job.status == "error":
+        st.error(f"Explanation failed: {job.exception}")
+    # the job may be shared with other sessions, so hand out a copy
+    return dict(job.result) if job.status == "done" else None
+
+def discard_export(key):
+    """Delete a prepared export once it has been downloaded (or replaced)"""
+    prepared = st.session_state.pop(key, None)
+    if prepared and os.path.exists(prepared[1]):
+        os.remove(prepared[1])
+
+def data_digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def export_controls(key, make_rows, fields, stem, formats, digest):
+    """Format picker and a Prepare button; the file is only written, and read back, on request.
+
+    ``make_rows(fmt)`` returns the rows to write. ``digest`` identifies the
+    data: a file prepared from other data (an earlier result, batch or
+    crawl) is discarded instead of offered.
+    """
+    if st.session_state.get(key) and st.session_state[key][2] != digest:
+        discard_export(key)
+    ec = st.columns([1.3,1.3,3])
+    with ec[0]:
+        fmt = st.selectbox("Format", formats, key=f"{key}_fmt", format_func=str.upper,
+                           label_visibility="collapsed")
+    with ec[1]:
+        if st.button("Prepare ⬇", key=f"{key}_prep"):
+            discard_export(key)
+            try:
+                st.session_state[key] = (fmt, export(make_rows(fmt), fmt, fields), digest)
+            except RuntimeError as e:
+                st.error(str(e))
+    prepared = st.session_state.get(key)
+    if prepared and prepared[0] == fmt and os.path.exists(prepared[1]):
+        with ec[2], open(prepared[1], "rb") as fh:
+            st.download_button(f"⬇ {stem}.{fmt}", data=fh, file_name=f"{stem}.{fmt}", mime=FORMATS[fmt][0],
+                               key=f"{key}_dl", on_click=discard_export, args=(key,))
+
+def page_cursor(key, scope):
+    """Current cursor of a paged listing; going back to the first page whenever ``scope`` changes"""
+    state = st.session_state.setdefault(key, {"scope": None, "stack": [None]})
+    if state["scope"] != scope:
+        state["scope"], state["stack"] = scope, [None]
+    return state["stack"][-1]
+
+def pager(key, next_cursor):
+    """Back/More buttons for a listing set up with page_cursor()"""
+    stack = st.session_state[key]["stack"]
+    pc = st.columns([1,1,4])
+    with pc[0]:
+        if st.button("← Back", key=f"{key}_back", disabled=len(stack) == 1):
+            stack.pop()
+            st.rerun(scope="fragment")
+    with pc[1]:
+        if st.button("More →", key=f"{key}_more", disabled=next_cursor is None):
+            stack.append(next_cursor)
+            st.rerun(scope="fragment")
+
+def fmt_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+
+ADMIN_TOKEN = os.environ.get("LEXIS_ADMIN_TOKEN")
+# History and Compare read the shared corpus (every session's sources and keywords),
+# so they are admin-only unless a single-user install opts in
+SHARED_HISTORY = os.environ.get("LEXIS_SHARED_HISTORY") == "1"
+
+def is_admin():
+    return bool(ADMIN_TOKEN) and st.query_params.get("admin") == ADMIN_TOKEN
 
 
 # ── SESSION STATE ─────────────────────────────────────────────────────────────
-if "kws"          not in st.session_state: st.session_state.kws = []
-if "chat_history" not in st.session_state: st.session_state.chat_history = []
+# results and chat live in the state store under ?sid=, so a reconnect that
+# lands on another replica picks up where it left off. The chat itself is held
+# by sessmem, which bounds it per session and spills idle sessions to disk.
+SID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+def load_session():
+    sid   = st.query_params.get("sid", "")
+    saved = get_store().get(f"session:{sid}") if SID_RE.match(sid) else None
+    if not SID_RE.match(sid):
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    st.session_state.sid = sid
+    st.session_state.kws = saved["kws"] if saved else []
+    # sessions saved before sessmem carry the whole transcript as chat_history
+    seed = (saved.get("chat") or {"recent": saved.get("chat_history", [])}) if saved else None
+    get_memory().get(sid, seed=seed)
+
+def chat_memory():
+    return get_memory().get(st.session_state.sid)
+
+def save_session():
+    """Write results and chat back to the store if they changed since the last save"""
+    state  = {"kws": st.session_state.kws, "chat": chat_memory().to_dict()}
+    digest = hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()
+    if digest != st.session_state.get("_saved"):
+        get_store().set(f"session:{st.session_state.sid}", state, ttl=SESSION_TTL)
+        st.session_state._saved = digest
+
+if "sid" not in st.session_state:
+    load_session()
 
 
 # ══════════════════════════════════════════════════════════
 # NAV
 # ══════════════════════════════════════════════════════════
-st.markdown("""
+html_block("""
 <div class="lx-nav">
   <div class="lx-logo-wrap">
     <div class="lx-logo-icon">⚡</div>
@@ -508,19 +248,331 @@ st.markdown("""
   <div class="lx-nav-badge">Keyword Intelligence Engine</div>
   <div class="lx-status"><div class="lx-status-dot"></div>AI Online</div>
 </div>
-""", unsafe_allow_html=True)
+""")
 
 # ══════════════════════════════════════════════════════════
 # HERO
 # ══════════════════════════════════════════════════════════
-st.markdown("""
+html_block("""
 <div class="lx-hero">
   <div class="lx-hero-tag">AI-Powered Analysis</div>
   <h1 class="lx-h1">Extract Keywords</h1>
   <span class="lx-h1-accent">with Intelligence</span>
   <p class="lx-hero-sub">Paste any text or URL — LEXIS AI extracts the most relevant keywords, scores them, and provides intelligent analysis.</p>
 </div>
-""", unsafe_allow_html=True)
+""")
+
+# ══════════════════════════════════════════════════════════
+# FRAGMENTS — each reruns on its own, so a chat turn only re-renders the chat
+# ══════════════════════════════════════════════════════════
+@st.cache_data(max_entries=256, show_spinner=False)
+def results_html(kws):
+    return render_accuracy_summary(kws), render_kw_cards(kws)
+
+@st.fragment
+@run_scope("results")
+def results_panel():
+
+    html_block('<div class="lx-card">')
+    html_block('<div class="lx-sec-label">Keyword Results</div>')
+
+    # ── ACCURACY SUMMARY BAR ──
+    with registry.span("render"):
+        summary_html, cards_html = results_html(st.session_state.kws)
+    html_block(summary_html)
+
+    # ── DOWNLOAD BUTTONS ──
+    kws = st.session_state.kws
+    export_controls("kw_export", lambda fmt: keyword_rows(kws, text=fmt in ("csv", "txt")), KEYWORD_FIELDS, "lexis_keywords",
+                    ["csv", "txt", "jsonl", "parquet"], data_digest(kws))
+
+    # ── COLUMN HEADERS ──
+    html_block("""
+<div class="kw-head">
+  <span class="h-num">#</span>
+  <span class="h-word">Keyword</span>
+  <span class="h-score">Score</span>
+  <span class="h-acc">Accuracy</span>
+</div>""")
+
+    html_block(cards_html)
+    html_block('</div>')
+
+@st.fragment
+@run_scope("chat")
+def chat_panel():
+    html_block('<div class="lx-card follow">')
+    html_block('<div class="lx-sec-label">Ask LEXIS AI</div>')
+
+    mem = chat_memory()
+    if mem.archived and st.toggle(f"Show {mem.archived} earlier messages", key="show_earlier"):
+        for msg in mem.earlier():
+            html_block(render_chat_msg(msg))
+    for msg in mem.recent:
+        html_block(render_chat_msg(msg))
+
+    runner = get_runner()
+    job    = runner.get(st.session_state.get("chat_job"))
+    if job is None and mem.empty:
+        job = submit_explanation(st.session_state.kws, memory=mem)
+        st.session_state.chat_job = job.id
+    if job is not None:
+        # clicking Stop reruns the fragment, which interrupts follow_reply
+        if st.button("■ Stop", key="btn_stop_chat"):
+            runner.cancel(job.id)
+            partial_text = (job.partial or "").strip()
+            reply = {"role":"ai","text":partial_text + " …" if partial_text else "Stopped."}
+        else:
+            reply = follow_reply(job)
+        st.session_state.chat_job = None
+        if reply is not None:
+            # the reply may have taken long enough for this session to be evicted and reloaded
+            chat_memory().append(reply)
+            html_block(render_chat_msg(reply))
+
+    with st.form("chat_form", clear_on_submit=True):
+        cc = st.columns([6,1])
+        with cc[0]:
+            user_q = st.text_input("", placeholder="Ask anything about these keywords…",
+                                   label_visibility="collapsed")
+        with cc[1]:
+            sent = st.form_submit_button("↑")
+
+    if sent and user_q.strip():
+        mem.append({"role":"user","text":user_q})
+        st.session_state.chat_job = submit_explanation(st.session_state.kws, user_q, mem).id
+        save_session()
+        st.rerun(scope="fragment")
+
+    html_block('</div>')
+    save_session()
+
+
+@st.fragment(run_every=JOB_POLL_S)
+@run_scope("job")
+def extract_job_panel():
+    runner = get_runner()
+    job    = runner.get(st.session_state.get("extract_job"))
+    if job is not None and job.live:
+        pc = st.columns([5,1])
+        with pc[0]:
+            st.progress(job.progress, text=f"{job.stage.capitalize()}…")
+        with pc[1]:
+            if st.button("✕ Cancel", key="btn_cancel"):
+                runner.cancel(job.id)
+                st.session_state.extract_job = None
+                st.rerun()
+        if job.partial:
+            html_block(render_kw_cards(job.partial))
+        return
+    # finished (or expired): hand the outcome to a full rerun, which redraws results and chat
+    st.session_state.extract_job = None
+    if job is not None and job.status == "done":
+        kws, st.session_state.extract_note = job.result
+        st.session_state.kws      = list(kws)
+        st.session_state.chat_job = None
+        chat_memory().clear()
+    elif job is not None and job.status == "error":
+        st.session_state.kws=[]; chat_memory().clear()
+        e = job.exception
+        st.session_state.extract_error = str(e) if isinstance(e, PageRejected) else f"Extraction failed: {e}"
+    st.rerun()
+
+
+@st.fragment(run_every=JOB_POLL_S)
+@run_scope("crawl")
+def crawl_job_panel(max_pages):
+    runner = get_runner()
+    job    = runner.get(st.session_state.get("crawl_job"))
+    if job is not None and job.live:
+        results = list(job.partial or [])
+        pc = st.columns([5,1])
+        with pc[0]:
+            st.progress(min(1.0, len(results) / max_pages),
+                        text=f"{len(results)} / {max_pages} pages · "
+                             f"{sum(r['status'] == 'ok' for r in results)} analyzed")
+        with pc[1]:
+            if st.button("✕ Stop", key="btn_crawl_stop"):
+                runner.cancel(job.id)
+                st.session_state.crawl_job = None
+                st.rerun()
+        st.dataframe([{"url":r["url"], "status":r["status"], "error":r["error"], "s":r["seconds"]}
+                      for r in results[-200:]], use_container_width=True, hide_index=True)
+        return
+    st.session_state.crawl_job = None
+    if job is not None and job.status == "done":
+        ranking = job.result
+        st.session_state.crawl_rows = ranking
+        if ranking:
+            # site scores are means over pages, so rescale to the top keyword for the cards
+            top = ranking[0]["score"] or 1
+            st.session_state.kws = [{"keyword":r["keyword"], "score":round(r["score"] / top, 4)}
+                                    for r in ranking[:10]]
+            st.session_state.chat_job = None
+            chat_memory().clear()
+        else:
+            st.session_state.crawl_error = "No pages could be analyzed."
+    elif job is not None and job.status == "error":
+        st.session_state.crawl_error = f"Crawl failed: {job.exception}"
+    st.rerun()
+
+
+@st.fragment(run_every=JOB_POLL_S)
+@run_scope("batch")
+def batch_job_panel(total):
+    runner = get_runner()
+    job    = runner.get(st.session_state.get("batch_job"))
+    if job is not None and job.live:
+        results = list(job.partial or [])
+        failed  = sum(r["status"] != "ok" for r in results)
+        pc = st.columns([5,1])
+        with pc[0]:
+            st.progress(min(1.0, len(results) / total), text=f"{len(results)} / {total} rows · {failed} failed")
+        with pc[1]:
+            # the panel keeps polling until the rows in flight are written, then offers the export
+            if st.button("✕ Stop", key="btn_batch_stop", disabled=job.token.is_set()):
+                runner.cancel(job.id)
+        st.dataframe([{"id":r["id"], "status":r["status"],
+                       "top keyword":r["keywords"][0]["keyword"] if r["keywords"] else "",
+                       "error":r["error"], "s":r["seconds"]} for r in results[-200:]],
+                     use_container_width=True, hide_index=True)
+        return
+    # finished, stopped or expired: a full rerun shows the export of whatever rows were written
+    st.session_state.batch_job = None
+    if job is not None and job.status == "error":
+        st.session_state.batch_error = f"Batch failed: {job.exception}"
+    st.rerun()
+
+
+HISTORY_WINDOWS = {"Today": 1, "7 days": 7, "30 days": 30}
+
+@st.fragment
+@run_scope("history")
+def history_panel():
+    corpus = get_corpus()
+    query  = st.text_input("Keyword", placeholder="Search past analyses by keyword…",
+                           label_visibility="collapsed", key="hist_q").strip()
+    keyword, items = None, []
+    if query:
+        found = corpus.find_term(query)
+        if found is not None:
+            keyword = found[1]
+        else:
+            matches = corpus.search_terms(query)
+            if not matches:
+                st.caption("No analyzed document has a matching keyword.")
+            else:
+                docs    = {m["keyword"]: m["docs"] for m in matches}
+                keyword = st.selectbox("Matching keywords", list(docs), format_func=lambda k: f"{k}  ({docs[k]:,} docs)")
+
+    if keyword:
+        page = corpus.documents_with(keyword, page_cursor("hist_docs", keyword))
+        st.caption(f"**{page['keyword']}** appears in {page['total']:,} analyzed documents")
+        items = page["items"]
+        st.dataframe([{"when":fmt_time(d["created"]), "kind":d["kind"], "source":d["source"],
+                       "score":d["score"], "via":d["via"]} for d in items],
+                     use_container_width=True, hide_index=True)
+        pager("hist_docs", page["next"])
+        co = corpus.cooccurring(keyword, page_cursor("hist_co", keyword) or 0)
+        if co["items"]:
+            st.caption(f"Co-occurring keywords (latest {co['sampled']:,} documents)")
+            st.dataframe(co["items"], use_container_width=True, hide_index=True)
+            pager("hist_co", co["next"])
+    else:
+        page  = corpus.recent(page_cursor("hist_recent", None))
+        items = page["items"]
+        if items:
+            st.caption("Latest analyses")
+            st.dataframe([{"when":fmt_time(d["created"]), "kind":d["kind"], "source":d["source"],
+                           "keywords":", ".join(k["keyword"] for k in d["keywords"][:5]), "via":d["via"]}
+                          for d in items], use_container_width=True, hide_index=True)
+            pager("hist_recent", page["next"])
+
+    if items:
+        labels = {d["doc"]: f"{fmt_time(d['created'])} · {d['source'][:80]}" for d in items}
+        oc = st.columns([4,1])
+        with oc[0]:
+            doc = st.selectbox("Document", list(labels), format_func=labels.get, label_visibility="collapsed")
+        with oc[1]:
+            if st.button("Open", key="hist_open"):
+                st.session_state.kws = corpus.doc_keywords(doc)
+                st.session_state.chat_job = None
+                chat_memory().clear()
+                st.rerun()
+
+    window = st.radio("Trending", list(HISTORY_WINDOWS), index=1, horizontal=True, key="hist_window")
+    top = corpus.top_keywords(HISTORY_WINDOWS[window], page_cursor("hist_top", window) or 0)
+    if top["items"]:
+        st.dataframe(top["items"], use_container_width=True, hide_index=True)
+        pager("hist_top", top["next"])
+    else:
+        st.caption("Nothing analyzed in this window yet.")
+
+
+def compare_label(d):
+    # the id keeps labels unique, since they become matrix columns
+    return f"#{d['doc']} {d['source'][:40]}"
+
+def compare_candidates(keyword):
+    """Up to MAX_DOCS stored documents containing ``keyword``, newest first"""
+    corpus, docs, before = get_corpus(), [], None
+    while len(docs) < MAX_DOCS:
+        page = corpus.documents_with(keyword, before, MAX_PER_PAGE)
+        docs += page["items"]
+        before = page["next"]
+        if before is None:
+            break
+    return docs[:MAX_DOCS]
+
+@st.fragment
+@run_scope("compare")
+def compare_panel():
+    corpus = get_corpus()
+    recent = corpus.recent(per_page=MAX_PER_PAGE)["items"]
+    labels = {d["doc"]: f"{fmt_time(d['created'])} · {d['source'][:80]}" for d in recent}
+    picked = st.multiselect("Documents", list(labels), format_func=labels.get,
+                            placeholder="Pick analyzed documents to compare…", label_visibility="collapsed")
+    by_kw  = st.text_input("…or every document containing a keyword", key="cmp_kw").strip()
+    with_current = st.checkbox("Include the current result", value=bool(st.session_state.kws),
+                               disabled=not st.session_state.kws)
+    if st.button("⚖  Compare", key="btn_compare"):
+        ids = list(picked)
+        if by_kw:
+            ids += [d["doc"] for d in compare_candidates(by_kw)]
+        ids   = list(dict.fromkeys(ids))
+        found = corpus.documents(ids)
+        docs  = [{"label": compare_label(found[i]), "keywords": found[i]["keywords"]} for i in ids
+                 if i in found and found[i]["keywords"]]
+        if with_current and st.session_state.kws:
+            docs.insert(0, {"label": "current result", "keywords": st.session_state.kws})
+        if len(docs) < 2:
+            st.warning("Pick at least two documents with keywords.")
+            st.session_state.pop("comparison", None)
+        else:
+            with registry.span("compare"):
+                st.session_state.comparison = compare(docs[:MAX_DOCS])
+
+    res = st.session_state.get("comparison")
+    if not res:
+        return
+    names = [res["labels"][i] for i in res["order"]]
+    st.caption(f"{len(names)} documents · {res['keywords']:,} distinct keywords · clustered order")
+    metric = st.radio("Similarity", ["cosine", "jaccard"], horizontal=True, key="cmp_metric",
+                      help="Cosine weighs keyword scores; Jaccard only counts shared keywords.")
+    st.dataframe([{"document": name, **dict(zip(names, row))} for name, row in zip(names, res[metric])],
+                 use_container_width=True, hide_index=True)
+    if res["pairs"]:
+        st.caption("Most similar pairs")
+        st.dataframe(res["pairs"], use_container_width=True, hide_index=True)
+    if res["shared"]:
+        html_block('<div class="lx-sec-label">Shared Keywords</div>')
+        html_block(render_kw_cards(res["shared"]))
+    doc = st.selectbox("Unique keywords of", res["order"], format_func=lambda i: res["labels"][i], key="cmp_doc")
+    if res["unique"][doc]:
+        html_block(render_kw_cards(res["unique"][doc]))
+    else:
+        st.caption("Every keyword of this document also appears in another one.")
+
 
 # ══════════════════════════════════════════════════════════
 # LAYOUT
@@ -534,9 +586,19 @@ left, right = st.columns([2.3, 1.1], gap="large")
 with left:
 
     # ── INPUT CARD ──
-    st.markdown('<div class="lx-card">', unsafe_allow_html=True)
-
-    tab_text, tab_url = st.tabs(["📄  Text Input", "🔍  URL Input"])
+    html_block('<div class="lx-card">')
+
+    show_corpus = SHARED_HISTORY or is_admin()
+    tabs = st.tabs(["📄  Text Input", "🔍  URL Input", "🕸  Site Crawl", "📦  Batch"]
+                   + (["🗂  History", "⚖  Compare"] if show_corpus else []))
+    tab_text, tab_url, tab_crawl, tab_batch = tabs[:4]
+    oc = st.columns([3,2])
+    with oc[0]:
+        engine = st.radio("Engine", ENGINES, horizontal=True, label_visibility="collapsed",
+                          help="Local only: instant, no API call. Hybrid: LLM re-ranks local candidates. LLM only: full LLM extraction.")
+    with oc[1]:
+        long_mode = st.toggle("Full-document mode", value=False,
+                              help="Analyze the whole document instead of its most salient sentences (about 6000 characters).")
 
     with tab_text:
         text_input = st.text_area(
@@ -546,12 +608,7 @@ with left:
         )
         if st.button("⚡  Extract Keywords", key="btn_text"):
             if text_input.strip():
-                with st.spinner("Analyzing with AI…"):
-                    try:
-                        st.session_state.kws = extract_keywords(text_input)
-                        st.session_state.chat_history = []
-                    except Exception as e:
-                        st.error(f"Extraction failed: {e}")
+                start_extraction("text", text_input, long_mode, engine)
             else:
                 st.warning("Please paste some text first.")
 
@@ -562,211 +619,114 @@ with left:
         )
         if st.button("⚡  Fetch & Extract", key="btn_url"):
             if url_input.startswith("http"):
-                blocked_exts = ('.pdf','.jpg','.jpeg','.png','.gif','.webp','.svg','.bmp')
-                if url_input.lower().split('?')[0].endswith(blocked_exts):
-                    st.session_state.kws=[]; st.session_state.chat_history=[]
-                    st.error("🚫 PDF & image-only pages are not supported.")
-                else:
-                    try:
-                        req = urllib.request.Request(url_input, headers={'User-Agent':'Mozilla/5.0'})
-                        with st.spinner("Fetching page…"):
-                            with urllib.request.urlopen(req, timeout=15) as resp:
-                                ct = resp.headers.get('Content-Type','')
-                                if 'text/html' not in ct:
-                                    st.session_state.kws=[]; st.session_state.chat_history=[]
-                                    st.error(f"🚫 Unsupported content type ({ct.split(';')[0].strip()}).")
-                                    st.stop()
-                                html_content = resp.read().decode('utf-8', errors='ignore')
-                        plain = re.sub(r'<style[^>]*>.*?</style>',' ',html_content,flags=re.DOTALL)
-                        plain = re.sub(r'<script[^>]*>.*?</script>',' ',plain,flags=re.DOTALL)
-                        plain = re.sub(r'<[^>]+>',' ',plain)
-                        plain = re.sub(r'\s+',' ',plain).strip()
-                        pl    = plain.lower()
-                        if any(s in pl for s in ['sign in to continue','log in to continue','please sign in',
-                            'please log in','login required','you must be logged in','members only']):
-                            st.session_state.kws=[]; st.session_state.chat_history=[]
-                            st.error("🚫 This page requires login.")
-                        elif any(s in pl for s in ['subscribe to read','subscription required',
-                            'this article is for subscribers','unlock this article','paid subscribers only']):
-                            st.session_state.kws=[]; st.session_state.chat_history=[]
-                            st.error("🚫 This page is behind a paywall.")
-                        elif any(s in pl for s in ['captcha','are you a robot','verify you are human',
-                            'ddos protection','access denied','robot check']):
-                            st.session_state.kws=[]; st.session_state.chat_history=[]
-                            st.error("🚫 This site blocks automated access.")
-                        elif len(plain) < 200:
-                            st.session_state.kws=[]; st.session_state.chat_history=[]
-                            st.error("🚫 Not enough readable text found.")
-                        else:
-                            with st.spinner("Analyzing content…"):
-                                st.session_state.kws = extract_keywords(plain)
-                                st.session_state.chat_history = []
-                    except HTTPError as e:
-                        st.session_state.kws=[]; st.session_state.chat_history=[]
-                        if e.code in (401,403): st.error(f"🚫 Access Denied (HTTP {e.code}).")
-                        elif e.code == 402:     st.error("🚫 Paywalled content.")
-                        else:                   st.error(f"🚫 HTTP Error {e.code}.")
-                    except URLError:
-                        st.session_state.kws=[]; st.session_state.chat_history=[]
-                        st.error("🚫 Unable to reach this URL.")
-                    except Exception as e:
-                        st.session_state.kws=[]; st.session_state.chat_history=[]
-                        st.error(f"Unexpected error: {e}")
+                start_extraction("url", url_input, long_mode, engine)
             else:
                 st.warning("Enter a valid URL starting with http(s)://")
 
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    # ── RESULTS ──
-    if st.session_state.kws:
-
-        st.markdown('<div class="lx-card">', unsafe_allow_html=True)
-        st.markdown('<div class="lx-sec-label">Keyword Results</div>', unsafe_allow_html=True)
-
-        # ── ACCURACY SUMMARY BAR ──
-        st.markdown(render_accuracy_summary(st.session_state.kws), unsafe_allow_html=True)
-
-        # ── DOWNLOAD BUTTONS ──
-        col_dl1, col_dl2, col_sp = st.columns([1,1,4])
-        with col_dl1:
-            st.download_button("⬇ CSV", data=kws_to_csv(st.session_state.kws),
-                               file_name="lexis_keywords.csv", mime="text/csv")
-        with col_dl2:
-            st.download_button("⬇ TXT", data=kws_to_plain(st.session_state.kws).encode(),
-                               file_name="lexis_keywords.txt", mime="text/plain")
-
-        # ── COLUMN HEADERS ──
-        st.markdown("""
-<div style="display:flex;align-items:center;gap:0.75rem;padding:0.3rem 0.9rem;margin-bottom:0.2rem;">
-  <span style="min-width:24px;font-family:'DM Mono',monospace;font-size:0.6rem;color:#cbd5e1;text-transform:uppercase;letter-spacing:0.08em;">#</span>
-  <span style="flex:1;font-family:'DM Mono',monospace;font-size:0.6rem;color:#94a3b8;text-transform:uppercase;letter-spacing:0.08em;">Keyword</span>
-  <span style="min-width:110px;font-family:'DM Mono',monospace;font-size:0.6rem;color:#94a3b8;text-transform:uppercase;letter-spacing:0.08em;text-align:right;">Score</span>
-  <span style="min-width:48px;font-family:'DM Mono',monospace;font-size:0.6rem;color:#94a3b8;text-transform:uppercase;letter-spacing:0.08em;text-align:center;">Accuracy</span>
-</div>""", unsafe_allow_html=True)
-
-        st.markdown(render_kw_cards(st.session_state.kws), unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # ── CHAT ──
-        st.markdown('<div class="lx-card" style="margin-top:0.5rem;">', unsafe_allow_html=True)
-        st.markdown('<div class="lx-sec-label">Ask LEXIS AI</div>', unsafe_allow_html=True)
-
-        if not st.session_state.chat_history:
-            with st.spinner("LEXIS is analyzing your keywords…"):
-                initial = explain_keywords(st.session_state.kws)
-            st.session_state.chat_history.append({"role":"ai","text":initial})
-
-        for msg in st.session_state.chat_history:
-            if msg["role"] == "user":
-                st.markdown(f'<div class="chat-from you">You</div><div class="chat-msg you">{msg["text"]}</div>',
-                            unsafe_allow_html=True)
+    with tab_crawl:
+        seed_input = st.text_input("Seed", placeholder="https://docs.example.com/  or  …/sitemap.xml",
+                                   label_visibility="collapsed")
+        max_pages = st.number_input("Pages", 1, MAX_PAGES, CRAWL_PAGES,
+                                    help="Same-site pages to fetch, following links breadth-first.")
+        if st.button("⚡  Crawl Site", key="btn_crawl"):
+            if seed_input.startswith("http"):
+                get_runner().cancel(st.session_state.get("crawl_job"))
+                st.session_state.crawl_job   = submit_crawl(seed_input, int(max_pages), engine).id
+                st.session_state.crawl_pages = int(max_pages)
             else:
-                st.markdown(f'<div class="chat-from">LEXIS</div><div class="chat-msg ai">{msg["text"]}</div>',
-                            unsafe_allow_html=True)
-
-        with st.form("chat_form", clear_on_submit=True):
-            cc = st.columns([6,1])
-            with cc[0]:
-                user_q = st.text_input("", placeholder="Ask anything about these keywords…",
-                                       label_visibility="collapsed")
-            with cc[1]:
-                sent = st.form_submit_button("↑")
-
-        if sent and user_q.strip():
-            st.session_state.chat_history.append({"role":"user","text":user_q})
-            with st.spinner("Thinking…"):
-                reply = explain_keywords(st.session_state.kws, user_question=user_q)
-            st.session_state.chat_history.append({"role":"ai","text":reply})
-            st.rerun()
-
-        st.markdown('</div>', unsafe_allow_html=True)
+                st.warning("Enter a valid URL starting with http(s)://")
+        if st.session_state.get("crawl_job"):
+            crawl_job_panel(st.session_state.crawl_pages)
+        if st.session_state.get("crawl_error"):
+            st.warning(st.session_state.pop("crawl_error"))
+        if st.session_state.get("crawl_rows"):
+            crawl_rows = st.session_state.crawl_rows
+            st.dataframe(crawl_rows[:100], use_container_width=True, hide_index=True)
+            export_controls("crawl_export", lambda fmt: iter(crawl_rows), SITE_FIELDS, "lexis_site",
+                            ["csv", "jsonl", "parquet"], data_digest(crawl_rows))
+
+    with tab_batch:
+        upload = st.file_uploader("CSV (text / url columns) or JSONL", type=["csv","jsonl","ndjson"])
+        workers = st.number_input("Parallel rows", 1, 16, BATCH_WORKERS,
+                                  help=f"LLM requests from all batches share a limit of {BATCH_RPM}/min "
+                                       "(LEXIS_BATCH_RPM).")
+        if st.button("⚡  Run Batch", key="btn_batch"):
+            if upload is None:
+                st.warning("Upload a CSV or JSONL file first.")
+            else:
+                rows = parse_upload(upload.name, upload.getvalue())
+                if not rows:
+                    st.warning("No rows found in the upload.")
+                else:
+                    # a session keeps only its latest results; ones left by ended sessions age out
+                    get_runner().cancel(st.session_state.get("batch_job"))
+                    discard_export("batch_export")
+                    remove_results(st.session_state.pop("batch_path", None))
+                    prune_results()
+                    st.session_state.batch_path = new_results_path()
+                    st.session_state.batch_job  = submit_batch(rows, st.session_state.batch_path, int(workers)).id
+                    st.session_state.batch_rows = len(rows)
+        if st.session_state.get("batch_job"):
+            batch_job_panel(st.session_state.batch_rows)
+        if st.session_state.get("batch_error"):
+            st.warning(st.session_state.pop("batch_error"))
+        if (st.session_state.get("batch_path") and not st.session_state.get("batch_job")
+                and os.path.exists(st.session_state.batch_path)):
+            batch_path = st.session_state.batch_path
+            # every batch writes a new results file, so its path identifies the data
+            export_controls("batch_export", lambda fmt: batch_rows(batch_path), BATCH_FIELDS, "lexis_batch",
+                            ["jsonl", "csv", "parquet"], batch_path)
+
+    if show_corpus:
+        with tabs[4]:
+            history_panel()
+        with tabs[5]:
+            compare_panel()
+
+    if st.session_state.get("extract_job"):
+        extract_job_panel()
+    if st.session_state.get("extract_error"):
+        st.error(st.session_state.pop("extract_error"))
+    if st.session_state.get("extract_note"):
+        st.caption(st.session_state.pop("extract_note"))
+
+    html_block('</div>')
+
+    # ── RESULTS & CHAT ──
+    if st.session_state.kws:
+        results_panel()
+        chat_panel()
 
 
 # ══════════════════════════════════════════════════════════
 # RIGHT COLUMN  — How It Works FIRST, then stats, then legend
 # ══════════════════════════════════════════════════════════
-with right:
-
-    # ══ 1. HOW IT WORKS — ALWAYS ON TOP ══
-    st.markdown("""
-<div style="background:rgba(255,255,255,0.85);border:1px solid rgba(255,255,255,0.9);border-radius:14px;padding:1.1rem 1.15rem;margin-bottom:0.85rem;box-shadow:0 3px 16px rgba(0,0,0,0.06),0 1px 3px rgba(0,0,0,0.04);backdrop-filter:blur(10px);">
-
-  <div style="font-family:'Plus Jakarta Sans',sans-serif;font-size:0.75rem;font-weight:700;letter-spacing:0.06em;text-transform:uppercase;color:#475569;margin-bottom:0.9rem;display:flex;align-items:center;gap:0.45rem;">
-    How It Works
-    <span style="flex:1;height:1px;background:#e2e8f0;display:inline-block;"></span>
-  </div>
-
-  <!-- SUPPORTED -->
-  <div style="font-family:'Plus Jakarta Sans',sans-serif;font-size:0.68rem;font-weight:700;letter-spacing:0.1em;text-transform:uppercase;color:#16a34a;margin-bottom:0.45rem;">
-    ✓ &nbsp;Supported
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#dcfce7;border:1px solid #bbf7d0;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#16a34a;flex-shrink:0;">✓</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Public blogs &amp; articles</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#dcfce7;border:1px solid #bbf7d0;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#16a34a;flex-shrink:0;">✓</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Wikipedia pages</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#dcfce7;border:1px solid #bbf7d0;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#16a34a;flex-shrink:0;">✓</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Company &amp; docs sites</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #e2e8f0;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#dcfce7;border:1px solid #bbf7d0;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#16a34a;flex-shrink:0;">✓</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Pasted raw text</span>
-  </div>
-
-  <!-- NOT SUPPORTED -->
-  <div style="font-family:'Plus Jakarta Sans',sans-serif;font-size:0.68rem;font-weight:700;letter-spacing:0.1em;text-transform:uppercase;color:#dc2626;margin-top:0.8rem;margin-bottom:0.45rem;">
-    ✕ &nbsp;Not Supported
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#fee2e2;border:1px solid #fecaca;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#dc2626;flex-shrink:0;">✕</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Login-gated pages</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#fee2e2;border:1px solid #fecaca;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#dc2626;flex-shrink:0;">✕</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Paywalled content</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;border-bottom:1px solid #f8fafc;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#fee2e2;border:1px solid #fecaca;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#dc2626;flex-shrink:0;">✕</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">Bot-blocking / CAPTCHA</span>
-  </div>
-  <div style="display:flex;align-items:center;gap:0.5rem;padding:0.32rem 0;">
-    <span style="width:17px;height:17px;border-radius:4px;background:#fee2e2;border:1px solid #fecaca;display:inline-flex;align-items:center;justify-content:center;font-size:0.62rem;color:#dc2626;flex-shrink:0;">✕</span>
-    <span style="font-size:0.85rem;color:#475569;font-family:'DM Sans',sans-serif;">PDF / image-only pages</span>
-  </div>
-
-</div>
-""", unsafe_allow_html=True)
-
-    # ══ 2. QUICK STATS ══
-    scores   = [float(k.get("score",0)) for k in st.session_state.kws] if st.session_state.kws else [0.0]
-    avg      = sum(scores)/len(scores) if st.session_state.kws else 0.0
-    top_kw   = st.session_state.kws[0]["keyword"] if st.session_state.kws else "—"
-    sc_range = (max(scores)-min(scores)) if st.session_state.kws else 0.0
-    count    = len(st.session_state.kws)
-
-    st.markdown(f"""
+@st.cache_data(max_entries=256, show_spinner=False)
+def quick_stats_html(kws):
+    scores   = [float(k.get("score",0)) for k in kws] if kws else [0.0]
+    avg      = sum(scores)/len(scores) if kws else 0.0
+    top_kw   = escape(str(kws[0]["keyword"])) if kws else "—"
+    sc_range = (max(scores)-min(scores)) if kws else 0.0
+    count    = len(kws)
+    return f"""
 <div class="sc">
   <div class="sc-ttl">Quick Stats</div>
   <div class="sg">
     <div class="si">
       <div class="sl">Top Score</div>
-      <div class="sv" style="color:#2563eb;">{max(scores):.2f}</div>
+      <div class="sv c-blue">{max(scores):.2f}</div>
     </div>
     <div class="si">
       <div class="sl">Average</div>
-      <div class="sv" style="color:#0891b2;">{avg:.2f}</div>
+      <div class="sv c-cyan">{avg:.2f}</div>
     </div>
     <div class="si">
       <div class="sl">Count</div>
-      <div class="sv" style="color:#0369a1;">{count}</div>
+      <div class="sv c-sky">{count}</div>
     </div>
     <div class="si">
       <div class="sl">Range</div>
-      <div class="sv" style="color:#0e7490;">{sc_range:.2f}</div>
+      <div class="sv c-teal">{sc_range:.2f}</div>
     </div>
   </div>
   <div class="tkb">
@@ -774,16 +734,77 @@ with right:
     <div class="tkv">{top_kw}</div>
   </div>
 </div>
-""", unsafe_allow_html=True)
+"""
+
+@st.fragment
+@run_scope("sidebar")
+def sidebar_panel():
+
+    # ══ 1. HOW IT WORKS — ALWAYS ON TOP ══
+    html_block("""
+<div class="sc">
+  <div class="sc-ttl">How It Works</div>
+
+  <div class="hw-grp ok">✓ &nbsp;Supported</div>
+  <div class="hw-row"><span class="hw-ic ok">✓</span><span class="hw-txt">Public blogs &amp; articles</span></div>
+  <div class="hw-row"><span class="hw-ic ok">✓</span><span class="hw-txt">Wikipedia pages</span></div>
+  <div class="hw-row"><span class="hw-ic ok">✓</span><span class="hw-txt">Company &amp; docs sites</span></div>
+  <div class="hw-row end"><span class="hw-ic ok">✓</span><span class="hw-txt">Pasted raw text</span></div>
+
+  <div class="hw-grp no">✕ &nbsp;Not Supported</div>
+  <div class="hw-row"><span class="hw-ic no">✕</span><span class="hw-txt">Login-gated pages</span></div>
+  <div class="hw-row"><span class="hw-ic no">✕</span><span class="hw-txt">Paywalled content</span></div>
+  <div class="hw-row"><span class="hw-ic no">✕</span><span class="hw-txt">Bot-blocking / CAPTCHA</span></div>
+  <div class="hw-row last"><span class="hw-ic no">✕</span><span class="hw-txt">PDF / image-only pages</span></div>
+</div>
+""")
+
+    # ══ 2. QUICK STATS ══
+    html_block(quick_stats_html(st.session_state.kws))
 
     # ══ 3. SCORE LEGEND ══
-    st.markdown("""
+    html_block("""
 <div class="sc">
   <div class="sc-ttl">Score Legend</div>
-  <div class="lr"><div class="ld" style="background:linear-gradient(135deg,#2563eb,#06b6d4);"></div><span>0.90 – 1.00</span></div>
-  <div class="lr"><div class="ld" style="background:#3b82f6;"></div><span>0.70 – 0.89</span></div>
-  <div class="lr"><div class="ld" style="background:#0ea5e9;"></div><span>0.50 – 0.69</span></div>
-  <div class="lr"><div class="ld" style="background:#22d3ee;"></div><span>0.30 – 0.49</span></div>
-  <div class="lr" style="margin-bottom:0;"><div class="ld" style="background:#cbd5e1;"></div><span>0.00 – 0.29</span></div>
+  <div class="lr"><div class="ld g0"></div><span>0.90 – 1.00</span></div>
+  <div class="lr"><div class="ld g1"></div><span>0.70 – 0.89</span></div>
+  <div class="lr"><div class="ld g2"></div><span>0.50 – 0.69</span></div>
+  <div class="lr"><div class="ld g3"></div><span>0.30 – 0.49</span></div>
+  <div class="lr last"><div class="ld g4"></div><span>0.00 – 0.29</span></div>
 </div>
-""", unsafe_allow_html=True)
+""")
+
+    # ══ 4. DIAGNOSTICS (admin only) ══
+    if is_admin():
+        publish_gauges()
+        rows = "".join(
+            f'<div class="lr"><span class="diag-stage">{stage}</span>'
+            f'<span class="diag-val">n={n} · p50 ≤{p50:g}s · p95 ≤{p95:g}s</span></div>'
+            for stage, n, p50, p95, _ in registry.stage_summary())
+        html_block(f"""
+<div class="sc">
+  <div class="sc-ttl">Diagnostics</div>
+  {rows or '<div class="lr">No samples yet</div>'}
+</div>
+""")
+        with st.expander("Routing & cache"):
+            st.json({"cache": get_cache().snapshot(), "http": get_http_client().stats, "state": get_store().stats,
+                     "memory": get_memory().usage(), "corpus": get_corpus().snapshot(),
+                     "scheduler": llm.llm.stats, "router": llm.stats,
+                     "recent_routes": list(llm.decisions)[-10:]})
+        st.download_button("⬇ metrics.prom", data=registry.render(), file_name="metrics.prom",
+                           mime="text/plain")
+
+
+with right:
+    sidebar_panel()
+
+save_session()
+
+registry.observe("lexis_stage_seconds", time.perf_counter() - RUN_T0, stage="run_page")
+registry.observe("lexis_run_bytes", st.session_state.get("_run_bytes", 0),
+                 buckets=metrics.BYTE_BUCKETS, scope="page")
+
+if metrics.METRICS_FILE:
+    publish_gauges()
+    registry.write_file()
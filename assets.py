@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+import sys
+import urllib.request
+
+STATIC_DIR = os.environ.get("LEXIS_STATIC_DIR",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+# Streamlit's static route; relative so it also works under server.baseUrlPath
+STATIC_URL = os.environ.get("LEXIS_STATIC_URL", "app/static")
+CSS_SOURCE = "lexis.css"
+FONTS_DIR  = "fonts"
+FONTS_CSS  = "fonts/fonts.css"
+
+GOOGLE_FONTS_URL = ("https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700;800"
+                    "&family=DM+Sans:wght@300;400;500;600&family=DM+Mono:wght@400;500&display=swap")
+# Google Fonts only hands out woff2 to browsers it recognises
+FONT_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+_COMMENT   = re.compile(r"/\*.*?\*/", re.S)
+_FACE      = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*{[^}]*})")
+_FONT_URL  = re.compile(r"url\((https://[^)]+)\)")
+_FAMILY    = re.compile(r"font-family:\s*'([^']+)'")
+_HASHED    = re.compile(r"^lexis\.[0-9a-f]{12}\.css$")
+
+
+def minify_css(css):
+    """Drop comments and insignificant whitespace"""
+    css = _COMMENT.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+def build_stylesheet(static_dir=STATIC_DIR):
+    """Minify fonts.css + lexis.css into ``lexis.<hash>.css``; returns (file name, css).
+
+    The name changes with the content, so the file can be cached forever.
+    Older builds in ``static_dir`` are removed.
+    """
+    parts = []
+    for rel in (FONTS_CSS, CSS_SOURCE):
+        path = os.path.join(static_dir, rel)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                parts.append(fh.read())
+    css  = minify_css("\n".join(parts))
+    name = f"lexis.{hashlib.sha256(css.encode()).hexdigest()[:12]}.css"
+    path = os.path.join(static_dir, name)
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(css)
+        os.replace(tmp, path)
+    for old in os.listdir(static_dir):
+        if old != name and _HASHED.match(old):
+            try:
+                os.remove(os.path.join(static_dir, old))
+            except OSError:
+                pass
+    return name, css
+
+def _download(url, timeout=20):
+    req = urllib.request.Request(url, headers={"User-Agent": FONT_UA})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+def fetch_fonts(static_dir=STATIC_DIR, subsets=("latin",)):
+    """Download the Google Fonts woff2 files into static/fonts and write a
+    fonts.css that points at the local copies. Run at build time."""
+    sheet   = _download(GOOGLE_FONTS_URL).decode("utf-8")
+    out_dir = os.path.join(static_dir, FONTS_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    local, faces = {}, []
+    for subset, face in _FACE.findall(sheet):
+        if subset not in subsets:
+            continue
+        family = _FAMILY.search(face).group(1)
+        for url in _FONT_URL.findall(face):
+            # variable fonts serve every weight from one file
+            if url not in local:
+                slug = family.lower().replace(" ", "-")
+                local[url] = f"{slug}-{len([n for n in local.values() if n.startswith(slug)])}.woff2"
+                with open(os.path.join(out_dir, local[url]), "wb") as fh:
+                    fh.write(_download(url))
+            face = face.replace(url, f"{STATIC_URL}/{FONTS_DIR}/{local[url]}")
+        faces.append(face)
+    with open(os.path.join(static_dir, FONTS_CSS), "w", encoding="utf-8") as fh:
+        fh.write("\n".join(faces) + "\n")
+    return sorted(local.values())
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if cmd == "fonts":
+        for name in fetch_fonts():
+            print(name)
+    elif cmd == "build":
+        print(build_stylesheet()[0])
+    else:
+        sys.exit("usage: python assets.py [fonts|build]")
@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+
+from cancel import Cancelled
+from kwcache import CACHE_DIR
+
+# Groq free tier for llama-3.1-8b-instant is 30 requests/min; override per plan
+BATCH_RPM     = int(os.environ.get("LEXIS_BATCH_RPM", "30"))
+BATCH_WORKERS = int(os.environ.get("LEXIS_BATCH_WORKERS", "4"))
+MAX_ROWS      = int(os.environ.get("LEXIS_BATCH_MAX_ROWS", "5000"))
+# a results file goes when its session starts another batch, or after this long
+BATCH_DIR     = os.path.join(CACHE_DIR, "batches")
+BATCH_TTL_S   = int(os.environ.get("LEXIS_BATCH_TTL", str(24 * 3600)))
+
+
+# ── INPUT PARSING ────────────────────────────────────────────────────────────
+def _row_from_record(i, rec):
+    rec  = {str(k).strip().lower(): v for k, v in rec.items()}
+    url  = str(rec.get("url") or "").strip()
+    text = str(rec.get("text") or "").strip()
+    rid  = str(rec.get("id") or i)
+    if url:
+        return {"id": rid, "kind": "url", "input": url}
+    if text:
+        return {"id": rid, "kind": "text", "input": text}
+    return {"id": rid, "kind": "empty", "input": ""}
+
+def parse_jsonl_line(i, line):
+    """One JSONL record (object, or bare url/text string) as a row dict; None for blank lines"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return {"id": str(i), "kind": "invalid", "input": line[:200]}
+    if isinstance(rec, str):
+        rec = {"url": rec} if rec.startswith("http") else {"text": rec}
+    if not isinstance(rec, dict):
+        return {"id": str(i), "kind": "invalid", "input": line[:200]}
+    return _row_from_record(i, rec)
+
+def parse_upload(name, data):
+    """Parse a CSV (``text``/``url`` columns) or JSONL upload into row dicts"""
+    raw = data.decode("utf-8-sig", errors="ignore") if isinstance(data, bytes) else data
+    rows = []
+    if name.lower().endswith((".jsonl", ".ndjson")):
+        for i, line in enumerate(raw.splitlines(), 1):
+            row = parse_jsonl_line(i, line)
+            if row is not None:
+                rows.append(row)
+    else:
+        for i, rec in enumerate(csv.DictReader(io.StringIO(raw)), 1):
+            rows.append(_row_from_record(i, rec))
+    return rows[:MAX_ROWS]
+
+
+# ── RATE LIMITING ────────────────────────────────────────────────────────────
+class RateLimiter:
+    """Token bucket shared by all workers so batches stay under the Groq RPM quota"""
+
+    def __init__(self, per_minute=BATCH_RPM, burst=None):
+        self.rate     = per_minute / 60.0
+        self.capacity = burst or max(1, min(per_minute, 5))
+        self.tokens   = float(self.capacity)
+        self.updated  = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self, stop=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_s = (1 - self.tokens) / self.rate
+            if stop is not None and stop.is_set():
+                return False
+            time.sleep(min(wait_s, 0.5))
+
+    def gate(self, stop=None):
+        """Take a token before one LLM request; raises Cancelled instead once ``stop`` is set"""
+        if not self.acquire(stop):
+            raise Cancelled()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """Process-wide limiter at LEXIS_BATCH_RPM: concurrent batches share the quota rather than each spending it"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(BATCH_RPM)
+        return _limiter
+
+
+# ── RESULT SINK ──────────────────────────────────────────────────────────────
+def new_results_path():
+    """A fresh, empty results file in BATCH_DIR"""
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="lexis_batch_", suffix=".jsonl", dir=BATCH_DIR)
+    os.close(fd)
+    return path
+
+
+class ResultWriter:
+    """Appends finished rows to a JSONL temp file (in BATCH_DIR) as they complete"""
+
+    def __init__(self, path=None):
+        self.path  = path or new_results_path()
+        self._fh   = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, result):
+        with self._lock:
+            self._fh.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._fh.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+
+def remove_results(path):
+    """Delete a finished batch's results file, if there is one"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def prune_results(max_age=BATCH_TTL_S, directory=BATCH_DIR):
+    """Delete result files not written to for ``max_age`` seconds, e.g. of sessions that ended"""
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    removed = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# ── RUNNER ───────────────────────────────────────────────────────────────────
+def process_row(row, fetch_text, extract, limiter, stop=None):
+    """Run one row through fetch → clean → extract; never raises.
+
+    ``extract(text, gate=...)`` must call ``gate()`` before every LLM request
+    it sends, so a row costs as many limiter tokens as it makes requests
+    (none for cache hits or the local engine, several for long documents).
+    """
+    t0  = time.perf_counter()
+    out = {"id": row["id"], "kind": row["kind"], "input": row["input"][:300],
+           "status": "ok", "keywords": [], "error": ""}
+    try:
+        if row["kind"] == "invalid":
+            raise ValueError("row is not a valid JSON object")
+        if row["kind"] == "empty":
+            raise ValueError("row has no text or url")
+        text = fetch_text(row["input"]) if row["kind"] == "url" else row["input"]
+        out["keywords"] = extract(text, gate=partial(limiter.gate, stop))
+    except Cancelled:
+        out["status"] = "cancelled"
+    except Exception as e:
+        out["status"] = "error"
+        out["error"]  = str(e)[:300]
+    out["seconds"] = round(time.perf_counter() - t0, 3)
+    return out
+
+def run_batch(rows, fetch_text, extract, workers=BATCH_WORKERS, stop=None, limiter=None):
+    """Yield per-row results in completion order.
+
+    At most ``workers`` rows are in flight; LLM calls additionally go through
+    ``limiter`` (by default the process-wide one), so all batches together
+    respect the quota.
+    """
+    limiter = limiter or get_limiter()
+    pending = iter(rows)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lexis-batch") as pool:
+        inflight = set()
+        def _fill():
+            while len(inflight) < workers and not (stop is not None and stop.is_set()):
+                row = next(pending, None)
+                if row is None:
+                    return
+                inflight.add(pool.submit(process_row, row, fetch_text, extract, limiter, stop))
+        _fill()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                inflight.discard(fut)
+                yield fut.result()
+            _fill()
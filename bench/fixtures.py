@@ -0,0 +1,106 @@
+"""Local HTML fixture server for the URL flow.
+
+    /small     ~4 KB article
+    /huge      ~20 MB article; exercises the early-stop and byte caps
+    /paywall   subscriber wall
+    /captcha   bot check
+    /login     login wall
+
+``?n=17`` on /small or /huge adds a one-line "Report 17" paragraph ahead of the
+article, so every ``n`` is a different URL *and* different text: neither the
+URL-keyed nor the text-keyed caches can serve it.
+"""
+import random
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARAGRAPH = ("<p>Renewable energy systems combine solar photovoltaic panels, onshore wind turbines and "
+             "grid-scale battery storage. Utilities schedule dispatch with demand forecasting models, "
+             "while transmission operators balance frequency across interconnected regional grids. "
+             "Policy incentives, carbon pricing and falling hardware costs continue to shift investment "
+             "away from coal and gas generation.</p>\n")
+HEAD      = "<!doctype html><html><head><meta charset='utf-8'><title>{title}</title>" \
+            "<style>body{{font-family:serif}}</style><script>var x=1;</script></head><body>"
+TAIL      = "</body></html>"
+
+HUGE_BYTES = 20 * 1024 * 1024
+
+def _page(title, body):
+    return (HEAD.format(title=title) + body + TAIL).encode()
+
+def document(text, seed):
+    """``text`` with its words shuffled by ``seed``: same vocabulary and length, no shared 3-word runs to speak of"""
+    words = text.split()
+    random.Random(seed).shuffle(words)
+    return " ".join(words)
+
+def _marker(path):
+    n = parse_qs(urlsplit(path).query).get("n")
+    return f"<p>Report {n[0]}.</p>".encode() if n else b""
+
+PAGES = {
+    "/small":   _page("Grid notes", "<article><h1>Grid notes</h1>" + PARAGRAPH * 10 + "</article>"),
+    "/paywall": _page("Premium", "<h1>Premium analysis</h1><p>" + "Market outlook. " * 10 +
+                      "</p><p>Subscribe to read the full story.</p>" + PARAGRAPH * 2),
+    "/captcha": _page("Just a moment", "<h1>Are you a robot?</h1><p>Complete the CAPTCHA to continue.</p>" +
+                      PARAGRAPH * 2),
+    "/login":   _page("Sign in", "<h1>Members only</h1><p>Please sign in to continue reading.</p>" + PARAGRAPH * 2),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/huge":
+            return self._huge(_marker(self.path))
+        page = PAGES.get(path)
+        if page is None:
+            self.send_error(404)
+            return
+        if path == "/small":
+            page = page.replace(b"<article>", b"<article>" + _marker(self.path), 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def _huge(self, marker=b""):
+        head, para = HEAD.format(title="Archive").encode() + marker, PARAGRAPH.encode()
+        n = (HUGE_BYTES - len(head)) // len(para)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(head) + n * len(para) + len(TAIL)))
+        self.end_headers()
+        try:
+            self.wfile.write(head)
+            block = para * 64
+            for _ in range(n // 64):
+                self.wfile.write(block)
+            self.wfile.write(para * (n % 64) + TAIL.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            # the client stops reading once it has enough text
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port=0, host="127.0.0.1"):
+    """Serve in a daemon thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="fixtures").start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    _, url = start(8998)
+    print(f"fixtures at {url}: " + ", ".join(["/huge"] + sorted(PAGES)))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,190 @@
+"""Local stand-in for Groq's OpenAI-compatible chat-completions endpoint.
+
+Point the SDK at it with ``GROQ_BASE_URL=http://127.0.0.1:<port>``.
+
+    python -m bench.mock_groq --port 8999 --latency lognormal:0.35:0.5 --rate-429 0.05
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+_SKIP = frozenset("""about above after again against also because been before being below between
+both could does doing during each either from further have having here into itself just like more
+most much must only other over same should since some such than that their them then there these
+they this those through under until very what when where which while whom with within without would
+your text return json array example keyword score markdown explanation extract important following
+object form keywords candidates document opening lines pick best capture scored verbatim""".split())
+
+
+class Latency:
+    """Parses 'fixed:S', 'uniform:LO:HI' or 'lognormal:MEDIAN:SIGMA' (seconds)"""
+
+    def __init__(self, spec):
+        kind, *args = spec.split(":")
+        self.kind, self.args = kind, [float(a) for a in args]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"unknown latency distribution {spec!r}")
+
+    def sample(self, rng=random):
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        median, sigma = self.args
+        return rng.lognormvariate(math.log(median), sigma)
+
+    def __str__(self):
+        return ":".join([self.kind] + [f"{a:g}" for a in self.args])
+
+
+def _keywords(prompt, n=10):
+    """Deterministic keyword rows from the words in the prompt"""
+    body = prompt.split("TEXT:", 1)[-1].split("CANDIDATES:", 1)[-1]
+    seen = []
+    for w in _WORD.findall(body):
+        w = w.lower()
+        if w not in _SKIP and w not in seen:
+            seen.append(w)
+        if len(seen) == n:
+            break
+    return [{"keyword": w, "score": round(0.95 - i * 0.07, 2)} for i, w in enumerate(seen)]
+
+def reply_for(body):
+    """Extraction prompts get a JSON array (or object in JSON mode); anything else prose"""
+    prompt = body["messages"][-1]["content"]
+    if "JSON" not in prompt:
+        words = ", ".join(k["keyword"] for k in _keywords(prompt, 6))
+        return ("These keywords point to a document about " + words + ". " +
+                "Together they describe the main subject, its components and how they relate. " * 3).strip()
+    kws = _keywords(prompt)
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({"keywords": kws})
+    return json.dumps(kws)
+
+
+class MockGroq:
+    """Threaded mock server; ``stats`` counts requests, 429s and streams served"""
+
+    def __init__(self, latency="lognormal:0.3:0.4", rate_429=0.0, token_s=0.004, seed=None):
+        self.latency  = Latency(latency) if isinstance(latency, str) else latency
+        self.rate_429 = rate_429
+        self.token_s  = token_s
+        self.rng      = random.Random(seed)
+        self._lock    = threading.Lock()
+        self.stats    = {"requests": 0, "rate_limited": 0, "streams": 0}
+        self.server   = None
+
+    def _draw(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            limited = self.rng.random() < self.rate_429
+            if limited:
+                self.stats["rate_limited"] += 1
+            return limited, self.latency.sample(self.rng)
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _json(self, status, payload, headers=()):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self._json(404, {"error": {"message": "not found"}})
+                limited, delay = mock._draw()
+                if limited:
+                    return self._json(429, {"error": {"message": "Rate limit reached", "type": "tokens",
+                                                      "code": "rate_limit_exceeded"}},
+                                      [("retry-after", "0.2"), ("x-ratelimit-remaining-requests", "0"),
+                                       ("x-ratelimit-reset-requests", "200ms")])
+                content = reply_for(body)
+                usage   = {"prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4,
+                           "completion_tokens": len(content) // 4}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                rid, model = "chatcmpl-" + uuid.uuid4().hex[:12], body.get("model", "mock")
+                limits = [("x-ratelimit-remaining-requests", "14000"), ("x-ratelimit-reset-requests", "6s"),
+                          ("x-ratelimit-remaining-tokens", "500000"), ("x-ratelimit-reset-tokens", "1s")]
+                if not body.get("stream"):
+                    time.sleep(delay)
+                    return self._json(200, {
+                        "id": rid, "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": content}}],
+                        "usage": usage}, limits)
+                with mock._lock:
+                    mock.stats["streams"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for k, v in limits:
+                    self.send_header(k, v)
+                self.end_headers()
+                time.sleep(delay)      # time to first token
+                pieces = re.findall(r"\S+\s*", content)
+                for i, piece in enumerate(pieces):
+                    chunk = {"id": rid, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": piece},
+                                                          "finish_reason": None}]}
+                    self._event(json.dumps(chunk))
+                    if i:
+                        time.sleep(mock.token_s)
+                self._event(json.dumps({"id": rid, "object": "chat.completion.chunk", "created": int(time.time()),
+                                        "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                                        "x_groq": {"id": rid, "usage": usage}}))
+                self._event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _event(self, data):
+                payload = f"data: {data}\n\n".encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, port=0, host="127.0.0.1"):
+        """Serve in a daemon thread; returns the base URL for GROQ_BASE_URL"""
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="mock-groq").start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8999)
+    ap.add_argument("--latency", default="lognormal:0.3:0.4")
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--token-ms", type=float, default=4.0)
+    args = ap.parse_args()
+    mock = MockGroq(args.latency, args.rate_429, args.token_ms / 1000.0)
+    print(f"mock Groq at {mock.start(args.port)} ({mock.latency}, 429 rate {args.rate_429})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,165 @@
+"""Benchmark suite against the local mock Groq server and HTML fixtures.
+
+    python -m bench.run                                   # full suite
+    python -m bench.run --levels 1,8 --only text,micro
+    python -m bench.run --json bench.json                 # save a baseline
+    python -m bench.run --baseline bench.json             # exit 1 on regressions
+
+Load flows run ``sessions`` concurrent threads, each issuing ``--per-session``
+requests. Every request is a miss: text inputs are word shuffles of ``TEXT``,
+URLs carry ``?n=`` which the fixtures echo into the page, explain questions are
+numbered, the keyword cache starts empty, and near-duplicate reuse is switched
+off (threshold above 1) so the suite measures extraction, not index hits.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import fixtures
+from bench.mock_groq import MockGroq
+
+TEXT = ("Renewable energy systems combine solar photovoltaic panels, onshore wind turbines and grid-scale "
+        "battery storage. Utilities schedule dispatch with demand forecasting models, while transmission "
+        "operators balance frequency across interconnected regional grids. ") * 4
+KWS  = [{"keyword": f"keyword {i}", "score": round(0.95 - i * 0.07, 2)} for i in range(10)]
+FLOWS = ("text", "url", "explain", "micro")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    return data[min(len(data) - 1, int(round(pct / 100.0 * (len(data) - 1))))]
+
+def load(fn, sessions, per_session, first=0):
+    """Run ``fn(i)`` for ``i`` from ``first`` on, from ``sessions`` threads; latency percentiles in seconds and throughput"""
+    lat, errors, lock = [], [0], threading.Lock()
+    def session(s):
+        for j in range(per_session):
+            t0 = time.perf_counter()
+            try:
+                fn(first + s * per_session + j)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                lat.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    wall = time.perf_counter() - t0
+    return {"n": len(lat), "errors": errors[0], "p50": percentile(lat, 50), "p95": percentile(lat, 95),
+            "p99": percentile(lat, 99), "rps": len(lat) / wall if wall else 0.0}
+
+def micro(fn, number=200, repeat=5):
+    """Best-of-``repeat`` seconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def run(args):
+    mock     = MockGroq(args.latency, args.rate_429, seed=1)
+    fx, base = fixtures.start()
+    # the pipeline reads these at import / first use, so set them first
+    os.environ["GROQ_API_KEY"]    = "bench"
+    os.environ["GROQ_BASE_URL"]   = mock.start()
+    os.environ["LEXIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="lexis_bench_")
+    os.environ["LEXIS_NEARDUP_THRESHOLD"] = "1.01"
+    from fetcher import PageRejected, clean_html
+    from pipeline import analyze, analyze_url, explain_keywords
+    from exporters import KEYWORD_FIELDS, export, keyword_rows
+    from render import render_kw_cards
+
+    for path in ("/paywall", "/captcha", "/login"):
+        try:
+            analyze_url(base + path)
+            print(f"!! {path} was not rejected", file=sys.stderr)
+        except PageRejected:
+            pass
+
+    flows = {
+        "text":     lambda i: analyze(fixtures.document(TEXT, i), engine="LLM only"),
+        "url":      lambda i: analyze_url(f"{base}/small?n={i}"),
+        "url_huge": lambda i: analyze_url(f"{base}/huge?n={i}"),
+        "explain":  lambda i: explain_keywords(KWS, f"What connects these keywords? ({i})"),
+    }
+    results = {}
+    for name, fn in flows.items():
+        if name.split("_")[0] not in args.only:
+            continue
+        first = 0   # numbering carries across levels, so a later level never repeats an earlier input
+        for sessions in args.levels:
+            per = max(1, args.per_session // 4) if name == "url_huge" else args.per_session
+            results[f"{name}@{sessions}"] = r = load(fn, sessions, per, first)
+            first += sessions * per
+            print(f"{name:<9} sessions={sessions:<3} n={r['n']:<4} err={r['errors']:<3} "
+                  f"p50={r['p50']*1000:7.1f}ms p95={r['p95']*1000:7.1f}ms p99={r['p99']*1000:7.1f}ms "
+                  f"{r['rps']:7.1f} req/s", flush=True)
+
+    if "micro" in args.only:
+        small = fixtures.PAGES["/small"].decode()
+        large = (fixtures.HEAD.format(title="x") + fixtures.PARAGRAPH * 2500 + fixtures.TAIL)
+        benches = {
+            "render_kw_cards":  (lambda: render_kw_cards(KWS), 2000),
+            "kws_to_csv":       (lambda: os.remove(export(keyword_rows(KWS, text=True), "csv", KEYWORD_FIELDS)), 2000),
+            "clean_html_small": (lambda: clean_html(small), 200),
+            "clean_html_1mb":   (lambda: clean_html(large), 3),
+        }
+        for name, (fn, number) in benches.items():
+            results[f"micro:{name}"] = {"per_call": micro(fn, number)}
+            print(f"{name:<17} {results[f'micro:{name}']['per_call']*1e6:10.1f} µs/call", flush=True)
+
+    mock.stop()
+    fx.shutdown()
+    results["_config"] = {"latency": str(mock.latency), "rate_429": args.rate_429,
+                          "levels": args.levels, "per_session": args.per_session, "mock": mock.stats}
+    return results
+
+def regressions(current, baseline, tolerance):
+    """Keys whose p95 (load) or per-call time (micro) grew past ``tolerance``"""
+    out = []
+    for key, cur in current.items():
+        old = baseline.get(key)
+        if key.startswith("_") or not old:
+            continue
+        metric = "per_call" if "per_call" in cur else "p95"
+        if old.get(metric) and cur[metric] > old[metric] * (1 + tolerance):
+            out.append(f"{key} {metric}: {old[metric]*1000:.2f}ms → {cur[metric]*1000:.2f}ms")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LEXIS benchmark suite")
+    ap.add_argument("--levels", default="1,4,16,32", help="concurrent session counts")
+    ap.add_argument("--per-session", type=int, default=8, help="requests per session per level")
+    ap.add_argument("--only", default=",".join(FLOWS), help=f"subset of {','.join(FLOWS)}")
+    ap.add_argument("--latency", default="lognormal:0.25:0.4", help="fixed:S | uniform:LO:HI | lognormal:MEDIAN:SIGMA")
+    ap.add_argument("--rate-429", type=float, default=0.02, help="fraction of mock calls answered with 429")
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--baseline", help="compare against a previous --json file")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    args = ap.parse_args(argv)
+    args.levels = [int(x) for x in args.levels.split(",")]
+    args.only   = set(args.only.split(","))
+
+    results = run(args)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            bad = regressions(results, json.load(fh), args.tolerance)
+        for line in bad:
+            print("REGRESSION " + line, file=sys.stderr)
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
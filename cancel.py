@@ -0,0 +1,55 @@
+import threading
+
+
+class Cancelled(Exception):
+    """Raised inside work whose CancelToken was set"""
+
+
+class CancelToken:
+    """A settable flag plus callbacks that abort blocking I/O when it is set.
+
+    Callbacks registered with ``on_cancel`` run on the cancelling thread, so
+    they should only close sockets or streams, never block.
+    """
+
+    def __init__(self):
+        self._event     = threading.Event()
+        self._lock      = threading.Lock()
+        self._callbacks = []
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout=None):
+        """Sleep up to ``timeout`` seconds, waking early on cancellation; True if cancelled"""
+        return self._event.wait(timeout)
+
+    def set(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def on_cancel(self, fn):
+        """Run ``fn`` on cancellation (now, if already cancelled); returns an unregister function"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return lambda: self._remove(fn)
+        fn()
+        return lambda: None
+
+    def _remove(self, fn):
+        with self._lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
@@ -0,0 +1,93 @@
+"""Headless keyword extraction: JSONL rows on stdin, one JSON result per line on stdout.
+
+    cat docs.jsonl | python cli.py --workers 8 --rpm 300 > results.jsonl
+
+Input lines are the same as a batch upload: {"id","text"} / {"id","url"}
+objects or bare strings. Results are written in completion order as soon as
+each row finishes, while later input is still being read.
+"""
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from batch import BATCH_RPM, BATCH_WORKERS, RateLimiter, parse_jsonl_line, process_row
+from corpus import record_result
+from fetcher import READ_CHARS, fetch_page_text
+from longdoc import LONG_DOC_CHARS
+from pipeline import analyze
+from scheduler import BULK
+
+ENGINE_NAMES = {"llm": "LLM only", "hybrid": "Hybrid", "local": "Local only"}
+
+
+def read_rows(stream):
+    for i, line in enumerate(stream, 1):
+        row = parse_jsonl_line(i, line)
+        if row is not None:
+            yield row
+
+def run_stream(rows, fetch_text, extract, emit, workers=BATCH_WORKERS, rpm=BATCH_RPM, stop=None):
+    """Like batch.run_batch, but ``emit`` is called from the worker as each row
+    finishes, so a slow producer of ``rows`` never holds back finished output."""
+    limiter = RateLimiter(rpm)
+    slots   = threading.BoundedSemaphore(workers)
+    lock    = threading.Lock()
+    counts  = {"ok": 0, "error": 0, "cancelled": 0}
+
+    def _done(fut):
+        try:
+            res = fut.result()
+            with lock:
+                counts[res["status"]] = counts.get(res["status"], 0) + 1
+                emit(res)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lexis-cli") as pool:
+        try:
+            for row in rows:
+                slots.acquire()
+                if stop is not None and stop.is_set():
+                    slots.release()
+                    break
+                pool.submit(process_row, row, fetch_text, extract, limiter, stop).add_done_callback(_done)
+        except KeyboardInterrupt:
+            # let in-flight rows bail out at the rate limiter before their next LLM call
+            if stop is not None:
+                stop.set()
+            raise
+    return counts
+
+def _emit(res):
+    sys.stdout.write(json.dumps(res, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Extract keywords from JSONL on stdin")
+    ap.add_argument("--engine", choices=sorted(ENGINE_NAMES), default="llm")
+    ap.add_argument("--long", action="store_true", help="map-reduce over the whole document")
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS, help="rows in flight")
+    ap.add_argument("--rpm", type=int, default=BATCH_RPM, help="LLM requests per minute")
+    args = ap.parse_args(argv)
+
+    engine  = ENGINE_NAMES[args.engine]
+    fetch   = partial(fetch_page_text, max_chars=LONG_DOC_CHARS if args.long else READ_CHARS)
+    extract = lambda text, gate: analyze(text, args.long, engine, BULK, gate=gate)[0]
+    stop    = threading.Event()
+    def emit(res):
+        record_result(res, engine, "cli")
+        _emit(res)
+    try:
+        counts = run_stream(read_rows(sys.stdin), fetch, extract, emit,
+                            workers=max(1, args.workers), rpm=max(1, args.rpm), stop=stop)
+    except KeyboardInterrupt:
+        return 130
+    print(f"{counts['ok']} ok · {counts['error']} failed", file=sys.stderr)
+    return 1 if counts["error"] and not counts["ok"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
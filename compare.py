@@ -0,0 +1,150 @@
+"""Compare keyword results across documents.
+
+Each document's ``[{"keyword","score"}]`` list becomes one row of a
+document × keyword score matrix; similarities, shared and unique keywords
+and a clustered document order are all computed on that matrix with NumPy,
+so comparing a few hundred documents stays interactive.
+"""
+import numpy as np
+
+from kwcache import normalize_text
+
+MAX_DOCS = 500
+
+
+class Comparison:
+    """Score matrix of ``labels`` (documents) × ``keywords``, plus what is derived from it"""
+
+    def __init__(self, labels, keywords, scores):
+        self.labels   = labels
+        self.keywords = keywords
+        self.scores   = scores
+        self.present  = (scores > 0).astype(np.float32)
+        self.df       = self.present.sum(axis=0)
+
+    @classmethod
+    def build(cls, docs):
+        """From ``[{"label", "keywords": [{"keyword","score"}]}]``; keywords match after normalization"""
+        docs = docs[:MAX_DOCS]
+        index, names, rows, cols, vals = {}, [], [], [], []
+        for i, doc in enumerate(docs):
+            for k in doc["keywords"]:
+                key = normalize_text(str(k["keyword"]))
+                if not key:
+                    continue
+                j = index.get(key)
+                if j is None:
+                    j = index[key] = len(names)
+                    names.append(str(k["keyword"]).strip())
+                rows.append(i)
+                cols.append(j)
+                # keep a floor so a listed keyword scored 0 still counts as present
+                vals.append(max(float(k.get("score", 0)), 1e-6))
+        scores = np.zeros((len(docs), len(names)), dtype=np.float32)
+        # duplicates within a document keep their best score
+        np.maximum.at(scores, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)),
+                      np.array(vals, dtype=np.float32))
+        return cls([d["label"] for d in docs], names, scores)
+
+    def cosine(self):
+        """Pairwise cosine similarity of the documents' score vectors"""
+        norms = np.linalg.norm(self.scores, axis=1, keepdims=True)
+        unit  = np.divide(self.scores, norms, out=np.zeros_like(self.scores), where=norms > 0)
+        return np.clip(unit @ unit.T, 0.0, 1.0)
+
+    def jaccard(self):
+        """Pairwise Jaccard similarity of the documents' keyword sets"""
+        inter = self.present @ self.present.T
+        size  = self.present.sum(axis=1)
+        union = size[:, None] + size[None, :] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def shared(self, min_docs=2, top_k=None):
+        """Keywords in at least ``min_docs`` documents, most widespread first.
+
+        ``score`` is the mean over all documents (0 where absent), so it
+        rewards both coverage and prominence, like crawl.merge_keywords.
+        """
+        mean  = self.scores.mean(axis=0) if len(self.labels) else np.zeros(0, dtype=np.float32)
+        keep  = np.flatnonzero(self.df >= min_docs)
+        order = keep[np.lexsort((-mean[keep], -self.df[keep]))][:top_k]
+        return [{"keyword": self.keywords[j], "score": round(float(mean[j]), 4), "docs": int(self.df[j])}
+                for j in order]
+
+    def unique(self):
+        """Per document, its keywords found in no other document, best first"""
+        only  = self.df == 1
+        out   = []
+        for i in range(len(self.labels)):
+            js = np.flatnonzero(only & (self.scores[i] > 0))
+            js = js[np.argsort(-self.scores[i, js], kind="stable")]
+            out.append([{"keyword": self.keywords[j], "score": round(float(self.scores[i, j]), 4)} for j in js])
+        return out
+
+    def top_pairs(self, sim, k=10):
+        """The ``k`` most similar document pairs as (i, j, similarity)"""
+        n = len(self.labels)
+        if n < 2:
+            return []
+        iu, ju = np.triu_indices(n, 1)
+        vals   = sim[iu, ju]
+        k      = min(k, len(vals))
+        best   = np.argpartition(-vals, k - 1)[:k]
+        best   = best[np.argsort(-vals[best], kind="stable")]
+        return [(int(iu[b]), int(ju[b]), float(vals[b])) for b in best]
+
+
+def cluster_order(sim):
+    """Document order from average-linkage agglomerative clustering on ``1 - sim``.
+
+    Similar documents end up next to each other, which makes blocks visible
+    in the similarity matrix. Each merge is one argmin over the distance
+    matrix and a Lance-Williams row update, so n documents cost O(n²) per
+    merge in vectorized NumPy.
+    """
+    n = sim.shape[0]
+    if n <= 2:
+        return list(range(n))
+    dist    = (1.0 - sim).astype(np.float64)
+    np.fill_diagonal(dist, np.inf)
+    size    = np.ones(n)
+    members = [[i] for i in range(n)]
+    active  = np.ones(n, dtype=bool)
+    for _ in range(n - 1):
+        a, b = divmod(int(np.argmin(dist)), n)
+        if a > b:
+            a, b = b, a
+        # average linkage: distance to the merged cluster is the size-weighted mean
+        merged = (dist[a] * size[a] + dist[b] * size[b]) / (size[a] + size[b])
+        dist[a, :] = dist[:, a] = merged
+        dist[a, a] = np.inf
+        dist[b, :] = dist[:, b] = np.inf
+        size[a]   += size[b]
+        members[a] = members[a] + members[b]
+        members[b] = []
+        active[b]  = False
+    return members[int(np.flatnonzero(active)[0])]
+
+
+def compare(docs, top_k=30):
+    """Everything the comparison view shows, as plain Python values.
+
+    ``docs`` is ``[{"label", "keywords"}]``; matrices are lists of rows in
+    the clustered ``order`` (indices into ``labels``).
+    """
+    cmp    = Comparison.build(docs)
+    cosine = cmp.cosine()
+    jacc   = cmp.jaccard()
+    order  = cluster_order(cosine)
+    pick   = np.ix_(order, order)
+    return {
+        "labels":   cmp.labels,
+        "order":    order,
+        "keywords": len(cmp.keywords),
+        "cosine":   np.round(cosine[pick], 4).tolist(),
+        "jaccard":  np.round(jacc[pick], 4).tolist(),
+        "pairs":    [{"a": cmp.labels[i], "b": cmp.labels[j], "cosine": round(s, 4),
+                      "jaccard": round(float(jacc[i, j]), 4)} for i, j, s in cmp.top_pairs(cosine)],
+        "shared":   cmp.shared(top_k=top_k),
+        "unique":   cmp.unique(),
+    }
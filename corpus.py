@@ -0,0 +1,339 @@
+"""Searchable history of every analysis: source, time, engine, keywords and scores.
+
+Keywords are stored once in ``terms`` (normalized, with an FTS5 index for
+prefix search) and linked to documents through ``postings``, keyed by
+(term, doc) so "documents containing X" is a single index range scan,
+newest first, paged by document id. ``term_days`` keeps per-day document
+counts per term, so trend queries read a few days of rollups instead of
+every posting in the window. Co-occurrence is counted over the most recent
+``co_sample`` documents containing the keyword, which keeps it fast for
+keywords that appear in hundreds of thousands of documents.
+
+    python corpus.py docs "machine learning"
+    python corpus.py top --days 7
+    python corpus.py cooccur "machine learning"
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from kwcache import CACHE_DIR, normalize_text
+
+CORPUS_ON     = os.environ.get("LEXIS_CORPUS", "1") != "0"
+CO_SAMPLE     = int(os.environ.get("LEXIS_CORPUS_CO_SAMPLE", "5000"))
+SOURCE_CHARS  = 300
+PER_PAGE      = 20
+MAX_PER_PAGE  = 200
+# documents fetched by id in one query; SQLite before 3.32 allows 999 parameters
+MAX_FETCH     = 900
+# trend queries over the same window are served from memory for this long
+TREND_TTL_S   = 30
+DAY           = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY, created REAL NOT NULL, kind TEXT NOT NULL,
+    source TEXT NOT NULL, engine TEXT NOT NULL, via TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, label TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS postings (
+    term INTEGER NOT NULL, doc INTEGER NOT NULL, score REAL NOT NULL,
+    PRIMARY KEY (term, doc)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc, term, score);
+CREATE TABLE IF NOT EXISTS term_days (
+    day INTEGER NOT NULL, term INTEGER NOT NULL, df INTEGER NOT NULL, score REAL NOT NULL,
+    PRIMARY KEY (day, term)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS term_days_term ON term_days(term, df);
+"""
+
+
+def _page_size(per_page):
+    return max(1, min(int(per_page), MAX_PER_PAGE))
+
+def _fts_query(text):
+    """FTS5 prefix query matching every word of ``text``; None when there are no words"""
+    words = [w.replace('"', "") for w in normalize_text(text).split()]
+    words = [w for w in words if w]
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+class Corpus:
+    """Every recorded analysis, queryable by keyword, time window and co-occurrence.
+
+    Like the keyword cache this is best-effort: if the database cannot be
+    opened, recording does nothing and queries return empty pages.
+    """
+
+    def __init__(self, path=None, co_sample=CO_SAMPLE):
+        self.path      = path or os.path.join(CACHE_DIR, "corpus.sqlite3")
+        self.co_sample = co_sample
+        self.fts       = False
+        self._lock     = threading.Lock()
+        self._trends   = {}
+        self.stats     = {"recorded": 0, "queries": 0, "errors": 0}
+        self._db       = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS terms_fts USING fts5("
+                                 "term, content='terms', content_rowid='id')")
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: keyword search falls back to a prefix LIKE
+                self.fts = False
+            self._db.commit()
+        except sqlite3.Error:
+            self._db = None
+
+    # ── WRITES ──
+    def _term_id(self, kw):
+        term = normalize_text(kw)
+        row  = self._db.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+        if row is not None:
+            return row[0]
+        cur = self._db.execute("INSERT INTO terms(term, label) VALUES (?,?)", (term, kw.strip()))
+        if self.fts:
+            self._db.execute("INSERT INTO terms_fts(rowid, term) VALUES (?,?)", (cur.lastrowid, term))
+        return cur.lastrowid
+
+    def record(self, kind, source, kws, engine, via="app", created=None):
+        """Store one analysis; returns its document id, or None if nothing was stored"""
+        if self._db is None or not kws:
+            return None
+        created = time.time() if created is None else created
+        day     = int(created // DAY)
+        with self._lock:
+            try:
+                cur = self._db.execute("INSERT INTO docs(created, kind, source, engine, via) VALUES (?,?,?,?,?)",
+                                       (created, kind, " ".join(str(source).split())[:SOURCE_CHARS], engine, via))
+                doc, scores = cur.lastrowid, {}
+                for k in kws:
+                    if not str(k.get("keyword", "")).strip():
+                        continue
+                    tid = self._term_id(str(k["keyword"]))
+                    # a keyword repeated within one result counts once, at its best score
+                    scores[tid] = max(scores.get(tid, 0.0), float(k.get("score", 0)))
+                self._db.executemany("INSERT INTO postings(term, doc, score) VALUES (?,?,?)",
+                                     [(tid, doc, sc) for tid, sc in scores.items()])
+                self._db.executemany(
+                    "INSERT INTO term_days(day, term, df, score) VALUES (?,?,1,?) "
+                    "ON CONFLICT(day, term) DO UPDATE SET df = df + 1, score = score + excluded.score",
+                    [(day, tid, sc) for tid, sc in scores.items()])
+                self._db.commit()
+                self.stats["recorded"] += 1
+                return doc
+            except Exception:
+                # a malformed row must not leave half a document behind, nor reach the caller
+                self._db.rollback()
+                self.stats["errors"] += 1
+                return None
+
+    # ── QUERIES ──
+    def _query(self, sql, args=()):
+        if self._db is None:
+            return []
+        with self._lock:
+            self.stats["queries"] += 1
+            try:
+                return self._db.execute(sql, args).fetchall()
+            except sqlite3.Error:
+                self.stats["errors"] += 1
+                return []
+
+    def find_term(self, keyword):
+        """(id, label) of a stored keyword, matched after normalization; None if never seen"""
+        rows = self._query("SELECT id, label FROM terms WHERE term = ?", (normalize_text(keyword),))
+        return rows[0] if rows else None
+
+    def search_terms(self, text, limit=10):
+        """Stored keywords whose words start with the words of ``text``, most documents first"""
+        if self.fts:
+            q = _fts_query(text)
+            if q is None:
+                return []
+            rows = self._query(
+                "SELECT t.label, COALESCE((SELECT SUM(df) FROM term_days WHERE term = t.id), 0) AS n "
+                "FROM terms_fts f JOIN terms t ON t.id = f.rowid WHERE terms_fts MATCH ? "
+                "ORDER BY n DESC, t.label LIMIT ?", (q, limit))
+        else:
+            prefix = normalize_text(text).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            rows = self._query(
+                "SELECT t.label, COALESCE((SELECT SUM(df) FROM term_days WHERE term = t.id), 0) AS n "
+                "FROM terms t WHERE t.term LIKE ? ESCAPE '\\' ORDER BY n DESC, t.label LIMIT ?",
+                (prefix + "%", limit))
+        return [{"keyword": label, "docs": n} for label, n in rows]
+
+    def documents_with(self, keyword, before=None, per_page=PER_PAGE):
+        """Documents containing ``keyword``, newest first.
+
+        Returns {"keyword", "total", "items", "next"}; pass ``next`` back as
+        ``before`` for the following page (None on the last one).
+        """
+        per_page = _page_size(per_page)
+        found    = self.find_term(keyword)
+        if found is None:
+            return {"keyword": keyword, "total": 0, "items": [], "next": None}
+        tid, label = found
+        rows = self._query(
+            "SELECT d.id, d.created, d.kind, d.source, d.engine, d.via, p.score "
+            "FROM postings p JOIN docs d ON d.id = p.doc "
+            "WHERE p.term = ? AND p.doc < ? ORDER BY p.doc DESC LIMIT ?",
+            (tid, before if before is not None else sys.maxsize, per_page + 1))
+        total = self._query("SELECT COALESCE(SUM(df), 0) FROM term_days WHERE term = ?", (tid,))
+        items = [{"doc": d, "created": c, "kind": k, "source": s, "engine": e, "via": v, "score": round(sc, 4)}
+                 for d, c, k, s, e, v, sc in rows[:per_page]]
+        return {"keyword": label, "total": total[0][0] if total else 0, "items": items,
+                "next": items[-1]["doc"] if len(rows) > per_page else None}
+
+    def recent(self, before=None, per_page=PER_PAGE):
+        """Latest documents with their keywords, newest first, paged like documents_with()"""
+        per_page = _page_size(per_page)
+        rows = self._query("SELECT id, created, kind, source, engine, via FROM docs WHERE id < ? "
+                           "ORDER BY id DESC LIMIT ?",
+                           (before if before is not None else sys.maxsize, per_page + 1))
+        items = [{"doc": d, "created": c, "kind": k, "source": s, "engine": e, "via": v,
+                  "keywords": self.doc_keywords(d)} for d, c, k, s, e, v in rows[:per_page]]
+        return {"items": items, "next": items[-1]["doc"] if len(rows) > per_page else None}
+
+    def doc_keywords(self, doc):
+        rows = self._query("SELECT t.label, p.score FROM postings p JOIN terms t ON t.id = p.term "
+                           "WHERE p.doc = ? ORDER BY p.score DESC", (doc,))
+        return [{"keyword": label, "score": round(sc, 4)} for label, sc in rows]
+
+    def documents(self, docs):
+        """{doc: {"doc", "created", "kind", "source", "keywords"}} for several documents in two queries"""
+        docs = [int(d) for d in docs][:MAX_FETCH]
+        if not docs:
+            return {}
+        marks = ",".join("?" * len(docs))
+        out   = {d: {"doc": d, "created": c, "kind": k, "source": s, "keywords": []}
+                 for d, c, k, s in self._query(f"SELECT id, created, kind, source FROM docs WHERE id IN ({marks})",
+                                               docs)}
+        for d, label, sc in self._query(f"SELECT p.doc, t.label, p.score FROM postings p JOIN terms t "
+                                        f"ON t.id = p.term WHERE p.doc IN ({marks}) ORDER BY p.doc, p.score DESC",
+                                        docs):
+            out[d]["keywords"].append({"keyword": label, "score": round(sc, 4)})
+        return out
+
+    def top_keywords(self, days=7, page=0, per_page=PER_PAGE, now=None):
+        """Keywords in the most documents over the last ``days`` days (today included).
+
+        ``mean_score`` is the keyword's average score where it appears. Returns
+        {"days", "items", "next"} where ``next`` is the following page number.
+        """
+        per_page = _page_size(per_page)
+        since    = int((now or time.time()) // DAY) - max(1, int(days)) + 1
+        key      = (since, page, per_page)
+        hit      = self._trends.get(key)
+        if hit is not None and time.monotonic() - hit[0] < TREND_TTL_S:
+            return hit[1]
+        # grouping on "term + 0" keeps SQLite on the day range instead of walking term_days_term in full
+        rows = self._query(
+            "SELECT t.label, x.n, x.total FROM (SELECT term + 0 AS term, SUM(df) AS n, SUM(score) AS total "
+            "FROM term_days WHERE day >= ? GROUP BY term + 0 ORDER BY n DESC, total DESC LIMIT ? OFFSET ?) x "
+            "JOIN terms t ON t.id = x.term ORDER BY x.n DESC, x.total DESC",
+            (since, per_page + 1, page * per_page))
+        items = [{"rank": page * per_page + i, "keyword": label, "docs": n, "mean_score": round(total / n, 4)}
+                 for i, (label, n, total) in enumerate(rows[:per_page], 1)]
+        result = {"days": days, "items": items, "next": page + 1 if len(rows) > per_page else None}
+        if len(self._trends) > 256:
+            self._trends.clear()
+        self._trends[key] = (time.monotonic(), result)
+        return result
+
+    def cooccurring(self, keyword, page=0, per_page=PER_PAGE):
+        """Keywords appearing in the same documents as ``keyword``.
+
+        Counted over the latest ``co_sample`` documents containing it; ``docs``
+        is how many of those share the keyword and ``sampled`` how many there
+        were. Paged like top_keywords().
+        """
+        per_page = _page_size(per_page)
+        found    = self.find_term(keyword)
+        if found is None:
+            return {"keyword": keyword, "sampled": 0, "items": [], "next": None}
+        tid, label = found
+        rows = self._query(
+            "WITH d AS (SELECT doc FROM postings WHERE term = ? ORDER BY doc DESC LIMIT ?) "
+            "SELECT t.label, x.n, x.mean FROM (SELECT p.term, COUNT(*) AS n, AVG(p.score) AS mean "
+            "FROM d JOIN postings p ON p.doc = d.doc WHERE p.term != ? "
+            "GROUP BY p.term ORDER BY n DESC, mean DESC LIMIT ? OFFSET ?) x "
+            "JOIN terms t ON t.id = x.term ORDER BY x.n DESC, x.mean DESC",
+            (tid, self.co_sample, tid, per_page + 1, page * per_page))
+        sampled = self._query("SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term = ? LIMIT ?)",
+                              (tid, self.co_sample))
+        sampled = sampled[0][0] if sampled else 0
+        items = [{"rank": page * per_page + i, "keyword": lab, "docs": n,
+                  "share_%": round(n / sampled * 100, 1) if sampled else 0.0, "mean_score": round(mean, 4)}
+                 for i, (lab, n, mean) in enumerate(rows[:per_page], 1)]
+        return {"keyword": label, "sampled": sampled, "items": items,
+                "next": page + 1 if len(rows) > per_page else None}
+
+    def snapshot(self):
+        out = dict(self.stats)
+        rows = self._query("SELECT MAX(id) FROM docs")
+        out["docs"] = (rows[0][0] or 0) if rows else 0
+        return out
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+def get_corpus():
+    """Process-wide corpus shared by the app, API and CLIs"""
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
+
+def record(kind, source, kws, engine, via="app"):
+    """Store an analysis in the shared corpus unless LEXIS_CORPUS=0; never raises"""
+    if CORPUS_ON:
+        return get_corpus().record(kind, source, kws, engine, via)
+    return None
+
+def record_result(res, engine, via):
+    """record() for a batch or crawl result dict, if it succeeded"""
+    if res.get("status") == "ok" and res.get("keywords"):
+        source = res.get("url") or res.get("input", "")
+        kind   = "url" if res.get("url") or res.get("kind") == "url" else "text"
+        return record(kind, source, res["keywords"], engine, via)
+    return None
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Query the keyword corpus")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("docs", help="documents containing a keyword")
+    p.add_argument("keyword")
+    p.add_argument("--before", type=int)
+    p = sub.add_parser("top", help="top keywords over recent days")
+    p.add_argument("--days", type=int, default=7)
+    p.add_argument("--page", type=int, default=0)
+    p = sub.add_parser("cooccur", help="keywords co-occurring with a keyword")
+    p.add_argument("keyword")
+    p.add_argument("--page", type=int, default=0)
+    p = sub.add_parser("search", help="stored keywords matching a prefix")
+    p.add_argument("text")
+    for p in sub.choices.values():
+        p.add_argument("--per-page", type=int, default=PER_PAGE)
+    args = ap.parse_args()
+    corpus = get_corpus()
+    if args.cmd == "docs":
+        out = corpus.documents_with(args.keyword, args.before, args.per_page)
+    elif args.cmd == "top":
+        out = corpus.top_keywords(args.days, args.page, args.per_page)
+    elif args.cmd == "cooccur":
+        out = corpus.cooccurring(args.keyword, args.page, args.per_page)
+    else:
+        out = corpus.search_terms(args.text, args.per_page)
+    json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,276 @@
+"""Site crawl: analyze up to N same-site pages from a seed URL or sitemap and rank keywords site-wide.
+
+Politeness is per host: at most ``per_host`` requests in flight, one request
+every ``delay`` seconds (or robots.txt's Crawl-delay, if longer) and no URLs
+that robots.txt disallows. Pages with identical cleaned text are analyzed
+once; the login/paywall/CAPTCHA filters apply to every page.
+
+    python crawl.py https://docs.example.com/ --pages 100 --engine local > site.jsonl
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from urllib.parse import urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from cancel import Cancelled
+from fetcher import BLOCKED_EXTS, PageRejected, check_page_text
+from httpclient import USER_AGENT, canonicalize_url, get_client
+from kwcache import normalize_text
+
+CRAWL_PAGES   = int(os.environ.get("LEXIS_CRAWL_PAGES", "50"))
+MAX_PAGES     = 500
+CRAWL_WORKERS = int(os.environ.get("LEXIS_CRAWL_WORKERS", "8"))
+PER_HOST      = int(os.environ.get("LEXIS_CRAWL_PER_HOST", "2"))
+CRAWL_DELAY   = float(os.environ.get("LEXIS_CRAWL_DELAY", "0.5"))
+# a site asking for more than this between requests is crawled at this pace anyway
+MAX_DELAY     = 10.0
+# the policy outlives crawls, so robots.txt is re-read after this long
+ROBOTS_TTL_S  = 3600
+SITEMAP_DEPTH = 2
+LOC_RE        = re.compile(rb"<loc>\s*([^<\s]+)\s*</loc>", re.I)
+
+
+def site_of(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def is_sitemap(url):
+    return urlsplit(url).path.lower().endswith(".xml")
+
+
+class HostPolicy:
+    """Per-host connection cap, request spacing and robots.txt rules"""
+
+    def __init__(self, per_host=PER_HOST, delay=CRAWL_DELAY):
+        self.per_host = per_host
+        self.delay    = delay
+        self._lock    = threading.Lock()
+        self._hosts   = {}
+
+    def _host(self, url):
+        netloc = urlsplit(url).netloc.lower()
+        with self._lock:
+            h = self._hosts.get(netloc)
+            if h is None:
+                h = self._hosts[netloc] = {"slots": threading.Semaphore(self.per_host), "lock": threading.Lock(),
+                                           "next": 0.0, "delay": self.delay, "robots": None, "loaded": None}
+            return h
+
+    def _robots(self, url, h):
+        with h["lock"]:
+            if h["loaded"] is None or time.monotonic() - h["loaded"] > ROBOTS_TTL_S:
+                h["loaded"] = time.monotonic()
+                h["delay"]  = self.delay
+                parts = urlsplit(url)
+                try:
+                    body = get_client().get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=10).body
+                    rp = RobotFileParser()
+                    rp.parse(body.decode("utf-8", errors="replace").splitlines())
+                    h["robots"] = rp
+                    h["delay"]  = min(max(h["delay"], float(rp.crawl_delay(USER_AGENT) or 0)), MAX_DELAY)
+                except Exception:
+                    # no readable robots.txt: everything is allowed
+                    h["robots"] = None
+            return h["robots"]
+
+    def allowed(self, url):
+        h  = self._host(url)
+        rp = self._robots(url, h)
+        return rp is None or rp.can_fetch(USER_AGENT, url)
+
+    @contextmanager
+    def slot(self, url, stop=None):
+        """Hold one of the host's connection slots, after waiting out its crawl delay.
+
+        Setting the ``stop`` CancelToken ends the wait with Cancelled.
+        """
+        h = self._host(url)
+        with h["slots"]:
+            with h["lock"]:
+                now    = time.monotonic()
+                pause  = h["next"] - now
+                h["next"] = max(h["next"], now) + h["delay"]
+            if stop is None:
+                if pause > 0:
+                    time.sleep(pause)
+            elif stop.wait(max(pause, 0)):
+                raise Cancelled()
+            yield
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+def get_policy():
+    """Process-wide HostPolicy, so concurrent crawls of one host share its slots and delay"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = HostPolicy()
+        return _policy
+
+
+def sitemap_urls(url, limit, depth=SITEMAP_DEPTH):
+    """Page URLs listed in a sitemap, following sitemap indexes ``depth`` levels down"""
+    body = get_client().get(url, timeout=15).body
+    locs = [html.unescape(m.decode("utf-8", errors="replace")) for m in LOC_RE.findall(body)]
+    if b"<sitemapindex" not in body[:2048].lower():
+        return locs[:limit]
+    urls = []
+    for sub in locs:
+        if depth <= 0 or len(urls) >= limit:
+            break
+        try:
+            urls += sitemap_urls(sub, limit - len(urls), depth - 1)
+        except Exception:
+            continue
+    return urls
+
+
+def crawl(seed, fetch_page, extract, max_pages=CRAWL_PAGES, workers=CRAWL_WORKERS, policy=None, stop=None):
+    """Yield one result per page in completion order.
+
+    ``fetch_page(url, stop=stop)`` returns (text, links, final_url) like
+    fetcher.fetch_page_links; ``extract(text)`` returns keywords. Links are
+    followed breadth-first within the seed's site until ``max_pages`` pages
+    have been fetched. Pages that redirect off the seed's site are rejected.
+    Setting the ``stop`` CancelToken stops dispatching new pages
+    and cuts short the crawl delays and fetches in flight; those pages come
+    back with status "cancelled".
+    """
+    policy = policy or get_policy()
+    site   = site_of(seed)
+    seen, frontier, digests = set(), deque(), set()
+    lock   = threading.Lock()
+
+    def enqueue(url):
+        # deduplicated by canonical form, but fetched as linked (see HttpClient.get)
+        url = urldefrag(url.strip())[0]
+        key = canonicalize_url(url)
+        # links beyond what could ever be crawled are not worth remembering
+        if (len(seen) >= max_pages * 10 or key in seen or not key.startswith(("http://", "https://"))
+                or site_of(url) != site or urlsplit(url).path.lower().endswith(BLOCKED_EXTS)):
+            return
+        seen.add(key)
+        frontier.append(url)
+
+    def process(url):
+        t0  = time.perf_counter()
+        out = {"url": url, "status": "ok", "keywords": [], "error": "", "links": [], "final_url": url}
+        try:
+            if not policy.allowed(url):
+                raise PageRejected("🚫 Disallowed by robots.txt.")
+            with policy.slot(url, stop):
+                text, out["links"], out["final_url"] = fetch_page(url, stop=stop)
+            if site_of(out["final_url"]) != site:
+                out["links"] = []
+                raise PageRejected(f"↪ Redirected off-site to {site_of(out['final_url'])}.")
+            check_page_text(text)
+            digest = hashlib.sha1(normalize_text(text).encode()).hexdigest()
+            with lock:
+                duplicate = digest in digests
+                digests.add(digest)
+            if duplicate:
+                out["status"] = "duplicate"
+            else:
+                out["keywords"] = extract(text)
+        except PageRejected as e:
+            out["status"] = "rejected"
+            out["error"]  = str(e)
+        except Cancelled:
+            out["status"] = "cancelled"
+        except Exception as e:
+            out["status"] = "error"
+            out["error"]  = str(e)[:300]
+        out["seconds"] = round(time.perf_counter() - t0, 3)
+        return out
+
+    if is_sitemap(seed):
+        for url in sitemap_urls(seed, max_pages * 2):
+            enqueue(url)
+    else:
+        enqueue(seed)
+    dispatched = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lexis-crawl") as pool:
+        inflight = set()
+        def _fill():
+            nonlocal dispatched
+            while (len(inflight) < workers and frontier and dispatched < max_pages
+                   and not (stop is not None and stop.is_set())):
+                inflight.add(pool.submit(process, frontier.popleft()))
+                dispatched += 1
+        _fill()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                inflight.discard(fut)
+                res = fut.result()
+                # a redirect target is crawled under the URL that led to it, not again on its own
+                seen.add(canonicalize_url(urldefrag(res.pop("final_url"))[0]))
+                for link in res.pop("links"):
+                    enqueue(link)
+                yield res
+            _fill()
+
+
+def merge_keywords(results):
+    """Site-level ranking from per-page results.
+
+    A keyword's score is its mean over all analyzed pages (0 where absent),
+    so it rewards both prominence and coverage; ``df`` is how many pages
+    it appears on.
+    """
+    agg, pages = {}, 0
+    for res in results:
+        if res["status"] != "ok" or not res["keywords"]:
+            continue
+        pages += 1
+        counted = set()
+        for k in res["keywords"]:
+            key = normalize_text(k["keyword"])
+            if key in counted:
+                continue
+            counted.add(key)
+            a = agg.setdefault(key, {"keyword": k["keyword"], "total": 0.0, "df": 0, "example_url": res["url"]})
+            a["total"] += float(k.get("score", 0))
+            a["df"]    += 1
+    rows = sorted(agg.values(), key=lambda a: (-a["total"], -a["df"], a["keyword"]))
+    return [{"rank": i, "keyword": a["keyword"], "score": round(a["total"] / pages, 4), "df": a["df"],
+             "pages_%": round(a["df"] / pages * 100, 1), "example_url": a["example_url"]}
+            for i, a in enumerate(rows, 1)]
+
+
+if __name__ == "__main__":
+    from cli import ENGINE_NAMES
+    from corpus import record_result
+    from fetcher import fetch_page_links
+    from pipeline import analyze
+    from scheduler import BULK
+
+    ap = argparse.ArgumentParser(description="Crawl a site and print its keyword ranking as JSONL")
+    ap.add_argument("seed", help="start URL or sitemap.xml")
+    ap.add_argument("--pages", type=int, default=CRAWL_PAGES)
+    ap.add_argument("--workers", type=int, default=CRAWL_WORKERS)
+    ap.add_argument("--per-host", type=int, default=PER_HOST)
+    ap.add_argument("--delay", type=float, default=CRAWL_DELAY)
+    ap.add_argument("--engine", choices=sorted(ENGINE_NAMES), default="llm")
+    args = ap.parse_args()
+    engine = ENGINE_NAMES[args.engine]
+    results = []
+    for res in crawl(args.seed, fetch_page_links, lambda text: analyze(text, False, engine, BULK)[0],
+                     min(args.pages, MAX_PAGES), args.workers, HostPolicy(args.per_host, args.delay)):
+        results.append(res)
+        record_result(res, engine, "crawl")
+        print(f"{res['status']:<9} {res['seconds']:6.2f}s {res['url']} {res['error']}", file=sys.stderr)
+    for row in merge_keywords(results):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
@@ -0,0 +1,123 @@
+"""Streaming exporters for keyword results.
+
+Rows come from generators and are written to a temp file one row (or one
+Parquet row group) at a time, so exporting thousands of documents never
+builds the whole payload in memory. Parquet needs pyarrow, which Streamlit
+already depends on.
+
+    python exporters.py lexis_batch.jsonl results.parquet
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+
+ROW_GROUP = 5000
+
+# (column, type) — the types only matter for Parquet
+KEYWORD_FIELDS = [("rank", "int"), ("keyword", "str"), ("score", "float"), ("accuracy_%", "float")]
+BATCH_FIELDS   = [("id", "str"), ("kind", "str"), ("input", "str"), ("status", "str"), ("error", "str"),
+                  ("seconds", "float"), ("rank", "int"), ("keyword", "str"), ("score", "float")]
+SITE_FIELDS    = [("rank", "int"), ("keyword", "str"), ("score", "float"), ("df", "int"), ("pages_%", "float"),
+                  ("example_url", "str")]
+
+# format → (mime, suffix)
+FORMATS = {
+    "csv":     ("text/csv", ".csv"),
+    "jsonl":   ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "txt":     ("text/plain", ".txt"),
+}
+
+
+# ── ROWS ─────────────────────────────────────────────────────────────────────
+def keyword_rows(kws, text=False):
+    """One row per keyword; with ``text`` score and accuracy are the strings the
+    CSV/TXT downloads have always had ("0.9500", "95.0%")"""
+    for i, k in enumerate(kws, 1):
+        sc  = float(k.get("score", 0))
+        acc = round(sc * 100, 1)
+        if text:
+            yield {"rank": i, "keyword": k["keyword"], "score": f"{sc:.4f}", "accuracy_%": f"{acc}%"}
+        else:
+            yield {"rank": i, "keyword": k["keyword"], "score": round(sc, 4), "accuracy_%": acc}
+
+def batch_rows(path):
+    """One row per keyword from a batch results JSONL file; rows without keywords keep a single line"""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            res  = json.loads(line)
+            base = {"id": str(res.get("id", "")), "kind": res.get("kind", ""), "input": res.get("input", ""),
+                    "status": res.get("status", ""), "error": res.get("error", ""),
+                    "seconds": res.get("seconds")}
+            kws  = res.get("keywords") or []
+            if not kws:
+                yield dict(base, rank=None, keyword=None, score=None)
+            for i, k in enumerate(kws, 1):
+                yield dict(base, rank=i, keyword=k.get("keyword"), score=float(k.get("score", 0)))
+
+
+# ── WRITERS ──────────────────────────────────────────────────────────────────
+def write_csv(rows, path, fields):
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        w = csv.DictWriter(fh, fieldnames=[name for name, _ in fields], extrasaction="ignore")
+        w.writeheader()
+        for row in rows:
+            w.writerow(row)
+
+def write_jsonl(rows, path, fields):
+    names = [name for name, _ in fields]
+    with open(path, "w", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps({n: row.get(n) for n in names}, ensure_ascii=False) + "\n")
+
+def write_txt(rows, path, fields):
+    """The keyword list as ``1. keyword  score=0.9500  accuracy=95.0%`` lines (keyword_rows with text=True)"""
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(f"{row['rank']}. {row['keyword']}  score={row['score']}  accuracy={row['accuracy_%']}"
+                           for row in rows))
+
+def write_parquet(rows, path, fields, row_group=ROW_GROUP):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    types  = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, types[t]) for name, t in fields])
+    with pq.ParquetWriter(path, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= row_group:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet, "txt": write_txt}
+
+
+def export(rows, fmt, fields, prefix="lexis_export_"):
+    """Write ``rows`` to a new temp file in ``fmt``; returns its path (the caller deletes it)"""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=FORMATS[fmt][1])
+    os.close(fd)
+    try:
+        WRITERS[fmt](rows, path, fields)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python exporters.py BATCH.jsonl OUT.{csv,jsonl,parquet,txt}")
+    src, dst = sys.argv[1], sys.argv[2]
+    fmt = os.path.splitext(dst)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        sys.exit(f"unknown output format {fmt!r}; expected one of {', '.join(WRITERS)}")
+    WRITERS[fmt](batch_rows(src), dst, BATCH_FIELDS)
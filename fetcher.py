@@ -0,0 +1,133 @@
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin
+
+import os
+import time
+
+from httpclient import MAX_BODY_BYTES, canonicalize_url, get_client
+from metrics import registry
+from htmltext import HtmlToText, charset_from_content_type, drop_banner_lines, html_to_text
+from statestore import get_store
+
+# ── PAGE FILTERS ─────────────────────────────────────────────────────────────
+BLOCKED_EXTS    = ('.pdf','.jpg','.jpeg','.png','.gif','.webp','.svg','.bmp')
+LOGIN_MARKERS   = ['sign in to continue','log in to continue','please sign in',
+                   'please log in','login required','you must be logged in','members only']
+PAYWALL_MARKERS = ['subscribe to read','subscription required',
+                   'this article is for subscribers','unlock this article','paid subscribers only']
+BOT_MARKERS     = ['captcha','are you a robot','verify you are human',
+                   'ddos protection','access denied','robot check']
+MIN_TEXT_CHARS  = 200
+# what one extraction call sends, at most (salience picks which sentences)
+TEXT_CHARS      = 6000
+# how far into a page single-call extraction looks for those sentences
+READ_CHARS      = int(os.environ.get("LEXIS_READ_CHARS", str(4 * TEXT_CHARS)))
+# cleaned page text is shared across replicas for this long
+PAGE_TTL        = int(os.environ.get("LEXIS_PAGE_TTL", "3600"))
+# hrefs collected per page when crawling
+MAX_LINKS       = 500
+
+
+class PageRejected(Exception):
+    """Raised when a URL can't be analyzed; the message is user-facing"""
+
+
+def stream_page_text(url, timeout=15, max_chars=READ_CHARS, max_bytes=MAX_BODY_BYTES, stop=None, on_stage=None):
+    """Fetch a page and convert it to text while it downloads.
+
+    Reading stops at ``max_bytes`` of body or once ``max_chars`` of readable
+    text have been collected, whichever comes first. ``on_stage`` hears
+    "fetching" and then "cleaning" once the body starts streaming into the
+    parser.
+    """
+    return stream_page(url, timeout, max_chars, max_bytes, stop, on_stage)[0]
+
+def stream_page(url, timeout=15, max_chars=READ_CHARS, max_bytes=MAX_BODY_BYTES, stop=None, on_stage=None,
+                max_links=0):
+    """stream_page_text that also collects up to ``max_links`` hrefs; returns (text, hrefs, final_url)"""
+    conv  = {}
+    clean = [0.0]
+    def consumer(ct):
+        if 'text/html' not in ct:
+            raise PageRejected(f"🚫 Unsupported content type ({ct.split(';')[0].strip()}).")
+        if on_stage is not None:
+            on_stage("cleaning")
+        conv["p"] = HtmlToText(charset_from_content_type(ct), max_chars=max_chars, max_links=max_links)
+        def sink(chunk):
+            t = time.perf_counter()
+            done = conv["p"].feed(chunk)
+            clean[0] += time.perf_counter() - t
+            return done
+        return sink
+    if on_stage is not None:
+        on_stage("fetching")
+    t0 = time.perf_counter()
+    res = get_client().get(url, timeout=timeout, max_bytes=max_bytes, consumer=consumer, stop=stop)
+    fetched = time.perf_counter() - t0
+    t = time.perf_counter()
+    text = drop_banner_lines(conv["p"].close()) if conv else ""
+    # parsing runs inside the download loop, so fetch time is reported net of it
+    registry.observe("lexis_stage_seconds", fetched - clean[0], stage="fetch")
+    registry.observe("lexis_stage_seconds", clean[0] + time.perf_counter() - t, stage="clean")
+    return text, (conv["p"].links if conv else []), res.final_url
+
+def clean_html(html_content):
+    """Readable text of an already-downloaded HTML document"""
+    return html_to_text(html_content)
+
+def check_page_text(plain):
+    """Raise PageRejected for login walls, paywalls, bot checks and near-empty pages"""
+    # walls sit at the top; further down, "log in to comment" and the like are harmless
+    pl = plain[:TEXT_CHARS].lower()
+    if any(s in pl for s in LOGIN_MARKERS):
+        raise PageRejected("🚫 This page requires login.")
+    if any(s in pl for s in PAYWALL_MARKERS):
+        raise PageRejected("🚫 This page is behind a paywall.")
+    if any(s in pl for s in BOT_MARKERS):
+        raise PageRejected("🚫 This site blocks automated access.")
+    if len(plain) < MIN_TEXT_CHARS:
+        raise PageRejected("🚫 Not enough readable text found.")
+
+def check_page_url(url):
+    if not url.startswith("http"):
+        raise PageRejected("Enter a valid URL starting with http(s)://")
+    if url.lower().split('?')[0].endswith(BLOCKED_EXTS):
+        raise PageRejected("🚫 PDF & image-only pages are not supported.")
+
+def _fetch_or_reject(fetch):
+    """Run ``fetch()``, turning HTTP and network errors into PageRejected"""
+    try:
+        return fetch()
+    except HTTPError as e:
+        if e.code in (401,403): raise PageRejected(f"🚫 Access Denied (HTTP {e.code}).")
+        elif e.code == 402:     raise PageRejected("🚫 Paywalled content.")
+        else:                   raise PageRejected(f"🚫 HTTP Error {e.code}.")
+    except URLError:
+        raise PageRejected("🚫 Unable to reach this URL.")
+
+def fetch_page_text(url, timeout=15, max_chars=READ_CHARS, stop=None, on_stage=None):
+    """Fetch → clean → filter. Returns readable text or raises PageRejected"""
+    check_page_url(url)
+    store = get_store()
+    key   = f"page:{max_chars}:{canonicalize_url(url)}"
+    if store.shared:
+        hit = store.get(key)
+        if hit is not None:
+            return hit
+    plain = _fetch_or_reject(lambda: stream_page_text(url, timeout=timeout, max_chars=max_chars, stop=stop,
+                                                      on_stage=on_stage))
+    check_page_text(plain)
+    if store.shared:
+        store.set(key, plain, ttl=PAGE_TTL)
+    return plain
+
+def fetch_page_links(url, timeout=15, max_chars=READ_CHARS, max_links=MAX_LINKS, stop=None):
+    """Fetch and clean a page for crawling; returns (text, absolute links, final_url).
+
+    The text is not run through check_page_text, so the caller can still
+    follow links out of thin index pages it won't analyze.
+    """
+    check_page_url(url)
+    text, hrefs, final = _fetch_or_reject(lambda: stream_page(url, timeout, max_chars, stop=stop,
+                                                              max_links=max_links))
+    return text, [urljoin(final, h) for h in hrefs], final
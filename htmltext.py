@@ -0,0 +1,171 @@
+import codecs
+import re
+from html.parser import HTMLParser
+
+SKIP_TAGS    = {"script", "style", "noscript", "template", "svg"}
+# text on either side of these goes on separate lines, so menus and footers stay recognizable as lines
+BLOCK_TAGS   = {"p", "div", "br", "hr", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6",
+                "table", "tr", "td", "th", "section", "article", "aside", "header", "footer", "nav", "main",
+                "blockquote", "pre", "form", "figure", "figcaption", "title", "button", "option"}
+SNIFF_BYTES  = 4096
+# bounded look-ahead only ever runs on the first SNIFF_BYTES of the document
+META_CHARSET = re.compile(rb"""<meta[^>]{0,200}?charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]{1,40})""", re.I)
+# block-level lines that are site furniture: phrases only banners and footers use, and, for
+# lines that aren't sentences, bare link labels ("Privacy Policy", "Share on X")
+BANNER_RE    = re.compile(
+    r"\b(we use cookies|this (web)?site uses cookies|accept (all )?cookies|(use|using) of cookies|"
+    r"all rights reserved|skip to (main )?content|javascript is (disabled|required)|"
+    r"(sign up|subscribe) (for|to) our newsletter)\b|©", re.I)
+NAV_LINE_RE  = re.compile(
+    r"^(.*\b)?(privacy policy|terms of (use|service)|cookie (settings|preferences|policy)|follow us|"
+    r"share (this|on)|back to top|advertisement)\b", re.I)
+BANNER_LINE_CHARS = 200
+
+
+def charset_from_content_type(ct):
+    for part in (ct or "").split(";")[1:]:
+        k, _, v = part.partition("=")
+        if k.strip().lower() == "charset" and v.strip():
+            return v.strip().strip("\"'")
+    return None
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+class _TextParser(HTMLParser):
+    """Collects visible text (and optionally link targets), dropping script/style-like subtrees as it goes"""
+
+    def __init__(self, max_chars, max_links=0):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.max_links = max_links
+        self.parts     = []
+        self.links     = []
+        self.chars     = 0
+        self._skip     = 0
+
+    def _break(self):
+        if self.parts and self.parts[-1] != "\n":
+            self.parts.append("\n")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._break()
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == "a" and len(self.links) < self.max_links:
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self._break()
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def text(self):
+        """Collected text: one line per block, inline pieces joined by spaces"""
+        return " ".join(self.parts).replace(" \n ", "\n").strip()
+
+    def handle_data(self, data):
+        if self._skip or self.chars >= self.max_chars:
+            return
+        words = data.split()
+        if words:
+            chunk = " ".join(words)
+            self.parts.append(chunk)
+            self.chars += len(chunk) + 1
+
+    @property
+    def full(self):
+        return self.chars >= self.max_chars and len(self.links) >= self.max_links
+
+
+class HtmlToText:
+    """Incremental bytes → readable text converter.
+
+    Feed raw (already decompressed) body chunks; ``feed`` returns True once
+    ``max_chars`` of text (and ``max_links`` hrefs, when asked for) have been
+    collected so the caller can stop reading.
+    The charset comes from the Content-Type header, else a ``<meta>`` tag in
+    the first few KB, else UTF-8.
+    """
+
+    def __init__(self, charset=None, max_chars=6000, max_links=0):
+        self.charset  = _valid_codec(charset) if charset else None
+        self._parser  = _TextParser(max_chars, max_links)
+        self._decoder = None
+        self._pending = b""
+        if self.charset:
+            self._start_decoder()
+
+    def _start_decoder(self):
+        self._decoder = codecs.getincrementaldecoder(self.charset)(errors="replace")
+
+    def _sniff(self, final=False):
+        m = META_CHARSET.search(self._pending[:SNIFF_BYTES])
+        if m:
+            self.charset = _valid_codec(m.group(1).decode("ascii", "ignore"))
+        if self.charset or final or len(self._pending) >= SNIFF_BYTES:
+            self.charset = self.charset or "utf-8"
+            self._start_decoder()
+            data, self._pending = self._pending, b""
+            return data
+        return None
+
+    def feed(self, chunk):
+        if self._parser.full:
+            return True
+        if self._decoder is None:
+            self._pending += chunk
+            chunk = self._sniff()
+            if chunk is None:
+                return False
+        self._parser.feed(self._decoder.decode(chunk))
+        return self._parser.full
+
+    def close(self):
+        """Flush anything buffered and return the collected text"""
+        if self._decoder is None:
+            data = self._sniff(final=True)
+            self._parser.feed(self._decoder.decode(data, final=True))
+        elif not self._parser.full:
+            self._parser.feed(self._decoder.decode(b"", final=True))
+        self._parser.close()
+        return self._parser.text()
+
+    @property
+    def links(self):
+        """Raw href values in document order"""
+        return self._parser.links
+
+
+def html_to_text(html, max_chars=10**9):
+    """One-shot helper for an already-decoded HTML string"""
+    p = _TextParser(max_chars)
+    p.feed(html)
+    p.close()
+    return p.text()
+
+
+def is_banner_line(line):
+    line = line.strip()
+    if not line or len(line) > BANNER_LINE_CHARS:
+        return False
+    if BANNER_RE.search(line):
+        return True
+    return not line.endswith((".", "!", "?")) and bool(NAV_LINE_RE.match(line))
+
+def drop_banner_lines(text):
+    """Page text without cookie banners, copyright footers and similar short lines.
+
+    Only whole lines (block elements) are considered, so a sentence about
+    cookies inside a paragraph is never touched; pasted text should not go
+    through this at all.
+    """
+    return "\n".join(line for line in text.split("\n") if not is_banner_line(line))
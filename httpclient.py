@@ -0,0 +1,378 @@
+import email.message
+import http.client
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from cancel import Cancelled
+from kwcache import CACHE_DIR
+
+USER_AGENT       = "Mozilla/5.0"
+MAX_REDIRECTS    = 5
+MAX_IDLE_PER_HOST = int(os.environ.get("LEXIS_HTTP_IDLE_PER_HOST", "4"))
+RESP_CACHE_ITEMS = int(os.environ.get("LEXIS_HTTP_CACHE_ITEMS", "2000"))
+MAX_BODY_BYTES   = int(os.environ.get("LEXIS_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+CHUNK_SIZE       = 16 * 1024
+
+TRACKING_PARAMS  = {"fbclid","gclid","dclid","msclkid","yclid","mc_cid","mc_eid","igshid",
+                    "ref","ref_src","ref_url","_hsenc","_hsmi","mkt_tok","spm","share","si"}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "oly_")
+
+
+def canonicalize_url(url):
+    """Normalise a URL so equivalent links share one cache entry.
+
+    Lower-cases scheme/host, drops default ports, fragments and tracking
+    parameters, and sorts what is left of the query string.
+    """
+    parts  = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host   = (parts.hostname or "").lower()
+    port   = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+# ── CONNECTION POOL ──────────────────────────────────────────────────────────
+class ConnectionPool:
+    """Keeps idle keep-alive connections per (scheme, host, port)"""
+
+    def __init__(self, max_idle=MAX_IDLE_PER_HOST):
+        self.max_idle = max_idle
+        self._idle    = {}
+        self._lock    = threading.Lock()
+        self.stats    = {"opened": 0, "reused": 0}
+
+    def get(self, scheme, host, port, timeout):
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                self.stats["reused"] += 1
+                return conn, True
+            self.stats["opened"] += 1
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def put(self, scheme, host, port, conn):
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+
+# ── RESPONSE CACHE ───────────────────────────────────────────────────────────
+class ResponseCache:
+    """SQLite store of validators + decoded bodies for conditional GETs.
+
+    ``complete`` is false for bodies whose download stopped early; those are
+    only a prefix of the page and can't stand in for it on their own.
+    """
+
+    def __init__(self, path=None, max_items=RESP_CACHE_ITEMS):
+        self.path      = path or os.path.join(CACHE_DIR, "http.sqlite3")
+        self.max_items = max_items
+        self._lock     = threading.Lock()
+        self._db       = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY, final_url TEXT, etag TEXT, last_modified TEXT,
+                content_type TEXT, body BLOB, fetched REAL NOT NULL,
+                complete INTEGER NOT NULL DEFAULT 0)""")
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(http_cache)")}
+            if "complete" not in columns:
+                # rows from before the column existed may be prefixes
+                self._db.execute("ALTER TABLE http_cache ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS http_cache_fetched ON http_cache(fetched)")
+            self._db.commit()
+        except sqlite3.Error:
+            self._db = None
+
+    def get(self, url):
+        if self._db is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT final_url, etag, last_modified, content_type, body, complete FROM http_cache WHERE url=?",
+                    (url,)).fetchone()
+            except sqlite3.Error:
+                return None
+        if not row:
+            return None
+        return dict(zip(("final_url","etag","last_modified","content_type","body","complete"), row))
+
+    def put(self, url, final_url, etag, last_modified, content_type, body, complete=True):
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO http_cache(url, final_url, etag, last_modified, content_type, body, "
+                    "fetched, complete) VALUES (?,?,?,?,?,?,?,?)",
+                    (url, final_url, etag, last_modified, content_type, sqlite3.Binary(body), time.time(),
+                     int(bool(complete))))
+                (n,) = self._db.execute("SELECT COUNT(*) FROM http_cache").fetchone()
+                if n > self.max_items:
+                    self._db.execute(
+                        "DELETE FROM http_cache WHERE url IN "
+                        "(SELECT url FROM http_cache ORDER BY fetched ASC LIMIT ?)", (n - self.max_items,))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def touch(self, url):
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute("UPDATE http_cache SET fetched=? WHERE url=?", (time.time(), url))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+
+# ── FETCHER ──────────────────────────────────────────────────────────────────
+class FetchResult:
+    __slots__ = ("url", "final_url", "status", "headers", "content_type", "body", "from_cache", "complete")
+
+    def __init__(self, url, final_url, status, headers, content_type, body, from_cache, complete=True):
+        self.url, self.final_url, self.status = url, final_url, status
+        self.headers, self.content_type       = headers, content_type
+        self.body, self.from_cache            = body, from_cache
+        self.complete                         = complete
+
+
+class Decompressor:
+    """Incremental gzip/deflate decoder with a per-call output limit"""
+
+    def __init__(self, encoding):
+        encoding = (encoding or "").lower().strip()
+        self._raw_fallback = encoding == "deflate"
+        if encoding in ("gzip", "x-gzip"):
+            self._d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._d = zlib.decompressobj()
+        else:
+            self._d = None
+
+    @property
+    def pending(self):
+        """True while compressed input is still waiting to be inflated"""
+        return self._d is not None and bool(self._d.unconsumed_tail)
+
+    def feed(self, data, limit):
+        if self._d is None:
+            return data[:limit]
+        data = self._d.unconsumed_tail + data
+        try:
+            return self._d.decompress(data, limit)
+        except zlib.error:
+            if not self._raw_fallback:
+                raise
+            # some servers send raw deflate without the zlib header
+            self._raw_fallback = False
+            self._d = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._d.decompress(data, limit)
+
+    def flush(self):
+        return self._d.flush() if self._d is not None else b""
+
+
+class HttpClient:
+    """Pooled, gzip-aware GET client with an ETag/Last-Modified response cache"""
+
+    def __init__(self, pool=None, cache=None):
+        self.pool  = pool or ConnectionPool()
+        self.cache = cache or ResponseCache()
+        self.stats = {"requests": 0, "not_modified": 0, "bytes_wire": 0, "bytes_decoded": 0,
+                      "truncated": 0, "short_prefix": 0}
+
+    def _read_body(self, resp, max_bytes, sink):
+        """Read and decode the body in chunks.
+
+        Stops at ``max_bytes`` decoded bytes or as soon as ``sink`` returns
+        True. Returns (body, complete).
+        """
+        dec  = Decompressor(resp.getheader("Content-Encoding"))
+        body = bytearray()
+        while True:
+            room  = max_bytes - len(body)
+            limit = min(room + 1, CHUNK_SIZE)
+            raw   = None
+            if dec.pending:
+                # inflate in bounded slices so a sink can stop long before the end
+                data = dec.feed(b"", limit)
+            else:
+                raw = resp.read(CHUNK_SIZE)
+                if raw:
+                    self.stats["bytes_wire"] += len(raw)
+                    data = dec.feed(raw, limit)
+                else:
+                    data = dec.flush()
+            capped = len(data) > room
+            if capped:
+                data = data[:room]
+            if data:
+                body += data
+                self.stats["bytes_decoded"] += len(data)
+                if sink is not None and sink(data):
+                    return bytes(body), False
+            if capped:
+                return bytes(body), False
+            if raw == b"":
+                return bytes(body), True
+
+    def _request(self, url, headers, timeout, max_bytes, consumer, stop=None):
+        """One GET on a pooled connection; retries once if a reused socket went stale"""
+        parts  = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host   = parts.hostname
+        port   = parts.port or (443 if scheme == "https" else 80)
+        path   = urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        for attempt in (0, 1):
+            conn, reused = self.pool.get(scheme, host, port, timeout)
+            # cancelling shuts the socket down, which unblocks a pending read at once;
+            # it is pinned after sending because a closing response detaches it from conn
+            sock = []
+            unregister = stop.on_cancel(lambda: _abort(sock[0] if sock else conn.sock)) if stop is not None else None
+            try:
+                try:
+                    conn.request("GET", path, headers=headers)
+                    sock.append(conn.sock)
+                    resp = conn.getresponse()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    conn.close()
+                    if reused and attempt == 0 and not (stop is not None and stop.is_set()):
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+                try:
+                    sink = None
+                    if consumer is not None and 200 <= resp.status < 300:
+                        sink = consumer(resp.getheader("Content-Type", ""))
+                    body, complete = self._read_body(resp, max_bytes, sink)
+                except Exception:
+                    conn.close()
+                    raise
+            finally:
+                if unregister is not None:
+                    unregister()
+            if stop is not None and stop.is_set():
+                conn.close()
+                raise Cancelled()
+            if complete and not resp.will_close:
+                self.pool.put(scheme, host, port, conn)
+            else:
+                # unread bytes are left on the socket, so it can't go back in the pool
+                conn.close()
+            return resp, body, complete
+
+    def get(self, url, timeout=15, max_bytes=MAX_BODY_BYTES, consumer=None, stop=None):
+        """GET ``url`` following redirects, revalidating against the response cache.
+
+        ``consumer(content_type)`` may return a chunk sink that is fed decoded
+        body bytes as they arrive (replayed from cache on a 304); the sink
+        returns True to stop reading early. The consumer is called again, for
+        a fresh sink, if a cached prefix turns out too short and the page is
+        fetched in full. Setting the ``stop`` CancelToken aborts the transfer
+        with Cancelled.
+        """
+        # the canonical form is only the cache key: the request goes to the URL as given,
+        # since some servers depend on parameter order or on the parameters it drops
+        key    = canonicalize_url(url)
+        cached = self.cache.get(key)
+        # revalidate straight against the last known final URL, skipping redirect hops
+        target = cached["final_url"] if cached else url.strip()
+        for _ in range(MAX_REDIRECTS + 1):
+            headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate",
+                       "Connection": "keep-alive"}
+            if cached and target == cached["final_url"]:
+                if cached["etag"]:          headers["If-None-Match"]     = cached["etag"]
+                if cached["last_modified"]: headers["If-Modified-Since"] = cached["last_modified"]
+            if stop is not None:
+                stop.check()
+            try:
+                resp, body, complete = self._request(target, headers, timeout, max_bytes, consumer, stop)
+            except (OSError, http.client.HTTPException, zlib.error) as e:
+                if stop is not None and stop.is_set():
+                    raise Cancelled() from e
+                raise URLError(e)
+            self.stats["requests"] += 1
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                target = urljoin(target, resp.getheader("Location"))
+                continue
+            if resp.status == 304 and cached:
+                self.stats["not_modified"] += 1
+                body   = bytes(cached["body"])
+                enough = bool(cached["complete"])
+                if consumer is not None:
+                    sink = consumer(cached["content_type"])
+                    for i in range(0, len(body), CHUNK_SIZE):
+                        if sink is not None and sink(body[i:i + CHUNK_SIZE]):
+                            enough = True
+                            break
+                if not enough:
+                    # the cached prefix ran out before this caller was done: fetch the page in full
+                    self.stats["short_prefix"] += 1
+                    cached = None
+                    continue
+                self.cache.touch(key)
+                return FetchResult(url, cached["final_url"], 200, resp.headers,
+                                   cached["content_type"], body, True, bool(cached["complete"]))
+            if resp.status >= 400:
+                hdrs = email.message.Message()
+                for k, v in resp.getheaders():
+                    hdrs[k] = v
+                raise HTTPError(target, resp.status, resp.reason, hdrs, None)
+            if not complete:
+                self.stats["truncated"] += 1
+            ctype = resp.getheader("Content-Type", "")
+            etag, lm = resp.getheader("ETag"), resp.getheader("Last-Modified")
+            if etag or lm:
+                # truncated bodies are cached as prefixes; a 304 only replays one to a caller it satisfies
+                self.cache.put(key, target, etag, lm, ctype, body, complete)
+            return FetchResult(url, target, resp.status, resp.headers, ctype, body, False, complete)
+        raise URLError("too many redirects")
+
+
+def _abort(sock):
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide client so every session shares the pool and response cache"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from batch import BATCH_WORKERS, ResultWriter, run_batch
+from cancel import CancelToken, Cancelled
+from corpus import record, record_result
+from crawl import crawl, merge_keywords
+from fetcher import fetch_page_links, fetch_page_text
+from metrics import registry
+from pipeline import analyze, analyze_url, explain_keywords_stream, extract_keywords, summarize_turns
+from scheduler import BULK, INTERACTIVE
+from sessmem import get_memory
+
+JOB_WORKERS = int(os.environ.get("LEXIS_JOB_WORKERS", "16"))
+# finished jobs are handed back for identical input this long
+JOB_TTL_S   = int(os.environ.get("LEXIS_JOB_TTL", "600"))
+MAX_JOBS    = 2000
+
+# coarse progress per stage, for the UI's progress bar
+STAGE_PROGRESS = {"queued": 0.05, "fetching": 0.2, "cleaning": 0.4, "extracting": 0.65,
+                  "summarizing": 0.25, "explaining": 0.5, "crawling": 0.1, "processing": 0.1, "done": 1.0}
+LIVE = ("queued", "running")
+
+
+class Job:
+    """One unit of background work; ``partial`` holds streamed output so far.
+
+    ``speculative`` stays True until a non-speculative submit attaches, so
+    the work can run at low priority until someone is actually waiting.
+    """
+
+    def __init__(self, key, kind, speculative=False):
+        self.id        = uuid.uuid4().hex
+        self.key       = key
+        self.kind      = kind
+        self.status    = "queued"
+        self.stage     = "queued"
+        self.partial   = None
+        self.result    = None
+        self.exception = None
+        self.created   = time.time()
+        self.finished  = None
+        self.token     = CancelToken()
+        self.refs      = 0
+        self.speculative = speculative
+
+    def set_stage(self, stage):
+        self.stage = stage
+
+    @property
+    def progress(self):
+        return STAGE_PROGRESS.get(self.stage, 0.0)
+
+    @property
+    def live(self):
+        return self.status in LIVE
+
+
+class JobRunner:
+    """Runs jobs on a shared pool, reusing live or recently finished ones by key.
+
+    Every submit of a key takes a reference; ``cancel`` drops one, and the
+    work is only aborted once nobody is waiting for it any more.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL_S):
+        self.ttl     = ttl
+        self._pool   = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lexis-job")
+        self._lock   = threading.Lock()
+        self._jobs   = {}
+        self._by_key = {}
+        self.stats   = {"submitted": 0, "reused": 0, "cancelled": 0, "errors": 0}
+
+    def submit(self, key, kind, fn, speculative=False):
+        """Run ``fn(job)`` in the background; returns the Job.
+
+        A speculative submit takes no reference, so the work runs to completion
+        unless someone attaches to it and then cancels.
+        """
+        ref = 0 if speculative else 1
+        with self._lock:
+            self._expire(time.time())
+            job = self._by_key.get(key)
+            if job is not None and job.status in LIVE + ("done",):
+                job.refs += ref
+                job.speculative = job.speculative and speculative
+                self.stats["reused"] += 1
+                return job
+            job = Job(key, kind, speculative)
+            job.refs = ref
+            self._jobs[job.id] = self._by_key[key] = job
+            self.stats["submitted"] += 1
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job.token.is_set():
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status = "running"
+        t0 = time.perf_counter()
+        try:
+            job.result = fn(job)
+            job.status = job.stage = "done"
+        except Exception as e:
+            # aborting a socket or stream surfaces as an I/O error, not Cancelled
+            if isinstance(e, Cancelled) or job.token.is_set():
+                job.status = "cancelled"
+            else:
+                job.status, job.exception = "error", e
+                self.stats["errors"] += 1
+        job.finished = time.time()
+        registry.observe("lexis_job_seconds", time.perf_counter() - t0, kind=job.kind, status=job.status)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.live:
+                return
+            job.refs -= 1
+            if job.refs > 0:
+                return
+            self.stats["cancelled"] += 1
+        job.token.set()
+
+    def _expire(self, now):
+        stale = [j for j in self._jobs.values() if j.finished and now - j.finished > self.ttl]
+        if len(self._jobs) - len(stale) > MAX_JOBS:
+            done  = sorted((j for j in self._jobs.values() if j.finished and j not in stale),
+                           key=lambda j: j.finished)
+            stale += done[:len(self._jobs) - len(stale) - MAX_JOBS]
+        for j in stale:
+            self._jobs.pop(j.id, None)
+            if self._by_key.get(j.key) is j:
+                del self._by_key[j.key]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_runner():
+    """Process-wide runner shared by every session"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+# ── JOBS ─────────────────────────────────────────────────────────────────────
+def _key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def submit_extraction(kind, value, long_mode=False, engine="LLM only"):
+    """Keywords for pasted text (``kind="text"``) or a URL; the result is (kws, note)"""
+    def work(job):
+        on_rows = lambda rows: setattr(job, "partial", list(rows))
+        if kind == "url":
+            return analyze_url(value, long_mode, engine, on_rows=on_rows, stop=job.token,
+                               on_stage=job.set_stage)
+        job.set_stage("extracting")
+        with registry.span("text_total"):
+            return analyze(value, long_mode, engine, on_rows=on_rows, stop=job.token)
+    def work_then_explain(job):
+        kws, note = work(job)
+        record(kind, value, kws, engine)
+        # start the opening explanation now rather than after the page reruns
+        if kws:
+            submit_explanation(kws, speculative=True)
+        return kws, note
+    return get_runner().submit(_key("extract", kind, value, long_mode, engine), "extract", work_then_explain)
+
+def submit_crawl(seed, max_pages, engine="LLM only"):
+    """Crawl a site; ``job.partial`` lists the page results so far, the result is the site ranking.
+
+    Cancelling stops dispatching pages and aborts the ones in flight.
+    """
+    def work(job):
+        job.set_stage("crawling")
+        job.partial = []
+        extract = lambda text: analyze(text, False, engine, BULK, stop=job.token)[0]
+        for res in crawl(seed, fetch_page_links, extract, max_pages, stop=job.token):
+            record_result(res, engine, "crawl")
+            job.partial.append(res)
+        job.token.check()
+        return merge_keywords(job.partial)
+    return get_runner().submit(_key("crawl", seed, max_pages, engine), "crawl", work)
+
+def submit_batch(rows, path, workers=BATCH_WORKERS):
+    """Run uploaded rows, appending each result to the JSONL file at ``path``.
+
+    ``job.partial`` lists the row results so far; the result is their count.
+    Cancelling stops dispatching rows and aborts the ones in flight; the file
+    keeps the rows that finished.
+    """
+    def work(job):
+        job.set_stage("processing")
+        job.partial = []
+        writer  = ResultWriter(path)
+        fetch   = lambda url: fetch_page_text(url, stop=job.token)
+        extract = partial(extract_keywords, priority=BULK, stop=job.token)
+        try:
+            for res in run_batch(rows, fetch, extract, workers, stop=job.token):
+                writer.write(res)
+                record_result(res, "LLM only", "batch")
+                job.partial.append(res)
+        finally:
+            writer.close()
+        job.token.check()
+        return len(job.partial)
+    # every upload runs on its own: a session deletes its results file when it starts the next one
+    return get_runner().submit(_key("batch", path), "batch", work)
+
+def submit_explanation(kws, question=None, memory=None, speculative=False):
+    """Streams the reply into ``job.partial``; the result is a chat message with timings.
+
+    With a sessmem ``memory``, the summary and recent turns go along as context;
+    the job resolves it again by sid and pins it while it runs.
+    The opening explanation (no question, empty memory) is keyed by the keyword
+    set alone, so a speculative one started at extraction is picked up by the chat.
+    """
+    def work(job):
+        summary, history = "", []
+        if memory is not None:
+            job.set_stage("summarizing")
+            with get_memory().pinned(memory.sid) as mem:
+                summary, history = mem.context(summarize_turns)
+            # the question being answered is already the latest turn
+            if history and history[-1]["role"] == "user" and history[-1]["text"] == question:
+                history = history[:-1]
+        job.set_stage("explaining")
+        job.partial = ""
+        t0, ttft = time.perf_counter(), None
+        # a speculative opening reply queues behind bulk work until a chat attaches to it
+        priority = lambda: BULK if job.speculative else INTERACTIVE
+        for chunk in explain_keywords_stream(kws, question, stop=job.token, summary=summary, history=history,
+                                             priority=priority):
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            job.partial += chunk
+        total = time.perf_counter() - t0
+        ttft  = ttft if ttft is not None else total
+        registry.observe("lexis_stage_seconds", ttft, stage="chat_ttft")
+        registry.observe("lexis_stage_seconds", total, stage="chat_total")
+        return {"role": "ai", "text": job.partial.strip(), "ttft": ttft, "total": total}
+    # a reply depends on the conversation so far, so only fresh conversations share jobs
+    context = None if memory is None or memory.empty else (memory.sid, memory.version)
+    return get_runner().submit(_key("explain", sorted(k["keyword"] for k in kws), question, context), "explain",
+                               work, speculative)
@@ -0,0 +1,97 @@
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_BARE_KEY       = re.compile(r'([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)\s*:')
+_SINGLE_QUOTED  = re.compile(r"'((?:[^'\\]|\\.)*)'")
+
+
+def _loads_lenient(raw):
+    """json.loads, then a few repairs for common model slips"""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    fixed = _TRAILING_COMMA.sub(r"\1", raw)
+    fixed = _BARE_KEY.sub(r'\1"\2":', fixed)
+    if '"' not in fixed:
+        fixed = _SINGLE_QUOTED.sub(lambda m: json.dumps(m.group(1)), fixed)
+    try:
+        return json.loads(fixed)
+    except ValueError:
+        return None
+
+def _valid_row(obj):
+    if not isinstance(obj, dict) or not str(obj.get("keyword", "")).strip():
+        return None
+    try:
+        score = float(obj.get("score", 0))
+    except (TypeError, ValueError):
+        score = 0.0
+    return {"keyword": str(obj["keyword"]).strip(), "score": max(0.0, min(1.0, score))}
+
+
+class KeywordStreamParser:
+    """Resumable parser that pulls complete ``{"keyword","score"}`` objects out
+    of a streamed JSON array.
+
+    Prose or code fences around the array are skipped, and an object that fails
+    to parse is dropped on its own instead of sinking the whole response. Only
+    the unfinished object is buffered between ``feed`` calls.
+    """
+
+    def __init__(self):
+        self._buf     = ""
+        self._depth   = 0
+        self._in_str  = False
+        self._escape  = False
+        self._start   = None
+        self.rows     = []
+
+    def feed(self, text):
+        """Consume more text; returns the rows completed by it"""
+        new   = []
+        base  = len(self._buf)
+        self._buf += text
+        for i in range(base, len(self._buf)):
+            ch = self._buf[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"' and self._depth:
+                self._in_str = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    row = _valid_row(_loads_lenient(self._buf[self._start:i + 1]))
+                    if row is not None:
+                        new.append(row)
+                    self._start = None
+        # keep only what an unfinished object still needs
+        if self._start is None:
+            self._buf = ""
+        else:
+            self._buf = self._buf[self._start:]
+            self._start = 0
+        self.rows.extend(new)
+        return new
+
+
+def parse_keywords_tolerant(content):
+    """Whole-response fallback: every well-formed row that can be salvaged"""
+    p = KeywordStreamParser()
+    p.feed(content)
+    return p.rows
+
+def valid_rows(items):
+    """The usable rows of an already-parsed list, cleaned like streamed ones"""
+    return [row for row in map(_valid_row, items) if row is not None]
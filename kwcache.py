@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ── DEFAULTS ─────────────────────────────────────────────────────────────────
+CACHE_DIR       = os.environ.get("LEXIS_CACHE_DIR", ".lexis_cache")
+MEM_MAX_ITEMS   = int(os.environ.get("LEXIS_CACHE_MEM_ITEMS", "512"))
+DISK_MAX_ITEMS  = int(os.environ.get("LEXIS_CACHE_DISK_ITEMS", "50000"))
+TTL_SECONDS     = int(os.environ.get("LEXIS_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different pastes share a key"""
+    return " ".join(text.split()).lower()
+
+
+def make_key(text, model, prompt_version):
+    h = hashlib.sha256()
+    for part in (prompt_version, model, normalize_text(text)):
+        h.update(part.encode("utf-8", errors="ignore"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class KeywordCache:
+    """Two-tier (in-process LRU → on-disk SQLite) cache for extraction results.
+
+    Values are JSON-serialisable; both tiers honour the same TTL. The disk tier
+    is trimmed to ``disk_max`` rows, oldest access first. An optional
+    ``shared`` statestore is consulted last, so replicas reuse each other's
+    results.
+    """
+
+    def __init__(self, path=None, mem_max=MEM_MAX_ITEMS, disk_max=DISK_MAX_ITEMS, ttl=TTL_SECONDS,
+                 shared=None):
+        self.path     = path or os.path.join(CACHE_DIR, "keywords.sqlite3")
+        self.mem_max  = mem_max
+        self.disk_max = disk_max
+        self.ttl      = ttl
+        self.shared   = shared
+        self._mem     = OrderedDict()
+        self._lock    = threading.Lock()
+        self.stats    = {"mem_hits": 0, "disk_hits": 0, "shared_hits": 0, "misses": 0, "sets": 0,
+                         "evictions": 0}
+        self._db      = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS kw_cache (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL,
+                created REAL NOT NULL, accessed REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS kw_cache_accessed ON kw_cache(accessed)")
+            self._db.commit()
+        except sqlite3.Error:
+            # disk tier is best-effort; fall back to memory only
+            self._db = None
+
+    # ── memory tier ──
+    def _mem_get(self, key, now):
+        item = self._mem.get(key)
+        if item is None:
+            return None
+        created, value = item
+        if now - created > self.ttl:
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        return value
+
+    def _mem_put(self, key, value, created):
+        self._mem[key] = (created, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_max:
+            self._mem.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ── public API ──
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            value = self._mem_get(key, now)
+            if value is not None:
+                self.stats["mem_hits"] += 1
+                return value
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM kw_cache WHERE key=?", (key,)).fetchone()
+                    if row and now - row[1] <= self.ttl:
+                        self._db.execute("UPDATE kw_cache SET accessed=? WHERE key=?", (now, key))
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._mem_put(key, value, row[1])
+                        self.stats["disk_hits"] += 1
+                        return value
+                    if row:
+                        self._db.execute("DELETE FROM kw_cache WHERE key=?", (key,))
+                        self._db.commit()
+                except (sqlite3.Error, ValueError):
+                    pass
+            if self.shared is None:
+                self.stats["misses"] += 1
+                return None
+        # network round trip, so outside the lock
+        value = self.shared.get("kw:" + key)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["shared_hits"] += 1
+        self._put_local(key, value, now)
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        self.stats["sets"] += 1
+        self._put_local(key, value, now)
+        if self.shared is not None:
+            self.shared.set("kw:" + key, value, ttl=self.ttl)
+
+    def _put_local(self, key, value, now):
+        with self._lock:
+            self._mem_put(key, value, now)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO kw_cache(key,value,created,accessed) VALUES (?,?,?,?)",
+                    (key, json.dumps(value), now, now))
+                self._evict_disk(now)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict_disk(self, now):
+        cur = self._db.execute("DELETE FROM kw_cache WHERE created < ?", (now - self.ttl,))
+        self.stats["evictions"] += max(cur.rowcount, 0)
+        (n,) = self._db.execute("SELECT COUNT(*) FROM kw_cache").fetchone()
+        if n > self.disk_max:
+            cur = self._db.execute(
+                "DELETE FROM kw_cache WHERE key IN "
+                "(SELECT key FROM kw_cache ORDER BY accessed ASC LIMIT ?)", (n - self.disk_max,))
+            self.stats["evictions"] += max(cur.rowcount, 0)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM kw_cache")
+                self._db.commit()
+
+    def snapshot(self):
+        """Counters plus tier sizes, for the stats panel"""
+        with self._lock:
+            s = dict(self.stats)
+            s["mem_items"] = len(self._mem)
+            s["disk_items"] = 0
+            if self._db is not None:
+                try:
+                    s["disk_items"] = self._db.execute("SELECT COUNT(*) FROM kw_cache").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        hits = s["mem_hits"] + s["disk_hits"] + s["shared_hits"]
+        total = hits + s["misses"]
+        s["hit_rate"] = hits / total if total else 0.0
+        return s
+
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide cache shared by every Streamlit session"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            from statestore import get_store
+            store = get_store()
+            _default = KeywordCache(shared=store if store.shared else None)
+        return _default
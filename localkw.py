@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before
+being below between both but by can can't cannot could couldn't did didn't do does doesn't doing
+don't down during each either etc even ever every few for from further get gets got had hadn't has
+hasn't have haven't having he he'd he'll he's her here here's hers herself him himself his how
+how's however i i'd i'll i'm i've if in into is isn't it it's its itself just let's like made make
+many may me might more most much must mustn't my myself neither no nor not now of off often on once
+one only or other ought our ours ourselves out over own per perhaps rather said same say says see
+seen shan't she she'd she'll she's should shouldn't since so some such than that that's the their
+theirs them themselves then there there's these they they'd they'll they're they've this those
+though through thus to too two under until up upon us use used using very via was wasn't we we'd
+we'll we're we've well were weren't what what's when when's where where's whether which while who
+who's whom whose why why's will with within without won't would wouldn't yet you you'd you'll
+you're you've your yours yourself yourselves new also within across among around along
+""".split())
+
+_TOKEN   = re.compile(r"[A-Za-z][A-Za-z0-9'+\-]*[A-Za-z0-9+]|[A-Za-z]")
+_BREAK   = re.compile(r"[.,;:!?()\[\]{}\"“”|/\\•·–—]+|\n")
+MAX_WORDS = 3
+
+
+def _candidates(text):
+    """RAKE-style phrases: runs of non-stopwords between stopwords/punctuation"""
+    phrases, positions = [], []
+    pos = 0
+    for segment in _BREAK.split(text):
+        run = []
+        for tok in _TOKEN.findall(segment):
+            pos += 1
+            low = tok.lower()
+            if low in STOPWORDS or len(low) < 2 or low.isdigit():
+                if run:
+                    phrases.append(run); positions.append(pos - len(run) - 1)
+                run = []
+                continue
+            run.append(low)
+            if len(run) == MAX_WORDS:
+                phrases.append(run); positions.append(pos - len(run))
+                run = []
+        if run:
+            phrases.append(run); positions.append(pos - len(run))
+    return phrases, positions, max(pos, 1)
+
+def extract_keywords_local(text, top_k=10):
+    """Score candidate phrases with vectorised RAKE degree/frequency, term
+    frequency and a YAKE-like early-position prior. Returns the same
+    ``[{"keyword","score"}]`` shape as the LLM extractor, best first.
+    """
+    phrases, positions, n_tokens = _candidates(text)
+    if not phrases:
+        return []
+    vocab = {}
+    ids   = np.full((len(phrases), MAX_WORDS), -1, dtype=np.int64)
+    for i, ph in enumerate(phrases):
+        for j, w in enumerate(ph):
+            ids[i, j] = vocab.setdefault(w, len(vocab))
+    mask  = ids >= 0
+    flat  = ids[mask]
+    lens  = mask.sum(axis=1)
+
+    # word frequency and RAKE degree (co-occurrence within a phrase, incl. itself)
+    freq   = np.bincount(flat, minlength=len(vocab)).astype(np.float64)
+    degree = np.bincount(flat, weights=np.repeat(lens, lens), minlength=len(vocab))
+    word_sc = degree / freq
+
+    # collapse duplicate phrases: per-phrase key → unique rows
+    keys, inverse, counts = np.unique(
+        np.where(mask, ids, -1), axis=0, return_inverse=True, return_counts=True)
+    inverse   = inverse.reshape(-1)
+    umask     = keys >= 0
+    rake      = np.where(umask, word_sc[np.where(umask, keys, 0)], 0.0).sum(axis=1)
+    first_pos = np.full(len(keys), np.inf)
+    np.minimum.at(first_pos, inverse, np.asarray(positions, dtype=np.float64))
+    position  = 1.0 / np.log2(2.0 + first_pos / max(n_tokens / 50.0, 1.0))
+    tf        = np.log1p(counts)
+
+    score = rake * tf * (0.5 + position)
+    # single generic words are rarely the best keyword; favour 2–3 word phrases slightly
+    score *= np.where(umask.sum(axis=1) > 1, 1.15, 1.0)
+    order = np.argsort(-score)[:top_k]
+    if not len(order):
+        return []
+    top  = score[order]
+    norm = 0.35 + 0.62 * (top - top.min()) / (top.max() - top.min() or 1.0)
+    inv_vocab = np.array(list(vocab), dtype=object)
+    return [{"keyword": " ".join(inv_vocab[keys[r][umask[r]]]), "score": round(float(s), 2)}
+            for r, s in zip(order, norm)]
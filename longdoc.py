@@ -0,0 +1,113 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cancel import CancelToken
+
+# ~4 chars per token for English; keeps each chunk inside extract_keywords' 6000-char window
+CHARS_PER_TOKEN  = 4
+CHUNK_TOKENS     = 1500
+MAX_CHUNKS       = int(os.environ.get("LEXIS_LONGDOC_MAX_CHUNKS", "40"))
+LONGDOC_WORKERS  = int(os.environ.get("LEXIS_LONGDOC_WORKERS", "4"))
+LONGDOC_BUDGET_S = float(os.environ.get("LEXIS_LONGDOC_BUDGET", "25"))
+LONG_DOC_CHARS   = CHUNK_TOKENS * CHARS_PER_TOKEN * MAX_CHUNKS
+
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_chunks(text, max_tokens=CHUNK_TOKENS):
+    """Pack sentences into chunks of at most ``max_tokens`` (estimated)"""
+    budget = max_tokens * CHARS_PER_TOKEN
+    chunks, cur, size = [], [], 0
+    for sent in _SENT_SPLIT.split(text):
+        sent = sent.strip()
+        if not sent:
+            continue
+        # a single run-on "sentence" longer than the budget is hard-split
+        while len(sent) > budget:
+            if cur:
+                chunks.append(" ".join(cur)); cur, size = [], 0
+            chunks.append(sent[:budget])
+            sent = sent[budget:]
+        if size + len(sent) + 1 > budget and cur:
+            chunks.append(" ".join(cur)); cur, size = [], 0
+        cur.append(sent)
+        size += len(sent) + 1
+    if cur:
+        chunks.append(" ".join(cur))
+    return chunks
+
+def _norm(kw):
+    kw = " ".join(str(kw).lower().split())
+    # fold simple plurals so "model" and "models" merge
+    if len(kw) > 4 and kw.endswith("s") and not kw.endswith("ss"):
+        kw = kw[:-1]
+    return kw
+
+def merge_keywords(results, n_chunks, top_k=10):
+    """Reduce per-chunk keyword lists into one ranked list.
+
+    Score = 0.5 · best chunk score + 0.5 · mean score across all chunks, so a
+    keyword that is strong everywhere outranks one that spikes in one chunk.
+    """
+    agg = {}
+    for kws in results:
+        best = {}
+        for k in kws or []:
+            try:
+                word, sc = str(k["keyword"]).strip(), float(k.get("score", 0))
+            except (KeyError, TypeError, ValueError):
+                continue
+            key = _norm(word)
+            if key and (key not in best or sc > best[key][1]):
+                best[key] = (word, sc)
+        for key, (word, sc) in best.items():
+            a = agg.setdefault(key, {"forms": {}, "sum": 0.0, "max": 0.0, "df": 0})
+            a["forms"][word] = a["forms"].get(word, 0) + 1
+            a["sum"] += sc
+            a["max"]  = max(a["max"], sc)
+            a["df"]  += 1
+    n = max(n_chunks, 1)
+    ranked = sorted(
+        ({"keyword": max(a["forms"], key=a["forms"].get),
+          "score": round(0.5 * a["max"] + 0.5 * a["sum"] / n, 4),
+          "chunks": a["df"]} for a in agg.values()),
+        key=lambda k: (-k["score"], -k["chunks"]))
+    return ranked[:top_k]
+
+def map_reduce_keywords(text, extract, workers=LONGDOC_WORKERS, budget_s=LONGDOC_BUDGET_S,
+                        max_tokens=CHUNK_TOKENS, top_k=10):
+    """Extract keywords from every chunk in parallel, then merge.
+
+    ``extract(chunk, deadline)`` must call ``deadline.check()`` before each
+    LLM request: the token is set when ``budget_s`` expires, so chunks still
+    queued or waiting to send give up instead of spending quota on a result
+    nobody reads. The merge uses whatever finished. Returns (keywords, info).
+    """
+    t0     = time.perf_counter()
+    chunks = split_chunks(text, max_tokens)[:MAX_CHUNKS]
+    info   = {"chunks": len(chunks), "done": 0, "failed": 0, "timed_out": 0, "seconds": 0.0}
+    if not chunks:
+        return [], info
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix="lexis-map")
+    deadline = CancelToken()
+    futs = [pool.submit(extract, c, deadline) for c in chunks]
+    done, pending = wait(futs, timeout=budget_s)
+    deadline.set()
+    pool.shutdown(wait=False, cancel_futures=True)
+    results = []
+    for f in done:
+        if f.exception() is None:
+            results.append(f.result())
+        else:
+            info["failed"] += 1
+    info["done"]      = len(results)
+    info["timed_out"] = len(pending)
+    info["seconds"]   = round(time.perf_counter() - t0, 2)
+    if not results and info["failed"]:
+        raise next(f.exception() for f in done if f.exception() is not None)
+    return merge_keywords(results, len(results), top_k), info
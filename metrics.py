@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# seconds; covers sub-ms rendering up to slow upstream calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# bytes; rendered HTML per script or fragment run
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+METRICS_FILE = os.environ.get("LEXIS_METRICS_FILE")
+METRICS_PORT = os.environ.get("LEXIS_METRICS_PORT")
+
+
+def _escape(value):
+    """Label value escaped per the text exposition format (backslash, quote, newline)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1)
+        self.sum     = 0.0
+        self.count   = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum   += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound at quantile ``q`` (Prometheus-style estimate)"""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, c in zip(self.buckets + (float("inf"),), self.counts):
+            seen += c
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Process-wide histograms and counters keyed by (name, labels)"""
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self.hists     = {}
+        self.counters  = {}
+        self.gauges    = {}
+        self.help      = {}
+
+    def observe(self, name, value, buckets=BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self.hists.get(key)
+            if h is None:
+                h = self.hists[key] = Histogram(buckets)
+            h.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("lexis_stage_seconds", time.perf_counter() - t0, stage=stage)
+
+    def record_usage(self, model, usage):
+        """Add a completion's ``usage`` token counts"""
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens"):
+            n = getattr(usage, kind, None)
+            if n is None and isinstance(usage, dict):
+                n = usage.get(kind)
+            if n:
+                self.inc("lexis_llm_tokens_total", n, model=model, kind=kind.split("_")[0])
+
+    def stage_summary(self):
+        """[(stage, count, p50, p95, mean)] for the diagnostics panel"""
+        with self._lock:
+            items = [(dict(lbl).get("stage", ""), h) for (name, lbl), h in self.hists.items()
+                     if name == "lexis_stage_seconds"]
+            return sorted((stage, h.count, h.quantile(0.5), h.quantile(0.95),
+                           h.sum / h.count if h.count else 0.0) for stage, h in items)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        out = []
+        with self._lock:
+            seen = set()
+            for (name, lbl), h in sorted(self.hists.items()):
+                if name not in seen:
+                    out.append(f"# TYPE {name} histogram"); seen.add(name)
+                labels, acc = dict(lbl), 0
+                for bound, c in zip(h.buckets, h.counts):
+                    acc += c
+                    out.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {acc}")
+                out.append(f'{name}_bucket{_labels(dict(labels, le="+Inf"))} {h.count}')
+                out.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+                out.append(f"{name}_count{_labels(labels)} {h.count}")
+            for kind, table in (("counter", self.counters), ("gauge", self.gauges)):
+                for (name, lbl), v in sorted(table.items()):
+                    if name not in seen:
+                        out.append(f"# TYPE {name} {kind}"); seen.add(name)
+                    out.append(f"{name}{_labels(dict(lbl))} {v}")
+        return "\n".join(out) + "\n"
+
+    def write_file(self, path=None):
+        path = path or METRICS_FILE
+        if not path:
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            fh.write(self.render())
+        os.replace(tmp, path)
+
+
+registry = Registry()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(port=None):
+    """Serve /metrics on a side port (LEXIS_METRICS_PORT); returns the server or None"""
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="lexis-metrics").start()
+    return server
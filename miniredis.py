@@ -0,0 +1,133 @@
+"""Local Redis-compatible stand-in for development and tests of multi-replica setups.
+
+Implements the RESP2 subset statestore.RedisStore uses (PING, AUTH, SELECT,
+GET, SET [EX|PX|NX|XX], DEL, EXISTS, EXPIRE, TTL, FLUSHDB, DBSIZE). Data is
+kept in memory only.
+
+    python miniredis.py --port 6379
+    LEXIS_STATE_URL=redis://127.0.0.1:6379/0 streamlit run app.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from statestore import RespError, read_reply
+
+
+class Keyspace:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dbs  = {}
+
+    def db(self, n):
+        return self._dbs.setdefault(n, {})
+
+    def _live(self, db, key):
+        item = db.get(key)
+        if item is not None and item[1] is not None and time.time() >= item[1]:
+            del db[key]
+            return None
+        return item
+
+    def execute(self, state, args):
+        cmd  = args[0].decode().upper()
+        rest = args[1:]
+        with self._lock:
+            db = self.db(state["db"])
+            if cmd == "PING":
+                return rest[0] if rest else "PONG"
+            if cmd in ("AUTH", "CLIENT", "HELLO"):
+                return "OK"
+            if cmd == "SELECT":
+                state["db"] = int(rest[0])
+                return "OK"
+            if cmd == "GET":
+                item = self._live(db, rest[0])
+                return item[0] if item else None
+            if cmd == "SET":
+                key, value, opts = rest[0], rest[1], [o.decode().upper() for o in rest[2:]]
+                expires = None
+                for flag, scale in (("EX", 1.0), ("PX", 0.001)):
+                    if flag in opts:
+                        expires = time.time() + float(opts[opts.index(flag) + 1]) * scale
+                exists = self._live(db, key) is not None
+                if ("NX" in opts and exists) or ("XX" in opts and not exists):
+                    return None
+                db[key] = (value, expires)
+                return "OK"
+            if cmd == "DEL":
+                return sum(1 for k in rest if self._live(db, k) is not None and db.pop(k, None) is not None)
+            if cmd == "EXISTS":
+                return sum(1 for k in rest if self._live(db, k) is not None)
+            if cmd == "EXPIRE":
+                item = self._live(db, rest[0])
+                if item is None:
+                    return 0
+                db[rest[0]] = (item[0], time.time() + float(rest[1]))
+                return 1
+            if cmd == "TTL":
+                item = self._live(db, rest[0])
+                if item is None:
+                    return -2
+                return -1 if item[1] is None else int(item[1] - time.time())
+            if cmd == "FLUSHDB":
+                db.clear()
+                return "OK"
+            if cmd == "DBSIZE":
+                return len(db)
+        raise RespError(f"ERR unknown command '{cmd}'")
+
+
+def encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = {"db": 0}
+        while True:
+            try:
+                args = read_reply(self.rfile)
+            except (ConnectionError, ValueError, RespError):
+                return
+            if not isinstance(args, list) or not args:
+                self.wfile.write(encode_reply(RespError("ERR protocol error")))
+                return
+            try:
+                reply = self.server.keyspace.execute(state, args)
+            except RespError as e:
+                reply = e
+            except (IndexError, ValueError):
+                reply = RespError("ERR syntax error")
+            self.wfile.write(encode_reply(reply))
+
+
+class MiniRedis(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, addr):
+        super().__init__(addr, _Handler)
+        self.keyspace = Keyspace()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="In-memory Redis-compatible server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6379)
+    args = ap.parse_args()
+    server = MiniRedis((args.host, args.port))
+    print(f"miniredis listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,158 @@
+"""Near-duplicate lookup over previously analyzed documents.
+
+Each document gets a MinHash signature over its word 3-gram shingles,
+split into ``BANDS`` bands of ``ROWS`` values (LSH). Documents whose
+shingle sets overlap well share at least one band with near certainty,
+while unrelated ones almost never do, so a lookup is one indexed SQLite
+probe for the band keys plus a signature comparison on the handful of
+true candidates. That cost does not grow with the number of documents
+stored, and stays well under a millisecond at millions.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from kwcache import CACHE_DIR
+
+# estimated Jaccard similarity of shingle sets; a changed timestamp, tracking
+# footer or rotated ad block on a 6000-character page stays around 0.95
+THRESHOLD = float(os.environ.get("LEXIS_NEARDUP_THRESHOLD", "0.85"))
+MAX_ITEMS = int(os.environ.get("LEXIS_NEARDUP_ITEMS", "1000000"))
+# 10 bands x 6 rows: a pair at J=0.8 becomes a candidate 95% of the time, at 0.9 >99.9%
+BANDS     = 10
+ROWS      = 6
+MIN_WORDS = 40
+SHINGLE   = 3
+TOKEN_RE  = re.compile(r"\w+")
+PRIME     = (1 << 32) - 5
+
+_rng    = np.random.default_rng(0x1E715)
+_PERM_A = _rng.integers(1, PRIME, BANDS * ROWS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, PRIME, BANDS * ROWS, dtype=np.uint64)
+
+
+def _h64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+def _signed(x):
+    """SQLite integers are signed 64-bit"""
+    return x - (1 << 64) if x >= 1 << 63 else x
+
+
+def minhash(text):
+    """uint32 MinHash signature of ``text``, or None when it is too short to fingerprint reliably"""
+    words = TOKEN_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    h = np.fromiter((_h64(s.encode("utf-8", errors="ignore")) & 0xFFFFFFFF for s in shingles),
+                    dtype=np.uint64, count=len(shingles))
+    # (a*h + b) mod p stays below 2**64 because a, b < p < 2**32 and h < 2**32
+    return ((np.outer(h, _PERM_A) + _PERM_B) % PRIME).min(axis=0).astype(np.uint32)
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+class NearDupIndex:
+    """MinHash signatures of analyzed documents and their keywords, by namespace.
+
+    ``ns`` separates results that must not be mixed (engine, model, prompt
+    version). The oldest documents are dropped beyond ``max_items``.
+    """
+
+    def __init__(self, path=None, threshold=THRESHOLD, max_items=MAX_ITEMS):
+        self.path      = path or os.path.join(CACHE_DIR, "neardup.sqlite3")
+        self.threshold = threshold
+        self.max_items = max_items
+        self._lock     = threading.Lock()
+        self._adds     = 0
+        self.stats     = {"lookups": 0, "candidates": 0, "hits": 0, "adds": 0, "evictions": 0}
+        self._db       = None
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS neardup (
+                id INTEGER PRIMARY KEY, ns TEXT NOT NULL, sig BLOB NOT NULL,
+                value TEXT NOT NULL, created REAL NOT NULL)""")
+            self._db.execute("CREATE TABLE IF NOT EXISTS neardup_band (bkey INTEGER NOT NULL, doc INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS neardup_band_key ON neardup_band(bkey)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS neardup_band_doc ON neardup_band(doc)")
+            self._db.commit()
+        except sqlite3.Error:
+            # best-effort, like the keyword cache: without a db every lookup misses
+            self._db = None
+
+    @staticmethod
+    def _band_keys(sig, ns):
+        prefix = ns.encode() + b"\x00"
+        return [_signed(_h64(prefix + bytes([i]) + sig[i * ROWS:(i + 1) * ROWS].tobytes()))
+                for i in range(BANDS)]
+
+    def lookup(self, sig, ns):
+        """(value, similarity) of the most similar stored document at or above the threshold, or None"""
+        if self._db is None:
+            return None
+        keys = self._band_keys(sig, ns)
+        with self._lock:
+            self.stats["lookups"] += 1
+            try:
+                rows = self._db.execute(
+                    f"SELECT DISTINCT d.id, d.sig FROM neardup_band b JOIN neardup d ON d.id = b.doc "
+                    f"WHERE b.bkey IN ({','.join('?' * len(keys))}) AND d.ns = ?", (*keys, ns)).fetchall()
+                self.stats["candidates"] += len(rows)
+                best = max(((similarity(sig, np.frombuffer(s, dtype=np.uint32)), doc) for doc, s in rows),
+                           default=None)
+                if best is None or best[0] < self.threshold:
+                    return None
+                (value,) = self._db.execute("SELECT value FROM neardup WHERE id = ?", (best[1],)).fetchone()
+            except (sqlite3.Error, TypeError):
+                return None
+            self.stats["hits"] += 1
+        return json.loads(value), best[0]
+
+    def add(self, sig, ns, value):
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                cur = self._db.execute("INSERT INTO neardup(ns, sig, value, created) VALUES (?,?,?,?)",
+                                       (ns, sig.tobytes(), json.dumps(value), time.time()))
+                self._db.executemany("INSERT INTO neardup_band(bkey, doc) VALUES (?,?)",
+                                     [(k, cur.lastrowid) for k in self._band_keys(sig, ns)])
+                self.stats["adds"] += 1
+                self._adds += 1
+                if self._adds % 1000 == 0:
+                    self._evict()
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self):
+        (n, top) = self._db.execute("SELECT COUNT(*), MAX(id) FROM neardup").fetchone()
+        if n <= self.max_items:
+            return
+        cutoff = top - self.max_items
+        self._db.execute("DELETE FROM neardup_band WHERE doc <= ?", (cutoff,))
+        cur = self._db.execute("DELETE FROM neardup WHERE id <= ?", (cutoff,))
+        self.stats["evictions"] += max(cur.rowcount, 0)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """Process-wide index shared by every session"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex()
+        return _index
@@ -0,0 +1,394 @@
+import json
+import os
+import re
+import threading
+import time
+
+from groq import Groq
+
+from cancel import Cancelled
+from corpus import get_corpus
+from fetcher import READ_CHARS, TEXT_CHARS, fetch_page_text
+from httpclient import get_client as get_http_client
+from jsonstream import KeywordStreamParser, parse_keywords_tolerant, valid_rows
+from kwcache import get_cache, make_key
+from localkw import extract_keywords_local
+from longdoc import LONG_DOC_CHARS, estimate_tokens, map_reduce_keywords
+from metrics import registry
+from neardup import get_index, minhash
+from router import ModelRouter
+from salience import budget_input, budget_note, drop_boilerplate, split_sentences
+from scheduler import INTERACTIVE, GroqScheduler
+from sessmem import get_memory
+from statestore import get_store
+
+EXTRACT_MODEL  = "llama-3.1-8b-instant"
+EXPLAIN_MODEL  = "llama-3.1-8b-instant"
+# bump whenever the extraction prompt changes so stale cache entries are skipped
+PROMPT_VERSION = "v1"
+# bump whenever the span the near-duplicate signature covers (or what is sent for it) changes
+SIG_VERSION    = "s2"
+
+HYBRID_CANDIDATES = 25
+ENGINES = ["LLM only", "Hybrid", "Local only"]
+
+_llm      = None
+_llm_lock = threading.Lock()
+
+
+def get_llm(api_key=None):
+    """One router/scheduler per process so rate limits, coalescing and latency stats span all callers"""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            api_key = api_key or os.environ.get("GROQ_API_KEY")
+            if not api_key:
+                raise RuntimeError("GROQ_API_KEY is not set")
+            # the scheduler owns retries, so the SDK's own retry loop is disabled
+            _llm = ModelRouter(GroqScheduler(Groq(api_key=api_key, max_retries=0)))
+        return _llm
+
+
+# ── EXTRACTION ───────────────────────────────────────────────────────────────
+def parse_json_array(content):
+    """Keyword rows from model output; rows without a keyword are dropped, scores clamped to 0-1"""
+    cleaned = re.sub(r'```json|```','', content)
+    try:
+        kws = json.loads(cleaned)
+    except ValueError:
+        kws = None
+    if isinstance(kws, list):
+        rows = valid_rows(kws)
+        if kws and not rows:
+            raise ValueError("no keyword rows in model output")
+        return rows
+    # salvage whatever complete rows there are rather than losing them all
+    kws = parse_keywords_tolerant(content)
+    if not kws:
+        raise ValueError("no keyword rows in model output")
+    return kws
+
+def complete_json(prompt, key, priority=INTERACTIVE, gate=None, stop=None):
+    """Cached JSON completion on the extraction model; ``gate()`` runs before a request goes out.
+
+    A set ``stop`` token cancels the request while it waits on rate limits or backoff.
+    """
+    cache = get_cache()
+    hit   = cache.get(key)
+    if hit is not None:
+        return hit
+    if gate is not None:
+        gate()
+    kws = get_llm().complete(
+        priority, parse=parse_json_array, token=stop,
+        model=EXTRACT_MODEL,
+        messages=[{"role":"user","content":prompt}],
+        temperature=0.2, max_tokens=800
+    ).value
+    cache.set(key, kws)
+    return kws
+
+def extraction_prompt(text):
+    return f"""Extract top 10 important keywords from the following text.
+Return ONLY a JSON array. No explanation. No markdown. Example:
+[{{"keyword":"example","score":0.95}}]
+
+TEXT:
+{text}"""
+
+def extract_keywords(text, priority=INTERACTIVE, gate=None, stop=None):
+    text = budget_input(text)[0]
+    key  = make_key(text, EXTRACT_MODEL, PROMPT_VERSION)
+    return complete_json(extraction_prompt(text), key, priority, gate, stop)
+
+def extract_keywords_json_mode(text, stop=None):
+    """Non-streaming retry using the API's JSON object mode"""
+    text = budget_input(text)[0]
+    prompt = f"""Extract top 10 important keywords from the following text.
+Return a JSON object of the form {{"keywords":[{{"keyword":"example","score":0.95}}]}}.
+
+TEXT:
+{text}"""
+    return get_llm().complete(
+        INTERACTIVE, parse=lambda c: parse_json_array(json.dumps(json.loads(c).get("keywords", []))), token=stop,
+        model=EXTRACT_MODEL,
+        messages=[{"role":"user","content":prompt}],
+        temperature=0.2, max_tokens=800, response_format={"type":"json_object"}
+    ).value
+
+def extract_keywords_stream(text, stop=None):
+    """Yield the growing keyword list as each JSON row completes in the stream.
+
+    Groq's JSON mode can't be combined with streaming, so rows come from a
+    tolerant incremental parser; if it salvages nothing, one JSON-mode call
+    is made instead. A set ``stop`` token closes the stream at the next chunk.
+    """
+    text  = budget_input(text)[0]
+    cache = get_cache()
+    key   = make_key(text, EXTRACT_MODEL, PROMPT_VERSION)
+    hit   = cache.get(key)
+    if hit is not None:
+        yield hit
+        return
+    parser = KeywordStreamParser()
+    stream = get_llm().stream(
+        INTERACTIVE, token=stop,
+        model=EXTRACT_MODEL,
+        messages=[{"role":"user","content":extraction_prompt(text)}],
+        temperature=0.2, max_tokens=800
+    )
+    try:
+        for chunk in stream:
+            if stop is not None:
+                stop.check()
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                registry.record_usage(EXTRACT_MODEL, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if parser.feed(chunk.choices[0].delta.content):
+                    yield list(parser.rows)
+    finally:
+        stream.close()
+    kws = parser.rows or extract_keywords_json_mode(text, stop)
+    if not parser.rows:
+        yield kws
+    cache.set(key, kws)
+
+def rerank_keywords(text, candidates, priority=INTERACTIVE, gate=None, stop=None):
+    """Let the LLM pick and score the top 10 from a short local candidate list"""
+    cand_list = "\n".join(c["keyword"] for c in candidates)
+    excerpt   = text[:800]
+    prompt = f"""Below are candidate keywords found in a document, followed by its opening lines.
+Pick the 10 candidates that best capture what the document is about and score each from 0 to 1.
+Use the candidates verbatim. Return ONLY a JSON array. No explanation. No markdown. Example:
+[{{"keyword":"example","score":0.95}}]
+
+CANDIDATES:
+{cand_list}
+
+OPENING:
+{excerpt}"""
+    return complete_json(prompt, make_key(excerpt + "\n" + cand_list, EXTRACT_MODEL, "rerank-" + PROMPT_VERSION),
+                         priority, gate, stop)
+
+def analyze(text, long_mode=False, engine="LLM only", priority=INTERACTIVE, on_rows=None, stop=None, gate=None):
+    """Keywords for ``text`` with the selected engine; returns (kws, note).
+
+    LLM mode map-reduces over chunks in full-document mode. With ``on_rows``,
+    short LLM extractions stream and the callback gets the growing list.
+    ``note`` is a one-line remark for the caller to show, or None. A set
+    ``stop`` token raises Cancelled before any further LLM call. ``gate()``,
+    if given, runs before every non-streamed LLM request (batch rate limiting).
+
+    LLM-backed engines first look for a near-duplicate of the analyzed text
+    (neardup) and reuse its keywords, saying so in the note. A reuse counts
+    the original analysis' prompt tokens and seconds as saved.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    if engine == "Local only":
+        if stop is not None:
+            stop.check()
+        return extract_keywords_local(text), None
+    t0 = time.perf_counter()
+    long_doc = long_mode and len(text) > TEXT_CHARS
+    ns = f"{engine}|{'long' if long_doc else 'short'}|{EXTRACT_MODEL}|{PROMPT_VERSION}|{SIG_VERSION}"
+    sig = minhash(text if long_doc else text[:READ_CHARS])
+    if sig is not None:
+        hit = get_index().lookup(sig, ns)
+        registry.inc("lexis_neardup_lookups", hit="yes" if hit else "no")
+        if hit is not None:
+            entry, similarity = hit
+            # entries written before costs were stored are a bare keyword list
+            if isinstance(entry, list):
+                entry = {"keywords": entry}
+            kws = entry["keywords"]
+            registry.inc("lexis_input_tokens", entry.get("tokens", 0), kind="saved")
+            registry.inc("lexis_neardup_saved_seconds", entry.get("seconds", 0.0))
+            registry.observe("lexis_analyze_seconds", time.perf_counter() - t0, engine=engine, source="neardup")
+            if on_rows is not None:
+                on_rows(kws)
+            return kws, f"♻ Reused keywords from a near-identical document ({similarity:.0%} similar)."
+    kws, note, complete, tokens = _analyze(text, long_doc, engine, priority, on_rows, stop, gate)
+    seconds = time.perf_counter() - t0
+    registry.observe("lexis_analyze_seconds", seconds, engine=engine, source="llm")
+    # degraded results (fallbacks, failed chunks) are not worth handing to look-alikes
+    if sig is not None and complete and kws:
+        get_index().add(sig, ns, {"keywords": kws, "tokens": tokens, "seconds": round(seconds, 3)})
+    return kws, note
+
+def _analyze(text, long_doc, engine, priority, on_rows, stop, gate=None):
+    """analyze() for the LLM-backed engines; returns (kws, note, complete, tokens).
+
+    ``tokens`` estimates the prompt tokens the extraction sent.
+    """
+    check = stop.check if stop is not None else (lambda: None)
+    check()
+    if engine == "Hybrid":
+        cands = extract_keywords_local(text, top_k=HYBRID_CANDIDATES)
+        if not cands:
+            return [], None, False, 0
+        try:
+            kws = rerank_keywords(text, cands, priority, gate, stop)
+            return kws, None, True, estimate_tokens(text[:800] + "".join(c["keyword"] for c in cands))
+        except Cancelled:
+            raise
+        except Exception as e:
+            check()
+            return cands[:10], f"LLM re-rank unavailable ({type(e).__name__}); showing local keywords.", False, 0
+    if not long_doc:
+        # extract_keywords budgets its input too; on already-budgeted text that is a no-op
+        text, info = budget_input(text)
+        note = budget_note(info)
+        if on_rows is None:
+            return extract_keywords(text, priority, gate, stop), note, True, info["tokens_out"]
+        kws = []
+        for kws in extract_keywords_stream(text, stop):
+            on_rows(kws)
+        return kws, note, True, info["tokens_out"]
+    # menus and footers repeated through a long document would otherwise be in every chunk
+    # (unless that is all there is: a document of nothing but repeats is still analyzed as is)
+    text = "\n".join(drop_boilerplate(split_sentences(text))[0]) or text
+    def extract_chunk(chunk, deadline):
+        def before_request():
+            if gate is not None:
+                gate()
+            # a rate-limit wait can outlast the map-reduce budget
+            deadline.check()
+            check()
+        return extract_keywords(chunk, priority, before_request, stop)
+    kws, info = map_reduce_keywords(text, extract_chunk)
+    check()
+    note = f"Analyzed {info['done']}/{info['chunks']} chunks in {info['seconds']}s"
+    complete = not (info["timed_out"] or info["failed"])
+    if not complete:
+        note += f" · {info['timed_out']} timed out · {info['failed']} failed"
+    return kws, note, complete, estimate_tokens(text)
+
+def analyze_url(url, long_mode=False, engine="LLM only", priority=INTERACTIVE, on_rows=None, stop=None,
+                on_stage=None):
+    """Fetch, clean and analyze a page; raises PageRejected for unusable pages"""
+    with registry.span("url_total"):
+        plain = fetch_page_text(url, max_chars=LONG_DOC_CHARS if long_mode else READ_CHARS,
+                                stop=stop, on_stage=on_stage)
+        if on_stage is not None:
+            on_stage("extracting")
+        return analyze(plain, long_mode, engine, priority, on_rows, stop)
+
+
+# ── EXPLANATION ──────────────────────────────────────────────────────────────
+HISTORY_TURN_CHARS = 2000
+
+def explain_messages(kws, user_question=None, summary="", history=()):
+    """Chat messages for an explanation; ``summary`` and ``history`` carry earlier turns"""
+    kw_list = ", ".join(k["keyword"] for k in kws)
+    q = user_question or f"Explain why these keywords are significant and what themes they reveal: {kw_list}"
+    messages = [{"role":"system","content":"You are LEXIS, an expert in text analysis and keyword intelligence. Be insightful, concise, and conversational."}]
+    if summary:
+        messages.append({"role":"system","content":f"Summary of the earlier conversation: {summary}"})
+    for turn in history:
+        messages.append({"role":"user" if turn["role"] == "user" else "assistant",
+                         "content":turn["text"][:HISTORY_TURN_CHARS]})
+    messages.append({"role":"user","content":f"The extracted keywords are: {kw_list}\n\n{q}"})
+    return messages
+
+def explain_cache_key(kws, user_question=None, summary="", history=()):
+    """Cache key for the opening explanation, which depends only on the keyword set; None otherwise"""
+    if user_question or summary or history:
+        return None
+    return make_key("\n".join(sorted(k["keyword"] for k in kws)), EXPLAIN_MODEL, "explain-" + PROMPT_VERSION)
+
+def explain_keywords(kws, user_question=None, priority=INTERACTIVE, summary="", history=()):
+    key = explain_cache_key(kws, user_question, summary, history)
+    hit = get_cache().get(key) if key else None
+    if hit is not None:
+        return hit
+    text = get_llm().complete(
+        priority,
+        model=EXPLAIN_MODEL,
+        messages=explain_messages(kws, user_question, summary, history),
+        temperature=0.6, max_tokens=600
+    ).value
+    if key and text.strip():
+        get_cache().set(key, text.strip())
+    return text
+
+def explain_keywords_stream(kws, user_question=None, stop=None, summary="", history=(), priority=INTERACTIVE):
+    """Same as explain_keywords but yields text chunks as the model produces them.
+
+    ``priority`` may be a callable (see GroqScheduler.stream).
+    """
+    key = explain_cache_key(kws, user_question, summary, history)
+    hit = get_cache().get(key) if key else None
+    if hit is not None:
+        yield hit
+        return
+    parts  = []
+    stream = get_llm().stream(
+        priority, token=stop,
+        model=EXPLAIN_MODEL,
+        messages=explain_messages(kws, user_question, summary, history),
+        temperature=0.6, max_tokens=600
+    )
+    try:
+        for chunk in stream:
+            if stop is not None:
+                stop.check()
+            # Groq reports usage on the final chunk under x_groq
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                registry.record_usage(EXPLAIN_MODEL, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+    finally:
+        stream.close()
+    # only a reply that streamed to the end, and said something, is cached
+    reply = "".join(parts).strip()
+    if key and reply:
+        get_cache().set(key, reply)
+
+def summarize_turns(summary, turns, priority=INTERACTIVE):
+    """Fold older chat turns into a running summary of at most a short paragraph"""
+    transcript = "\n".join(f"{'User' if t['role'] == 'user' else 'LEXIS'}: {t['text'][:HISTORY_TURN_CHARS]}"
+                            for t in turns)
+    prompt = f"""Update the summary of a conversation about extracted keywords with the new turns below.
+Keep the user's questions, the conclusions reached and anything they asked to remember.
+Return ONLY the updated summary, at most 120 words.
+
+SUMMARY SO FAR:
+{summary or "(none)"}
+
+NEW TURNS:
+{transcript}"""
+    return get_llm().complete(
+        priority,
+        model=EXPLAIN_MODEL,
+        messages=[{"role":"user","content":prompt}],
+        temperature=0.2, max_tokens=250
+    ).value.strip()
+
+
+# ── DIAGNOSTICS ──────────────────────────────────────────────────────────────
+def publish_gauges():
+    """Copy cache/http/scheduler counters into the metrics registry as gauges"""
+    for k, v in get_cache().snapshot().items():
+        registry.set("lexis_kwcache", v, stat=k)
+    for k, v in get_http_client().stats.items():
+        registry.set("lexis_http", v, stat=k)
+    for k, v in get_store().stats.items():
+        registry.set("lexis_state", v, stat=k)
+    for k, v in get_index().stats.items():
+        registry.set("lexis_neardup", v, stat=k)
+    for k, v in get_corpus().snapshot().items():
+        registry.set("lexis_corpus", v, stat=k)
+    usage = get_memory().usage()
+    per_session = usage.pop("per_session")
+    usage["max_session_bytes"] = max(per_session.values(), default=0)
+    for k, v in usage.items():
+        registry.set("lexis_session_memory", v, stat=k)
+    if _llm is not None:
+        for k, v in _llm.llm.stats.items():
+            registry.set("lexis_scheduler", v, stat=k)
+        for k, v in _llm.stats.items():
+            registry.set("lexis_router", v, stat=k)
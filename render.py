@@ -0,0 +1,74 @@
+from html import escape
+
+def score_to_accuracy(score):
+    """Convert 0-1 score to accuracy percentage with label"""
+    pct = round(score * 100, 1)
+    if score >= 0.75:
+        cls = "high"
+    elif score >= 0.45:
+        cls = "mid"
+    else:
+        cls = "low"
+    return pct, cls
+
+def render_kw_cards(kws):
+    """Keyword rows as HTML; keywords come from the LLM or the shared corpus, so they are escaped"""
+    html = ""
+    for i, k in enumerate(kws):
+        rc    = f"r{min(i,9)}"
+        score = float(k.get("score", 0))
+        pct   = int(score * 100)
+        acc_pct, acc_cls = score_to_accuracy(score)
+        html += f"""
+<div class="kw-row {rc}">
+  <span class="kw-num">#{i+1:02d}</span>
+  <span class="kw-word">{escape(str(k['keyword']))}</span>
+  <div class="kw-bar-wrap">
+    <div class="kw-bar-bg"><div class="kw-bar-fill" style="width:{pct}%"></div></div>
+    <span class="kw-sc">{score:.2f}</span>
+  </div>
+  <span class="kw-acc {acc_cls}">{acc_pct}%</span>
+</div>"""
+    return html
+
+def render_accuracy_summary(kws):
+    """Render accuracy metrics summary bar above results"""
+    scores   = [float(k.get("score", 0)) for k in kws]
+    avg_acc  = round(sum(scores) / len(scores) * 100, 1)
+    high_ct  = sum(1 for s in scores if s >= 0.75)
+    top_acc  = round(max(scores) * 100, 1)
+    # confidence formula: ratio of high-accuracy keywords
+    conf_pct = round((high_ct / len(scores)) * 100, 1)
+
+    return f"""
+<div class="acc-summary">
+  <div class="acc-stat">
+    <div class="acc-stat-val c-blue">{top_acc}%</div>
+    <div class="acc-stat-lbl">Peak Accuracy</div>
+  </div>
+  <div class="acc-divider"></div>
+  <div class="acc-stat">
+    <div class="acc-stat-val c-cyan">{avg_acc}%</div>
+    <div class="acc-stat-lbl">Avg Accuracy</div>
+  </div>
+  <div class="acc-divider"></div>
+  <div class="acc-stat">
+    <div class="acc-stat-val c-green">{high_ct}/{len(scores)}</div>
+    <div class="acc-stat-lbl">High Confidence</div>
+  </div>
+  <div class="acc-divider"></div>
+  <div class="acc-stat">
+    <div class="acc-stat-val c-violet">{conf_pct}%</div>
+    <div class="acc-stat-lbl">Confidence Rate</div>
+  </div>
+</div>"""
+
+def render_chat_msg(msg, cursor=False):
+    """One chat bubble; the text is escaped, whoever wrote it"""
+    text = escape(msg["text"])
+    if msg["role"] == "user":
+        return f'<div class="chat-from you">You</div><div class="chat-msg you">{text}</div>'
+    meta = ""
+    if msg.get("ttft") is not None:
+        meta = f'<div class="chat-meta">first token {msg["ttft"]:.2f}s · total {msg["total"]:.2f}s</div>'
+    return f'<div class="chat-from">LEXIS</div><div class="chat-msg ai">{text}{"▌" if cursor else ""}</div>{meta}'
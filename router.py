@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cancel import Cancelled
+from metrics import registry
+from scheduler import INTERACTIVE
+
+FALLBACK_MODEL    = os.environ.get("LEXIS_FALLBACK_MODEL", "llama-3.3-70b-versatile")
+HEDGE_PERCENTILE  = float(os.environ.get("LEXIS_HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_S   = float(os.environ.get("LEXIS_HEDGE_DEFAULT", "3.0"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW    = 500
+
+
+class LatencyTracker:
+    """Rolling window of per-model completion latencies"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock    = threading.Lock()
+        self._samples = {}
+        self.window   = window
+
+    def add(self, model, seconds):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model, pct, default=None):
+        with self._lock:
+            data = sorted(self._samples.get(model, ()))
+        if len(data) < HEDGE_MIN_SAMPLES:
+            return default
+        idx = min(len(data) - 1, int(round(pct / 100.0 * (len(data) - 1))))
+        return data[idx]
+
+
+class Routed:
+    __slots__ = ("value", "response", "decision")
+
+    def __init__(self, value, response, decision):
+        self.value, self.response, self.decision = value, response, decision
+
+
+class ModelRouter:
+    """Hedged primary calls with a fallback model.
+
+    A duplicate of an interactive request is sent once the first has been
+    outstanding longer than the primary model's ``hedge_pct`` latency; the
+    first success wins. If the primary errors or its output fails ``parse``,
+    the request is retried once on ``fallback``. Every decision is kept in
+    ``decisions`` for diagnostics.
+    """
+
+    def __init__(self, llm, fallback=FALLBACK_MODEL, hedge_pct=HEDGE_PERCENTILE, max_workers=16):
+        self.llm       = llm
+        self.fallback  = fallback
+        self.hedge_pct = hedge_pct
+        self.latency   = LatencyTracker()
+        self.decisions = deque(maxlen=200)
+        self._pool     = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lexis-hedge")
+        self._lock     = threading.Lock()
+        self.stats     = {"requests": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self, model):
+        return self.latency.percentile(model, self.hedge_pct, HEDGE_DEFAULT_S)
+
+    def _timed(self, priority, coalesce, kwargs, token=None):
+        t0 = time.perf_counter()
+        try:
+            r = self.llm.complete(priority, coalesce=coalesce, token=token, **kwargs)
+        except Cancelled:
+            raise
+        except Exception:
+            registry.inc("lexis_llm_requests_total", model=kwargs["model"], outcome="error")
+            raise
+        dt = time.perf_counter() - t0
+        self.latency.add(kwargs["model"], dt)
+        registry.observe("lexis_llm_seconds", dt, model=kwargs["model"])
+        registry.inc("lexis_llm_requests_total", model=kwargs["model"], outcome="ok")
+        return r
+
+    def _parse(self, parse, r):
+        with registry.span("parse"):
+            return parse(r.choices[0].message.content.strip())
+
+    def _hedged(self, priority, kwargs, decision, token=None):
+        first = self._pool.submit(self._timed, priority, True, kwargs, token)
+        futs  = {first: "primary"}
+        # hedging doubles upstream spend, so only latency-sensitive calls get it
+        if priority == INTERACTIVE:
+            done, _ = wait([first], timeout=self.hedge_delay(kwargs["model"]))
+            if not done:
+                # the duplicate must not coalesce onto the slow in-flight call
+                futs[self._pool.submit(self._timed, priority, False, kwargs, token)] = "hedge"
+                decision["hedged"] = True
+                self._count("hedged")
+        error = None
+        while futs:
+            done, _ = wait(list(futs), return_when=FIRST_COMPLETED)
+            for f in done:
+                label = futs.pop(f)
+                if f.exception() is None:
+                    decision["winner"] = label
+                    if label == "hedge":
+                        self._count("hedge_wins")
+                    return f.result()
+                error = f.exception()
+        raise error
+
+    def complete(self, priority=INTERACTIVE, parse=None, token=None, **kwargs):
+        """Returns Routed(value, response, decision); value is ``parse(content)``.
+
+        A set ``token`` raises Cancelled from any wait; it never triggers the fallback.
+        """
+        parse = parse or (lambda text: text)
+        t0 = time.perf_counter()
+        decision = {"model": kwargs["model"], "hedged": False, "winner": None,
+                    "fallback_reason": None, "seconds": None}
+        self._count("requests")
+        try:
+            with registry.span("llm"):
+                r = self._hedged(priority, kwargs, decision, token)
+            value = self._parse(parse, r)
+        except Cancelled:
+            raise
+        except Exception as e:
+            if not self.fallback or self.fallback == kwargs["model"]:
+                raise
+            decision["fallback_reason"] = f"{type(e).__name__}: {str(e)[:120]}"
+            decision["winner"] = "fallback"
+            decision["model"]  = self.fallback
+            self._count("fallbacks")
+            with registry.span("llm"):
+                r = self._timed(priority, True, dict(kwargs, model=self.fallback), token)
+            value = self._parse(parse, r)
+        decision["seconds"] = round(time.perf_counter() - t0, 3)
+        self.decisions.append(decision)
+        registry.inc("lexis_route_total", winner=decision["winner"], hedged=decision["hedged"])
+        return Routed(value, r, decision)
+
+    def stream(self, priority=INTERACTIVE, token=None, **kwargs):
+        """Streams from the primary, switching to the fallback if the stream can't be opened"""
+        decision = {"model": kwargs["model"], "hedged": False, "winner": "primary",
+                    "fallback_reason": None, "seconds": None}
+        self.decisions.append(decision)
+        try:
+            it = self.llm.stream(priority, token=token, **kwargs)
+            first = next(it, None)
+        except Cancelled:
+            raise
+        except Exception as e:
+            if not self.fallback or self.fallback == kwargs["model"]:
+                raise
+            decision.update(model=self.fallback, winner="fallback",
+                            fallback_reason=f"{type(e).__name__}: {str(e)[:120]}")
+            self._count("fallbacks")
+            it = self.llm.stream(priority, token=token, **dict(kwargs, model=self.fallback))
+            first = next(it, None)
+        try:
+            if first is not None:
+                yield first
+            yield from it
+        finally:
+            it.close()
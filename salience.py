@@ -0,0 +1,154 @@
+"""Salience-based input budgeting for single-call extraction.
+
+Instead of sending the first ``TEXT_CHARS`` characters, which on scraped
+pages is often menus and cookie banners, the text is split into sentences,
+repeated lines are dropped, and the remaining sentences are ranked by
+TextRank centrality over their TF-IDF vectors. The best ones are packed
+into the token budget and sent in their original order. Banner lines of
+fetched pages are already gone by then (htmltext.drop_banner_lines);
+nothing here looks at what a sentence says, so pasted text about cookies
+or consent is safe.
+"""
+import os
+import re
+
+import numpy as np
+
+from fetcher import READ_CHARS, TEXT_CHARS
+from localkw import STOPWORDS
+from longdoc import CHARS_PER_TOKEN, estimate_tokens
+from metrics import registry
+
+INPUT_TOKENS  = int(os.environ.get("LEXIS_INPUT_TOKENS", str(TEXT_CHARS // CHARS_PER_TOKEN)))
+MAX_SENTENCES = 800
+# run-on "sentences" (menus, tables flattened to one line) are cut at word boundaries
+MAX_SENT_CHARS = 500
+# repeated non-sentence lines up to this long are page furniture (menus, "Read more")
+REPEAT_LINE_CHARS = 120
+DAMPING       = 0.85
+ITERATIONS    = 50
+# sentences shorter than this many content words score proportionally less
+FULL_WORDS    = 6
+
+_SPLIT   = re.compile(r"(?<=[.!?])\s+(?=\S)|\s*\n\s*")
+_WORD    = re.compile(r"[^\W\d_][\w'-]*")
+
+
+def split_sentences(text):
+    """Sentences and lines of ``text`` in order, long ones cut at word boundaries"""
+    out = []
+    for sent in _SPLIT.split(text):
+        sent = sent.strip()
+        while len(sent) > MAX_SENT_CHARS:
+            cut = sent.rfind(" ", 0, MAX_SENT_CHARS)
+            cut = cut if cut > 0 else MAX_SENT_CHARS
+            out.append(sent[:cut])
+            sent = sent[cut:].strip()
+        if sent:
+            out.append(sent)
+    return out
+
+def drop_boilerplate(sentences):
+    """(kept sentences, number dropped) after removing lines repeated across the page.
+
+    Short repeated lines that are not sentences (menu items, "Read more")
+    go entirely; anything else that repeats keeps its first occurrence.
+    """
+    keys   = [" ".join(s.lower().split()) for s in sentences]
+    counts = {}
+    for k in keys:
+        counts[k] = counts.get(k, 0) + 1
+    kept, seen = [], set()
+    for sent, k in zip(sentences, keys):
+        if k in seen or (counts[k] > 1 and len(k) <= REPEAT_LINE_CHARS and not k.endswith((".", "!", "?"))):
+            continue
+        seen.add(k)
+        kept.append(sent)
+    return kept, len(sentences) - len(kept)
+
+def salience(sentences):
+    """TextRank score per sentence over a TF-IDF cosine similarity graph"""
+    n = len(sentences)
+    docs = [[w for w in _WORD.findall(s.lower()) if w not in STOPWORDS and len(w) > 1] for s in sentences]
+    vocab, rows, cols = {}, [], []
+    for i, words in enumerate(docs):
+        for w in words:
+            rows.append(i)
+            cols.append(vocab.setdefault(w, len(vocab)))
+    if not vocab:
+        return np.zeros(n)
+    tf = np.zeros((n, len(vocab)), dtype=np.float32)
+    np.add.at(tf, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    df = (tf > 0).sum(axis=0)
+    x  = np.log1p(tf) * np.log1p(n / df)[None, :].astype(np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    x  = np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+    sim = x @ x.T
+    np.fill_diagonal(sim, 0.0)
+    out_w = sim.sum(axis=1, keepdims=True)
+    # sentences sharing no words with any other one spread their rank evenly
+    trans = np.divide(sim, out_w, out=np.full_like(sim, 1.0 / n), where=out_w > 0)
+    rank  = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(ITERATIONS):
+        nxt = (1 - DAMPING) / n + DAMPING * (trans.T @ rank)
+        if np.abs(nxt - rank).sum() < 1e-6:
+            rank = nxt
+            break
+        rank = nxt
+    length = np.minimum(1.0, np.array([len(d) for d in docs], dtype=np.float32) / FULL_WORDS)
+    return rank * length
+
+def budget_input(text, max_tokens=INPUT_TOKENS):
+    """(text to send, info) for one extraction call.
+
+    Text that already fits and has no repeated lines comes back unchanged, so
+    calling this again on its own output is a no-op. ``info["saved"]`` is
+    the estimated prompt tokens saved against sending the first TEXT_CHARS
+    characters; ``info["dropped"]`` counts repeated lines removed.
+    """
+    text     = text[:READ_CHARS]
+    baseline = estimate_tokens(text[:TEXT_CHARS])
+    info     = {"sentences": 0, "kept": 0, "dropped": 0, "tokens_in": estimate_tokens(text),
+                "tokens_out": baseline, "saved": 0}
+    sentences = split_sentences(text)
+    kept, dropped = drop_boilerplate(sentences)
+    info["sentences"], info["dropped"] = len(sentences), dropped
+    if not kept:
+        # a page that is nothing but furniture is still better sent than nothing: cut it as before
+        text = text[:TEXT_CHARS]
+        info["kept"], info["dropped"], info["tokens_out"] = len(sentences), 0, baseline
+        return text, info
+    if not dropped and info["tokens_in"] <= max_tokens:
+        info["kept"], info["tokens_out"] = len(sentences), info["tokens_in"]
+        return text, info
+    kept = kept[:MAX_SENTENCES]
+    if estimate_tokens("\n".join(kept)) <= max_tokens:
+        chosen = list(range(len(kept)))
+    else:
+        scores = salience(kept)
+        chosen, room = [], max_tokens
+        for i in np.argsort(-scores, kind="stable"):
+            cost = estimate_tokens(kept[i]) + 1
+            if cost <= room:
+                chosen.append(int(i))
+                room -= cost
+        chosen.sort()
+    packed = "\n".join(kept[i] for i in chosen)
+    info["kept"], info["tokens_out"] = len(chosen), estimate_tokens(packed)
+    info["saved"] = max(0, baseline - info["tokens_out"])
+    registry.inc("lexis_input_tokens", info["tokens_out"], kind="sent")
+    registry.inc("lexis_input_tokens", info["saved"], kind="saved")
+    registry.inc("lexis_input_lines_dropped", dropped)
+    return packed, info
+
+def budget_note(info):
+    """One-line summary of what budgeting did, or None when it changed nothing"""
+    if info["kept"] == info["sentences"] and not info["dropped"]:
+        return None
+    note = (f"✂ Sent {info['kept']}/{info['sentences']} sentences (~{info['tokens_out']:,} of "
+            f"{info['tokens_in']:,} tokens)")
+    if info["dropped"]:
+        note += f" · {info['dropped']} repeated lines dropped"
+    if info["saved"]:
+        note += f" · ~{info['saved']:,} tokens saved"
+    return note + "."
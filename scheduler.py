@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from cancel import Cancelled
+from metrics import registry
+
+INTERACTIVE = 0
+BULK        = 1
+
+MAX_INFLIGHT    = int(os.environ.get("LEXIS_LLM_MAX_INFLIGHT", "8"))
+# slots bulk work may never take, so a chat turn never queues behind a batch
+INTERACTIVE_RESERVE = int(os.environ.get("LEXIS_LLM_INTERACTIVE_RESERVE", "2"))
+MAX_ATTEMPTS    = int(os.environ.get("LEXIS_LLM_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_S  = 0.5
+BACKOFF_CAP_S   = 10.0
+MAX_WAIT_S      = 60.0
+# how often a queued call re-reads a callable priority or checks its cancel token
+PROMOTE_POLL_S  = 0.1
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value):
+    """Groq reset headers look like '2m59.56s', '7.66s' or '120ms'"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, found = 0.0, False
+    for num, unit in _DURATION.findall(value):
+        found = True
+        total += float(num) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if found else None
+
+def _status_of(exc):
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+def _retryable(exc):
+    status = _status_of(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    # connection / timeout errors carry no status
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError") or isinstance(exc, (ConnectionError, TimeoutError))
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    return parse_duration(headers.get("retry-after"))
+
+
+class RateLimitState:
+    """Budget learned from x-ratelimit-* headers; callers wait when it runs dry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.remaining = {"requests": None, "tokens": None}
+        self.reset_at  = {"requests": 0.0, "tokens": 0.0}
+        self.blocked_until = 0.0
+
+    def observe(self, headers):
+        now = time.monotonic()
+        with self._lock:
+            for kind in ("requests", "tokens"):
+                rem   = headers.get(f"x-ratelimit-remaining-{kind}")
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if rem is not None:
+                    try:
+                        self.remaining[kind] = int(float(rem))
+                    except ValueError:
+                        pass
+                if reset is not None:
+                    self.reset_at[kind] = now + reset
+
+    def block_for(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def delay(self, est_tokens):
+        """Seconds to wait before sending; optimistically reserves budget when 0"""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self.blocked_until - now)
+            for kind, need in (("requests", 1), ("tokens", est_tokens)):
+                rem = self.remaining[kind]
+                if rem is None:
+                    continue
+                if now >= self.reset_at[kind]:
+                    self.remaining[kind] = None
+                elif rem < need:
+                    wait = max(wait, self.reset_at[kind] - now)
+                elif wait == 0.0:
+                    self.remaining[kind] = rem - need
+            return min(wait, MAX_WAIT_S)
+
+
+class GroqScheduler:
+    """Wraps a Groq client with admission control, retries and coalescing.
+
+    * priorities: BULK callers may not use the last ``INTERACTIVE_RESERVE``
+      slots and always yield to waiting INTERACTIVE callers
+    * rate limits: remaining request/token budgets from response headers
+      gate new calls until the reported reset
+    * retries: 429 / 5xx / connection errors back off exponentially with full
+      jitter, honouring Retry-After
+    * single-flight: identical concurrent non-streaming requests share one
+      upstream call
+    * cancellation: a caller's CancelToken (``token=``) ends its rate-limit,
+      backoff and queue waits with Cancelled
+    """
+
+    def __init__(self, client, max_inflight=MAX_INFLIGHT):
+        self.client       = client
+        self.max_inflight = max_inflight
+        self.limits       = RateLimitState()
+        self._cond        = threading.Condition()
+        self._inflight    = 0
+        self._waiting     = {INTERACTIVE: 0, BULK: 0}
+        self._flights     = {}
+        self._flights_lock = threading.Lock()
+        self._stats_lock  = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "coalesced": 0, "rate_waits": 0, "errors": 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _sleep(seconds, token):
+        """time.sleep that a set ``token`` cuts short with Cancelled"""
+        if token is None:
+            time.sleep(seconds)
+        elif token.wait(seconds):
+            raise Cancelled()
+
+    # ── admission ──
+    def _can_run(self, priority):
+        if priority == INTERACTIVE:
+            return self._inflight < self.max_inflight
+        return (self._waiting[INTERACTIVE] == 0
+                and self._inflight < max(1, self.max_inflight - INTERACTIVE_RESERVE))
+
+    def _acquire(self, priority, token=None):
+        """Wait for a slot; a callable ``priority`` is re-read while queued, so the call can be promoted"""
+        dynamic = callable(priority)
+        current = priority() if dynamic else priority
+        with self._cond:
+            self._waiting[current] += 1
+            while not self._can_run(current):
+                self._cond.wait(PROMOTE_POLL_S if dynamic or token is not None else None)
+                if token is not None and token.is_set():
+                    self._waiting[current] -= 1
+                    # bulk callers may have been held back by this one
+                    self._cond.notify_all()
+                    raise Cancelled()
+                if dynamic and priority() != current:
+                    self._waiting[current] -= 1
+                    current = priority()
+                    self._waiting[current] += 1
+            self._waiting[current] -= 1
+            self._inflight += 1
+
+    def _release(self):
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    # ── upstream call with retries ──
+    def _call(self, priority, kwargs, hold=False, token=None):
+        """One upstream call with retries; with ``hold`` the slot stays taken on success (caller releases)"""
+        est_tokens = sum(len(m.get("content", "")) for m in kwargs.get("messages", [])) // 4 \
+                     + kwargs.get("max_tokens", 0)
+        for attempt in range(MAX_ATTEMPTS):
+            if token is not None:
+                token.check()
+            wait = self.limits.delay(est_tokens)
+            if wait > 0:
+                self._count("rate_waits")
+                self._sleep(wait, token)
+            self._acquire(priority, token)
+            held = False
+            try:
+                self._count("calls")
+                raw  = self.client.chat.completions.with_raw_response.create(**kwargs)
+                self.limits.observe(raw.headers)
+                result = raw.parse()
+                # counted here, once per upstream call, not per coalesced caller; streams
+                # report usage in their last chunk, which the consumer records
+                if not kwargs.get("stream"):
+                    registry.record_usage(kwargs.get("model"), getattr(result, "usage", None))
+                held = hold
+                return result
+            except Exception as e:
+                if not _retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                    self._count("errors")
+                    raise
+                backoff = random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt))
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    backoff = max(backoff, retry_after)
+                if _status_of(e) == 429:
+                    self.limits.block_for(backoff)
+                self._count("retries")
+            finally:
+                if not held:
+                    self._release()
+            self._sleep(backoff, token)
+
+    @staticmethod
+    def _result(fut, token):
+        """fut.result(), checking ``token`` while the shared call is still running"""
+        while token is not None:
+            try:
+                return fut.result(timeout=PROMOTE_POLL_S)
+            except FutureTimeout:
+                token.check()
+        return fut.result()
+
+    def complete(self, priority=INTERACTIVE, coalesce=True, token=None, **kwargs):
+        """chat.completions.create with scheduling; identical in-flight requests are shared.
+
+        A caller that joined a flight whose leader was cancelled makes the call itself.
+        """
+        if not coalesce:
+            return self._call(priority, kwargs, token=token)
+        key = hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode()).hexdigest()
+        while True:
+            with self._flights_lock:
+                fut = self._flights.get(key)
+                leader = fut is None
+                if leader:
+                    fut = self._flights[key] = Future()
+            if leader:
+                break
+            self._count("coalesced")
+            try:
+                return self._result(fut, token)
+            except Cancelled:
+                if token is not None:
+                    token.check()
+        try:
+            fut.set_result(self._call(priority, kwargs, token=token))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+        return fut.result()
+
+    def stream(self, priority=INTERACTIVE, token=None, **kwargs):
+        """Streaming create; retried only until the stream has been opened.
+
+        ``priority`` may be a zero-argument callable, read again while the
+        call waits for a slot (a speculative reply someone started waiting on).
+        A set ``token`` cancels the waits before the stream opens.
+
+        The in-flight slot is held until the stream is exhausted or closed,
+        since tokens keep arriving (and counting against limits) until then.
+        """
+        kwargs = dict(kwargs, stream=True)
+        response = self._call(priority, kwargs, hold=True, token=token)
+        try:
+            for chunk in response:
+                yield chunk
+        finally:
+            try:
+                # closing the generator early (e.g. a cancelled job) releases the HTTP stream
+                close = getattr(response, "close", None)
+                if close is not None:
+                    close()
+            finally:
+                self._release()
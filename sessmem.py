@@ -0,0 +1,269 @@
+"""Bounded per-session chat memory.
+
+Each session keeps its latest turns in memory up to ``session_bytes``.
+Older turns are appended to a per-session JSONL transcript on disk and
+folded into a rolling summary, which is what follow-up questions get as
+context instead of the whole conversation. Sessions idle for ``idle``
+seconds, or the least recently used ones once ``total_bytes`` is exceeded,
+are written out and dropped from memory until they are touched again;
+sessions a background job has pinned are never dropped.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from kwcache import CACHE_DIR
+
+MEMORY_DIR    = os.path.join(CACHE_DIR, "sessions")
+SESSION_BYTES = int(os.environ.get("LEXIS_SESSION_BYTES", "16384"))
+TOTAL_BYTES   = int(os.environ.get("LEXIS_MEMORY_BYTES", str(64 * 1024 * 1024)))
+IDLE_SECONDS  = int(os.environ.get("LEXIS_SESSION_IDLE", "900"))
+SESSION_TTL   = int(os.environ.get("LEXIS_SESSION_TTL", str(7 * 24 * 3600)))
+SUMMARY_CHARS = 1500
+# the latest question/answer pair always stays in memory
+KEEP_TURNS    = 2
+MSG_OVERHEAD  = 100
+
+
+def msg_bytes(msg):
+    return len(msg["text"].encode("utf-8", errors="ignore")) + MSG_OVERHEAD
+
+
+class ChatMemory:
+    """One session's conversation: recent turns, spilled-but-unsummarized turns and a summary"""
+
+    def __init__(self, sid, directory=MEMORY_DIR, limit=SESSION_BYTES):
+        self.sid      = sid
+        self.path     = os.path.join(directory, f"{sid}.jsonl")
+        self.limit    = limit
+        self.recent   = []
+        self.pending  = []
+        self.summary  = ""
+        self.archived = 0
+        self.version  = 0
+        self.touched  = time.time()
+        # jobs using this object right now; guarded by the manager's lock
+        self.pins     = 0
+        self._lock    = threading.Lock()
+
+    @property
+    def bytes(self):
+        return sum(map(msg_bytes, self.recent)) + sum(map(msg_bytes, self.pending)) + len(self.summary)
+
+    @property
+    def empty(self):
+        return not (self.recent or self.pending or self.summary or self.archived)
+
+    def append(self, msg):
+        with self._lock:
+            self.recent.append(msg)
+            self.version += 1
+            self.touched = time.time()
+            self._spill()
+
+    def _spill(self):
+        if self.bytes <= self.limit:
+            return
+        # spill down to half the budget, leaving the rest for turns awaiting summary
+        spilled, recent_bytes = [], sum(map(msg_bytes, self.recent))
+        while len(self.recent) > KEEP_TURNS and recent_bytes > self.limit // 2:
+            spilled.append(self.recent.pop(0))
+            recent_bytes -= msg_bytes(spilled[-1])
+        self.pending += spilled
+        # pending turns are already on disk; if summarizing keeps failing, let them go
+        while self.pending and self.bytes > self.limit:
+            self.pending.pop(0)
+        if not spilled:
+            return
+        self.archived += len(spilled)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(m) + "\n" for m in spilled)
+        except OSError:
+            pass
+
+    def context(self, summarize=None):
+        """(summary, recent turns) for the LLM, first folding spilled turns into the summary.
+
+        ``summarize(summary, turns)`` returns the updated summary; it is called
+        outside the lock, and on failure the turns stay pending for next time.
+        """
+        with self._lock:
+            pending, summary = list(self.pending), self.summary
+        if pending and summarize is not None:
+            try:
+                summary = summarize(summary, pending)[:SUMMARY_CHARS]
+            except Exception:
+                summary = None
+            if summary:
+                with self._lock:
+                    self.summary = summary
+                    self.pending = [m for m in self.pending if not any(m is p for p in pending)]
+                    self.version += 1
+        with self._lock:
+            self.touched = time.time()
+            return self.summary, list(self.recent)
+
+    def earlier(self, limit=200):
+        """Spilled turns read back from the transcript, oldest first"""
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                lines = fh.readlines()[-limit:]
+        except OSError:
+            return []
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def clear(self):
+        with self._lock:
+            self.recent, self.pending, self.summary, self.archived = [], [], "", 0
+            self.version += 1
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def to_dict(self):
+        with self._lock:
+            return {"recent": list(self.recent), "pending": list(self.pending),
+                    "summary": self.summary, "archived": self.archived}
+
+    def load(self, state):
+        with self._lock:
+            self.recent   = list(state.get("recent", []))
+            self.pending  = list(state.get("pending", []))
+            self.summary  = state.get("summary", "")
+            self.archived = state.get("archived", 0)
+            self._spill()
+
+
+class MemoryManager:
+    """All sessions' ChatMemory objects, within a process-wide byte budget"""
+
+    def __init__(self, directory=MEMORY_DIR, session_bytes=SESSION_BYTES, total_bytes=TOTAL_BYTES,
+                 idle=IDLE_SECONDS):
+        self.directory     = directory
+        self.session_bytes = session_bytes
+        self.total_bytes   = total_bytes
+        self.idle          = idle
+        self._sessions     = OrderedDict()
+        self._lock         = threading.Lock()
+        self.stats         = {"loaded": 0, "evicted_idle": 0, "evicted_lru": 0}
+
+    def get(self, sid, seed=None):
+        """The session's memory, reloaded from disk if it was evicted; ``seed`` restores a new one"""
+        with self._lock:
+            return self._get(sid, seed)
+
+    @contextmanager
+    def pinned(self, sid):
+        """The session's memory, kept in memory (not evicted) until the block exits.
+
+        Work that outlives a script run (a chat job) should resolve the
+        memory by ``sid`` like this instead of holding on to an object that
+        may be evicted, and later reloaded as a different one, meanwhile.
+        """
+        with self._lock:
+            mem = self._get(sid)
+            mem.pins += 1
+        try:
+            yield mem
+        finally:
+            with self._lock:
+                mem.pins -= 1
+
+    def _get(self, sid, seed=None):
+        mem = self._sessions.get(sid)
+        if mem is None:
+            mem = ChatMemory(sid, self.directory, self.session_bytes)
+            state = self._read(sid)
+            if state is not None:
+                self.stats["loaded"] += 1
+            mem.load(state or seed or {})
+            self._sessions[sid] = mem
+        self._sessions.move_to_end(sid)
+        mem.touched = time.time()
+        self._sweep(mem.touched, sid)
+        return mem
+
+    def _sweep(self, now, current):
+        for sid, mem in list(self._sessions.items()):
+            if sid != current and not mem.pins and now - mem.touched > self.idle:
+                self._evict(sid)
+                self.stats["evicted_idle"] += 1
+        total = sum(m.bytes for m in self._sessions.values())
+        # the current session is the most recently used, so it is never evicted; pinned ones are skipped
+        for sid, mem in list(self._sessions.items()):
+            if total <= self.total_bytes:
+                break
+            if sid == current or mem.pins:
+                continue
+            total -= mem.bytes
+            self._evict(sid)
+            self.stats["evicted_lru"] += 1
+
+    def _state_path(self, sid):
+        return os.path.join(self.directory, f"{sid}.json")
+
+    def _read(self, sid):
+        try:
+            with open(self._state_path(sid), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _evict(self, sid):
+        mem  = self._sessions.pop(sid)
+        path = self._state_path(sid)
+        if mem.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as fh:
+                json.dump(mem.to_dict(), fh)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def prune(self, max_age=SESSION_TTL):
+        """Delete transcripts and evicted state not written to for ``max_age`` seconds"""
+        cutoff = time.time() - max_age
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def usage(self):
+        """Per-session and total bytes held in memory"""
+        with self._lock:
+            sessions = {sid[:8]: m.bytes for sid, m in self._sessions.items()}
+        return {"sessions": len(sessions), "bytes": sum(sessions.values()), "per_session": sessions,
+                **self.stats}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_memory():
+    """Process-wide manager shared by every Streamlit session"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = MemoryManager()
+            _manager.prune()
+        return _manager
@@ -0,0 +1,265 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from kwcache import CACHE_DIR
+
+# memory:// (default, per process) · sqlite:///path/state.sqlite3 · redis://host:6379/0
+STATE_URL   = os.environ.get("LEXIS_STATE_URL", "memory://")
+KEY_PREFIX  = os.environ.get("LEXIS_STATE_PREFIX", "lexis:")
+SOCKET_TIMEOUT_S = float(os.environ.get("LEXIS_STATE_TIMEOUT", "2.0"))
+MEMORY_MAX_ITEMS = int(os.environ.get("LEXIS_STATE_MEM_ITEMS", "10000"))
+# SQLite only drops an expired key when it is read, so sweep every this many writes
+SQLITE_PURGE_EVERY = int(os.environ.get("LEXIS_STATE_PURGE_EVERY", "500"))
+
+
+class StateStore:
+    """Key → JSON value store with optional per-key TTL.
+
+    Backends are best-effort: a failing backend reads as a miss and drops
+    writes (counted in ``stats["errors"]``), so the app degrades to
+    recomputing instead of erroring. ``shared`` is True when other processes
+    see the same data.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.stats = {"gets": 0, "hits": 0, "sets": 0, "errors": 0}
+
+    def get(self, key):
+        self.stats["gets"] += 1
+        try:
+            raw = self._get(KEY_PREFIX + key)
+        except (OSError, sqlite3.Error, RespError):
+            self.stats["errors"] += 1
+            return None
+        if raw is None:
+            return None
+        self.stats["hits"] += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.stats["sets"] += 1
+        try:
+            self._set(KEY_PREFIX + key, json.dumps(value, ensure_ascii=False), ttl)
+        except (OSError, sqlite3.Error, RespError):
+            self.stats["errors"] += 1
+
+    def delete(self, key):
+        try:
+            self._delete(KEY_PREFIX + key)
+        except (OSError, sqlite3.Error, RespError):
+            self.stats["errors"] += 1
+
+
+class MemoryStore(StateStore):
+    """Per-process; the oldest writes are dropped past ``max_items``"""
+
+    def __init__(self, max_items=MEMORY_MAX_ITEMS):
+        super().__init__()
+        self.max_items = max_items
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            raw, expires = item
+            if expires is not None and time.time() >= expires:
+                del self._data[key]
+                return None
+            return raw
+
+    def _set(self, key, raw, ttl):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (raw, time.time() + ttl if ttl else None)
+            while len(self._data) > self.max_items:
+                del self._data[next(iter(self._data))]
+
+    def _delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteStore(StateStore):
+    """Shared between processes on the same host or volume"""
+
+    shared = True
+
+    def __init__(self, path, purge_every=SQLITE_PURGE_EVERY):
+        super().__init__()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.purge_every = max(1, purge_every)
+        self.stats["purged"] = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db   = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS state_expires ON state(expires)")
+        self._purge()
+        self._db.commit()
+
+    def _purge(self):
+        cur = self._db.execute("DELETE FROM state WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        self.stats["purged"] += max(cur.rowcount, 0)
+
+    def _get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM state WHERE key=?", (key,)).fetchone()
+            if row and row[1] is not None and time.time() >= row[1]:
+                self._db.execute("DELETE FROM state WHERE key=?", (key,))
+                self._db.commit()
+                return None
+            return row[0] if row else None
+
+    def _set(self, key, raw, ttl):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO state(key,value,expires) VALUES (?,?,?)",
+                             (key, raw, time.time() + ttl if ttl else None))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge()
+            self._db.commit()
+
+    def _delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM state WHERE key=?", (key,))
+            self._db.commit()
+
+
+# ── REDIS (RESP2) ────────────────────────────────────────────────────────────
+class RespError(Exception):
+    """Error reply from a Redis-compatible server"""
+
+
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        a = a if isinstance(a, bytes) else str(a).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(a), a))
+    return b"".join(out)
+
+def read_reply(fh):
+    line = fh.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = fh.read(n + 2)
+        return data[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [read_reply(fh) for _ in range(n)]
+    raise RespError(f"unexpected reply {line[:20]!r}")
+
+
+class RedisStore(StateStore):
+    """Minimal pooled RESP client; works with Redis, Valkey or miniredis.py"""
+
+    shared = True
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, max_idle=8):
+        super().__init__()
+        self.addr, self.db, self.password = (host, port), db, password
+        self.max_idle = max_idle
+        self._idle    = []
+        self._lock    = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection(self.addr, timeout=SOCKET_TIMEOUT_S)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        if self.password:
+            self._roundtrip(conn, "AUTH", self.password)
+        if self.db:
+            self._roundtrip(conn, "SELECT", self.db)
+        return conn
+
+    @staticmethod
+    def _roundtrip(conn, *args):
+        conn[0].sendall(encode_command(*args))
+        return read_reply(conn[1])
+
+    def command(self, *args):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        fresh = conn is None
+        if fresh:
+            conn = self._connect()
+        try:
+            reply = self._roundtrip(conn, *args)
+        except RespError:
+            self._checkin(conn)
+            raise
+        except OSError:
+            conn[0].close()
+            if fresh:
+                raise
+            # a pooled connection may have gone stale; retry once on a new one
+            conn  = self._connect()
+            reply = self._roundtrip(conn, *args)
+        self._checkin(conn)
+        return reply
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn[0].close()
+
+    def _get(self, key):
+        raw = self.command("GET", key)
+        return raw.decode() if raw is not None else None
+
+    def _set(self, key, raw, ttl):
+        if ttl:
+            self.command("SET", key, raw.encode(), "EX", int(ttl))
+        else:
+            self.command("SET", key, raw.encode())
+
+    def _delete(self, key):
+        self.command("DEL", key)
+
+
+def open_store(url):
+    parts = urlsplit(url)
+    if parts.scheme in ("", "memory"):
+        return MemoryStore()
+    if parts.scheme == "sqlite":
+        # sqlite:///relative/path, sqlite:////absolute/path
+        return SQLiteStore(parts.path[1:] or os.path.join(CACHE_DIR, "state.sqlite3"))
+    if parts.scheme == "redis":
+        db = int(parts.path.strip("/") or 0)
+        return RedisStore(parts.hostname or "127.0.0.1", parts.port or 6379, db, parts.password)
+    raise ValueError(f"unsupported LEXIS_STATE_URL scheme {parts.scheme!r}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Process-wide store selected by LEXIS_STATE_URL"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(STATE_URL)
+        return _store
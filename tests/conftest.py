@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# kwcache and everything under CACHE_DIR read this at import; a per-run directory keeps
+# results cached by earlier runs (or by the app) out of the tests
+os.environ["LEXIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="lexis_tests_")
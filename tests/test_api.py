@@ -0,0 +1,51 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api
+
+DOCS = {"documents": [{"label": "a", "keywords": [{"keyword": "solar", "score": 0.9}]},
+                      {"label": "b", "keywords": [{"keyword": "solar", "score": 0.8}]}]}
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), api._Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _call(url, body=None, token=None):
+    req = urllib.request.Request(url, data=None if body is None else json.dumps(body).encode())
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_corpus_routes_are_closed_without_a_token(server, monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", None)
+    assert _call(server + "/v1/corpus/top")[0] == 403
+    assert _call(server + "/v1/corpus/docs?keyword=solar")[0] == 403
+    assert _call(server + "/v1/compare", DOCS)[0] == 403
+    assert _call(server + "/healthz") == (200, {"ok": True})
+    # non-corpus routes stay open, as before
+    assert _call(server + "/v1/explain", {"keywords": "nope"})[0] == 400
+
+
+def test_corpus_routes_need_the_configured_token(server, monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "s3cret")
+    assert _call(server + "/v1/corpus/top")[0] == 401
+    assert _call(server + "/v1/compare", DOCS, token="wrong")[0] == 401
+    assert _call(server + "/v1/corpus/top", token="s3cret")[0] == 200
+    status, result = _call(server + "/v1/compare", DOCS, token="s3cret")
+    assert status == 200 and result["shared"][0]["keyword"] == "solar"
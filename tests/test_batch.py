@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import batch
+from batch import RateLimiter, get_limiter, process_row, prune_results, remove_results, run_batch
+
+
+class _CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(per_minute=6000)
+        self.taken = 0
+
+    def acquire(self, stop=None):
+        self.taken += 1
+        return super().acquire(stop)
+
+
+def test_row_takes_one_token_per_llm_request():
+    limiter = _CountingLimiter()
+    def extract(text, gate):
+        for _ in range(3):
+            gate()
+        return [{"keyword": "x", "score": 1.0}]
+    res = process_row({"id": "1", "kind": "text", "input": "long text"}, None, extract, limiter)
+    assert res["status"] == "ok"
+    assert limiter.taken == 3
+
+
+def test_row_without_llm_requests_takes_no_token():
+    limiter = _CountingLimiter()
+    res = process_row({"id": "1", "kind": "text", "input": "t"}, None, lambda text, gate: [], limiter)
+    assert res["status"] == "ok" and limiter.taken == 0
+
+
+def test_stopped_row_is_cancelled_at_the_gate():
+    limiter = RateLimiter(per_minute=1, burst=1)
+    limiter.tokens = 0
+    stop = threading.Event()
+    stop.set()
+    def extract(text, gate):
+        gate()
+        raise AssertionError("request sent after stop")
+    res = process_row({"id": "1", "kind": "text", "input": "t"}, None, extract, limiter, stop)
+    assert res["status"] == "cancelled"
+
+
+def test_old_result_files_are_pruned(tmp_path):
+    old, new = tmp_path / "lexis_batch_old.jsonl", tmp_path / "lexis_batch_new.jsonl"
+    old.write_text("{}\n")
+    new.write_text("{}\n")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    assert prune_results(max_age=3600, directory=str(tmp_path)) == 1
+    assert not old.exists() and new.exists()
+    remove_results(str(new))
+    remove_results(None)
+    assert not new.exists()
+
+
+def test_batches_share_the_process_wide_limiter(monkeypatch):
+    limiter = _CountingLimiter()
+    monkeypatch.setattr(batch, "_limiter", limiter)
+    assert get_limiter() is limiter
+    def extract(text, gate):
+        gate()
+        return []
+    rows = [{"id": str(i), "kind": "text", "input": "t"} for i in range(4)]
+    for _ in range(2):
+        assert len(list(run_batch(rows, None, extract, workers=2))) == 4
+    assert limiter.taken == 8
@@ -0,0 +1,35 @@
+import urllib.request
+from itertools import combinations
+
+from bench import fixtures, run
+from neardup import NearDupIndex, minhash, similarity
+
+
+def test_text_flow_inputs_are_not_near_duplicates():
+    sigs = [minhash(fixtures.document(run.TEXT, i)) for i in range(24)]
+    assert all(s is not None for s in sigs)
+    index = NearDupIndex(":memory:", threshold=0.85)
+    for i, sig in enumerate(sigs):
+        assert index.lookup(sig, "ns") is None
+        index.add(sig, "ns", [{"keyword": str(i), "score": 1}])
+    assert max(similarity(a, b) for a, b in combinations(sigs, 2)) < 0.5
+
+
+def test_load_numbers_inputs_from_first():
+    seen = []
+    run.load(seen.append, sessions=2, per_session=3, first=6)
+    assert sorted(seen) == list(range(6, 12))
+
+
+def test_fixture_pages_differ_per_n():
+    server, base = fixtures.start()
+    try:
+        pages = {}
+        for path in ("/small?n=1", "/small?n=2", "/small"):
+            with urllib.request.urlopen(base + path) as resp:
+                pages[path] = resp.read()
+                assert int(resp.headers["Content-Length"]) == len(pages[path])
+    finally:
+        server.shutdown()
+    assert b"Report 1." in pages["/small?n=1"] and b"Report 2." in pages["/small?n=2"]
+    assert pages["/small"] == fixtures.PAGES["/small"]
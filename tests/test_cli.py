@@ -0,0 +1,45 @@
+import io
+import json
+import threading
+
+import cli
+
+
+def test_rows_are_emitted_while_input_is_still_being_read():
+    emitted, first = [], threading.Event()
+    def rows():
+        yield {"id": "1", "kind": "text", "input": "first"}
+        # the producer stalls until the first row's result is out
+        assert first.wait(5)
+        yield {"id": "2", "kind": "text", "input": "second"}
+    def emit(res):
+        emitted.append(res["id"])
+        first.set()
+    counts = cli.run_stream(rows(), None, lambda text, gate: [{"keyword": text, "score": 1.0}], emit, workers=2)
+    assert emitted == ["1", "2"]
+    assert counts["ok"] == 2
+
+
+def test_main_reads_jsonl_and_writes_one_result_per_line(monkeypatch):
+    stdin = "\n".join([json.dumps({"id": "a", "text": "solar grid"}), "", "not json", json.dumps("plain text")])
+    out, engines = io.StringIO(), set()
+    def analyze(text, long_mode, engine, priority, gate=None):
+        engines.add(engine)
+        return [{"keyword": text.split()[0], "score": 0.9}], None
+    monkeypatch.setattr(cli, "analyze", analyze)
+    monkeypatch.setattr(cli, "record_result", lambda *a: None)
+    monkeypatch.setattr(cli.sys, "stdin", io.StringIO(stdin))
+    monkeypatch.setattr(cli.sys, "stdout", out)
+    assert cli.main(["--engine", "local", "--workers", "1"]) == 0
+    results = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert set(results) == {"a", "3", "4"}
+    assert results["a"]["keywords"] == [{"keyword": "solar", "score": 0.9}]
+    assert results["3"]["status"] == "error" and results["4"]["keywords"][0]["keyword"] == "plain"
+    assert engines == {"Local only"}
+
+
+def test_main_fails_when_no_row_succeeds(monkeypatch):
+    monkeypatch.setattr(cli, "record_result", lambda *a: None)
+    monkeypatch.setattr(cli.sys, "stdin", io.StringIO("not json\n"))
+    monkeypatch.setattr(cli.sys, "stdout", io.StringIO())
+    assert cli.main([]) == 1
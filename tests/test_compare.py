@@ -0,0 +1,53 @@
+import numpy as np
+
+from compare import Comparison, cluster_order, compare
+
+
+def _doc(label, *kws):
+    return {"label": label, "keywords": [{"keyword": k, "score": s} for k, s in kws]}
+
+
+DOCS = [_doc("solar-1", ("Solar", 0.9), ("inverter", 0.5)),
+        _doc("wind-1", ("wind", 0.9), ("turbine", 0.6)),
+        _doc("solar-2", ("solar", 0.8), ("inverter", 0.6), ("SOLAR ", 0.2)),
+        _doc("wind-2", ("wind", 0.7), ("turbine", 0.7), ("grid", 0.1)),
+        _doc("solar-3", ("solar", 0.7), ("panel", 0.4))]
+
+
+def test_build_matches_keywords_after_normalization():
+    cmp = Comparison.build(DOCS)
+    assert cmp.keywords.count("Solar") == 1 and "SOLAR " not in cmp.keywords
+    j = cmp.keywords.index("Solar")
+    # a repeat within one document keeps its best score
+    assert cmp.scores[2, j] == np.float32(0.8)
+    assert cmp.df[j] == 3
+
+
+def test_similarities_against_hand_computed_values():
+    cmp = Comparison.build(DOCS[:3])
+    cos, jac = cmp.cosine(), cmp.jaccard()
+    expected = (0.9 * 0.8 + 0.5 * 0.6) / (np.hypot(0.9, 0.5) * np.hypot(0.8, 0.6))
+    assert np.isclose(cos[0, 2], expected, atol=1e-6)
+    assert cos[0, 1] == 0 and np.allclose(np.diag(cos), 1)
+    assert jac[0, 2] == 1.0 and jac[0, 1] == 0.0
+
+
+def test_clustered_order_puts_similar_documents_together():
+    order = cluster_order(Comparison.build(DOCS).cosine())
+    assert sorted(order) == list(range(len(DOCS)))
+    labels = [DOCS[i]["label"].split("-")[0] for i in order]
+    # one contiguous block per topic
+    assert labels in (["solar"] * 3 + ["wind"] * 2, ["wind"] * 2 + ["solar"] * 3)
+    assert cluster_order(np.ones((2, 2))) == [0, 1]
+
+
+def test_compare_reports_shared_unique_and_pairs():
+    res = compare(DOCS)
+    assert res["keywords"] == 6
+    assert [s["keyword"] for s in res["shared"]] == ["Solar", "wind", "turbine", "inverter"]
+    assert res["unique"][4] == [{"keyword": "panel", "score": 0.4}]
+    assert res["unique"][0] == []
+    assert [(p["a"], p["b"]) for p in res["pairs"][:2]] == [("solar-1", "solar-2"), ("wind-1", "wind-2")]
+    assert [p["cosine"] for p in res["pairs"]] == sorted((p["cosine"] for p in res["pairs"]), reverse=True)
+    cos = np.array(res["cosine"])
+    assert cos.shape == (5, 5) and np.allclose(cos, cos.T)
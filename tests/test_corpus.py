@@ -0,0 +1,66 @@
+import corpus
+from corpus import Corpus
+
+
+def test_malformed_row_rolls_back_the_whole_document(tmp_path):
+    c = Corpus(str(tmp_path / "corpus.sqlite3"))
+    bad = [{"keyword": "solar", "score": 0.9}, "not a row", {"keyword": "wind", "score": "high"}]
+    assert c.record("text", "doc", bad, "LLM only") is None
+    assert c.stats["errors"] == 1
+    assert c.snapshot()["docs"] == 0
+    assert c.find_term("solar") is None
+    assert c.record("text", "doc", [{"keyword": "solar", "score": 0.9}], "LLM only") is not None
+
+
+def test_module_record_never_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, "_corpus", Corpus(str(tmp_path / "corpus.sqlite3")))
+    monkeypatch.setattr(corpus, "CORPUS_ON", True)
+    assert corpus.record("text", "doc", [None, 3], "LLM only") is None
+    assert corpus.record("text", "doc", "solar", "LLM only") is None
+
+
+def _filled(tmp_path):
+    c = Corpus(str(tmp_path / "corpus.sqlite3"), co_sample=100)
+    day = 20000 * corpus.DAY
+    c.record("text", "doc one", [{"keyword": "Solar Power", "score": 0.9}, {"keyword": "grid", "score": 0.5},
+                                 {"keyword": "solar  power", "score": 0.4}], "LLM only", created=day)
+    c.record("url", "https://a.example/", [{"keyword": "solar power", "score": 0.7},
+                                           {"keyword": "battery storage", "score": 0.6}], "LLM only", created=day)
+    c.record("text", "doc three", [{"keyword": "solar panels", "score": 0.8}, {"keyword": "grid", "score": 0.3}],
+             "Hybrid", created=day + corpus.DAY)
+    return c, day
+
+
+def test_keyword_postings_are_normalized_and_paged_newest_first(tmp_path):
+    c, _ = _filled(tmp_path)
+    first = c.documents_with("SOLAR power", per_page=1)
+    assert first["keyword"] == "Solar Power" and first["total"] == 2
+    assert [i["source"] for i in first["items"]] == ["https://a.example/"]
+    second = c.documents_with("solar power", before=first["next"], per_page=1)
+    assert [i["source"] for i in second["items"]] == ["doc one"] and second["next"] is None
+    # repeated within one result: stored once, at its best score
+    assert second["items"][0]["score"] == 0.9
+    assert c.documents_with("wind")["items"] == []
+
+
+def test_prefix_search_with_and_without_fts(tmp_path):
+    c, _ = _filled(tmp_path)
+    hits = c.search_terms("sol")
+    assert [h["keyword"] for h in hits] == ["Solar Power", "solar panels"]
+    assert hits[0]["docs"] == 2
+    assert [h["keyword"] for h in c.search_terms("solar pan")] == ["solar panels"]
+    c.fts = False
+    assert [h["keyword"] for h in c.search_terms("sol")] == ["Solar Power", "solar panels"]
+    assert c.search_terms("100%") == []
+
+
+def test_trends_and_cooccurrence(tmp_path):
+    c, day = _filled(tmp_path)
+    top = c.top_keywords(days=2, now=day + corpus.DAY)
+    assert [(i["keyword"], i["docs"]) for i in top["items"][:2]] == [("Solar Power", 2), ("grid", 2)]
+    assert [i["keyword"] for i in c.top_keywords(days=1, now=day + corpus.DAY)["items"]] == ["solar panels", "grid"]
+    co = c.cooccurring("grid")
+    assert co["sampled"] == 2
+    assert {i["keyword"]: i["docs"] for i in co["items"]} == {"Solar Power": 1, "solar panels": 1}
+    docs = c.documents([1, 3, 99])
+    assert set(docs) == {1, 3} and docs[3]["keywords"][0] == {"keyword": "solar panels", "score": 0.8}
@@ -0,0 +1,77 @@
+import threading
+import time
+from contextlib import nullcontext
+
+import crawl
+from cancel import CancelToken
+from crawl import crawl as run_crawl
+
+TEXT = "Solar inverters convert the direct current from panels into alternating current. " * 5
+SITE = {
+    "https://a.example/":  (["https://a.example/x", "https://a.example/y"], None),
+    "https://a.example/x": ([], "https://b.example/landing"),
+    # /y redirects to /z, whose page links to itself
+    "https://a.example/y": (["https://a.example/z"], "https://a.example/z"),
+    "https://a.example/z": ([], None),
+}
+
+
+class _OpenPolicy:
+    def allowed(self, url):
+        return True
+
+    def slot(self, url, stop=None):
+        return nullcontext()
+
+
+def _fetch(fetched):
+    def fetch_page(url, stop=None):
+        fetched.append(url)
+        links, final = SITE[url]
+        # distinct text per final page so duplicate detection stays out of the way
+        return TEXT + (final or url), links, final or url
+    return fetch_page
+
+
+def test_off_site_redirect_is_rejected_and_target_not_recrawled():
+    fetched = []
+    results = {r["url"]: r for r in run_crawl("https://a.example/", _fetch(fetched),
+                                             lambda t: [{"keyword": "k", "score": 1}],
+                                             max_pages=10, workers=1, policy=_OpenPolicy())}
+    assert results["https://a.example/x"]["status"] == "rejected"
+    assert results["https://a.example/x"]["keywords"] == []
+    assert results["https://a.example/y"]["status"] == "ok"
+    assert "https://a.example/z" not in fetched
+    assert all("final_url" not in r for r in results.values())
+
+
+def test_crawls_share_one_policy():
+    assert crawl.get_policy() is crawl.get_policy()
+
+
+def test_cancel_cuts_the_crawl_delay_short_and_reports_cancelled():
+    token   = CancelToken()
+    fetched = []
+    policy  = crawl.HostPolicy(per_host=1, delay=30)
+    policy.allowed = lambda url: True
+    # the seed goes through at once; its links then wait out the 30 s delay
+    threading.Timer(0.3, token.set).start()
+    t0 = time.monotonic()
+    results = list(run_crawl("https://a.example/", _fetch(fetched), lambda t: [{"keyword": "k", "score": 1}],
+                             max_pages=10, workers=4, policy=policy, stop=token))
+    assert time.monotonic() - t0 < 5
+    assert results[0]["status"] == "ok"
+    assert [r["status"] for r in results[1:]] == ["cancelled", "cancelled"]
+    assert fetched == ["https://a.example/"]
+
+
+def test_cancel_reaches_the_fetch_in_flight():
+    token, started = CancelToken(), threading.Event()
+    def fetch_page(url, stop=None):
+        started.set()
+        stop.wait(5)
+        stop.check()
+    threading.Thread(target=lambda: (started.wait(5), token.set()), daemon=True).start()
+    results = list(run_crawl("https://a.example/", fetch_page, lambda t: [], max_pages=1, workers=1,
+                             policy=_OpenPolicy(), stop=token))
+    assert [r["status"] for r in results] == ["cancelled"]
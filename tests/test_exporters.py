@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from exporters import KEYWORD_FIELDS, export, keyword_rows
+
+KWS = [{"keyword": "solar inverter", "score": 0.95}, {"keyword": "grid storage", "score": 0.5}]
+
+
+@pytest.fixture
+def exported():
+    paths = []
+    def run(fmt):
+        paths.append(export(keyword_rows(KWS, text=fmt in ("csv", "txt")), fmt, KEYWORD_FIELDS))
+        with open(paths[-1], encoding="utf-8") as fh:
+            return fh.read()
+    yield run
+    for p in paths:
+        os.remove(p)
+
+
+def test_keyword_csv_keeps_its_format(exported):
+    assert exported("csv").splitlines() == [
+        "rank,keyword,score,accuracy_%",
+        "1,solar inverter,0.9500,95.0%",
+        "2,grid storage,0.5000,50.0%",
+    ]
+
+
+def test_keyword_txt_keeps_its_format(exported):
+    assert exported("txt") == ("1. solar inverter  score=0.9500  accuracy=95.0%\n"
+                               "2. grid storage  score=0.5000  accuracy=50.0%")
+
+
+def test_numeric_rows_for_typed_formats():
+    assert list(keyword_rows(KWS))[0] == {"rank": 1, "keyword": "solar inverter", "score": 0.95, "accuracy_%": 95.0}
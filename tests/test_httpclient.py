@@ -0,0 +1,82 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fetcher
+from httpclient import HttpClient, ResponseCache
+
+ETAG = '"v1"'
+PAGE = ("<html><body>" + "".join(f"<p>Paragraph {i} about solar inverters and grid storage.</p>"
+                                 for i in range(3000)) + "</body></html>").encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    paths = []
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def page_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/page"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    c = HttpClient(cache=ResponseCache(str(tmp_path / "http.sqlite3")))
+    monkeypatch.setattr(fetcher, "get_client", lambda: c)
+    return c
+
+
+def test_truncated_body_is_not_replayed_to_a_longer_read(page_url, client):
+    assert len(PAGE) > 150_000
+    short = fetcher.stream_page_text(page_url, max_chars=6000)
+    assert 6000 <= len(short) < 20_000
+    full = fetcher.stream_page_text(page_url, max_chars=240_000)
+    assert len(full) > 150_000
+    assert client.stats["short_prefix"] == 1
+
+
+def test_cached_prefix_still_serves_shorter_reads(page_url, client):
+    fetcher.stream_page_text(page_url, max_chars=20_000)
+    again = fetcher.stream_page_text(page_url, max_chars=6000)
+    assert len(again) >= 6000
+    assert client.stats["not_modified"] == 1
+    assert client.stats["short_prefix"] == 0
+
+
+def test_complete_body_is_replayed_on_304(page_url, client):
+    first = client.get(page_url)
+    assert first.complete and not first.from_cache
+    again = client.get(page_url)
+    assert again.from_cache and again.complete
+    assert again.body == PAGE
+
+
+def test_request_keeps_the_url_as_given_and_caches_under_its_canonical_form(page_url, client):
+    client.get(page_url + "?b=2&utm_source=mail&a=1")
+    assert _Handler.paths[-1] == "/page?b=2&utm_source=mail&a=1"
+    again = client.get(page_url + "?a=1&b=2")
+    assert again.from_cache
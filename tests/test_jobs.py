@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+import jobs
+
+
+def _wait(job, timeout=5):
+    end = time.monotonic() + timeout
+    while job.live and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+def _page(url):
+    return {"url": url, "status": "ok", "keywords": [{"keyword": "grid", "score": 0.8}], "error": "", "seconds": 0.0}
+
+
+def test_crawl_job_streams_pages_and_returns_the_site_ranking(monkeypatch):
+    runner = jobs.JobRunner()
+    monkeypatch.setattr(jobs, "get_runner", lambda: runner)
+    monkeypatch.setattr(jobs, "record_result", lambda *a: None)
+    monkeypatch.setattr(jobs, "crawl", lambda seed, fetch, extract, max_pages, stop=None:
+                        iter([_page(f"{seed}{i}") for i in range(3)]))
+    job = jobs.submit_crawl("https://a.example/", 3, "Local only")
+    _wait(job)
+    assert job.status == "done"
+    assert [r["url"] for r in job.partial] == [f"https://a.example/{i}" for i in range(3)]
+    assert job.result[0]["keyword"] == "grid" and job.result[0]["df"] == 3
+
+
+def test_stopping_a_crawl_job_stops_dispatch(monkeypatch):
+    runner  = jobs.JobRunner()
+    started = threading.Event()
+    def fake_crawl(seed, fetch, extract, max_pages, stop=None):
+        for i in range(max_pages):
+            if stop.is_set():
+                return
+            started.set()
+            yield _page(f"{seed}{i}")
+            time.sleep(0.01)
+    monkeypatch.setattr(jobs, "get_runner", lambda: runner)
+    monkeypatch.setattr(jobs, "record_result", lambda *a: None)
+    monkeypatch.setattr(jobs, "crawl", fake_crawl)
+    job = jobs.submit_crawl("https://a.example/", 1000, "Local only")
+    assert started.wait(5)
+    runner.cancel(job.id)
+    _wait(job)
+    assert job.status == "cancelled"
+    assert len(job.partial) < 1000
+
+
+def test_attaching_to_a_speculative_job_makes_it_interactive():
+    runner  = jobs.JobRunner()
+    release = threading.Event()
+    job = runner.submit("k", "explain", lambda job: release.wait(5), speculative=True)
+    assert job.speculative
+    assert runner.submit("k", "explain", lambda job: None, speculative=True).speculative
+    assert runner.submit("k", "explain", lambda job: None) is job
+    assert not job.speculative
+    release.set()
+
+
+def test_batch_job_writes_rows_and_stops_on_cancel(monkeypatch, tmp_path):
+    runner  = jobs.JobRunner()
+    started = threading.Event()
+    def extract_keywords(text, priority, gate, stop):
+        if text == "slow":
+            started.set()
+            stop.wait(5)
+            stop.check()
+        return [{"keyword": text, "score": 1.0}]
+    monkeypatch.setattr(jobs, "get_runner", lambda: runner)
+    monkeypatch.setattr(jobs, "record_result", lambda *a: None)
+    monkeypatch.setattr(jobs, "extract_keywords", extract_keywords)
+    rows = [{"id": "1", "kind": "text", "input": "fast"}] + \
+           [{"id": str(i), "kind": "text", "input": "slow"} for i in range(2, 50)]
+    path = str(tmp_path / "results.jsonl")
+    job  = jobs.submit_batch(rows, path, workers=2)
+    assert started.wait(5)
+    runner.cancel(job.id)
+    _wait(job)
+    assert job.status == "cancelled"
+    statuses = [json.loads(line)["status"] for line in open(path)]
+    assert statuses.count("ok") == 1 and set(statuses) == {"ok", "cancelled"}
+    assert len(statuses) == len(job.partial) < len(rows)
@@ -0,0 +1,37 @@
+from jsonstream import KeywordStreamParser, parse_keywords_tolerant, valid_rows
+
+RESPONSE = ('Sure! Here are the keywords:\n```json\n[\n  {"keyword": "solar {pv}", "score": 0.91},\n'
+            '  {"keyword": "say \\"grid\\"", "score": 0.8},\n  {keyword: "bare key", score: 0.7,},\n'
+            "  {'keyword': 'single quoted', 'score': 0.6},\n  {\"keyword\": \"broken\" \"score\": 0.5},\n"
+            '  {"keyword": "", "score": 0.4},\n  {"keyword": "clamped", "score": 7}\n]\n```')
+EXPECTED = [{"keyword": "solar {pv}", "score": 0.91}, {"keyword": 'say "grid"', "score": 0.8},
+            {"keyword": "bare key", "score": 0.7}, {"keyword": "single quoted", "score": 0.6},
+            {"keyword": "clamped", "score": 1.0}]
+
+
+def test_whole_response_salvages_every_usable_row():
+    assert parse_keywords_tolerant(RESPONSE) == EXPECTED
+
+
+def test_rows_arrive_as_soon_as_they_close_whatever_the_chunking():
+    for size in (1, 2, 7, 64):
+        p, seen = KeywordStreamParser(), []
+        for i in range(0, len(RESPONSE), size):
+            new = p.feed(RESPONSE[i:i + size])
+            seen.extend(new)
+            # a row is reported by the chunk holding its closing brace, not later
+            assert len(seen) == len(p.rows)
+        assert seen == EXPECTED
+
+
+def test_only_the_unfinished_object_is_buffered():
+    p = KeywordStreamParser()
+    p.feed('[{"keyword": "a", "score": 1}, {"keyword": "b", "sc')
+    assert p.rows == [{"keyword": "a", "score": 1.0}]
+    assert p._buf == '{"keyword": "b", "sc'
+    assert p.feed('ore": 0.5}]') == [{"keyword": "b", "score": 0.5}]
+    assert p._buf == ""
+
+
+def test_valid_rows_cleans_a_parsed_list():
+    assert valid_rows([{"keyword": " x ", "score": "0.5"}, {"score": 1}, "y", None]) == [{"keyword": "x", "score": 0.5}]
@@ -0,0 +1,70 @@
+import kwcache
+from kwcache import KeywordCache, make_key
+
+KWS = [{"keyword": "grid", "score": 0.8}]
+
+
+class _Shared:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+
+def test_key_ignores_case_and_whitespace_but_not_model_or_prompt():
+    key = make_key("Solar  power\n", "m", "v1")
+    assert key == make_key("solar power", "m", "v1")
+    assert key != make_key("solar power", "m2", "v1") and key != make_key("solar power", "m", "v2")
+
+
+def test_memory_tier_falls_back_to_disk_and_promotes(tmp_path):
+    path  = str(tmp_path / "kw.sqlite3")
+    cache = KeywordCache(path, mem_max=2)
+    for k in ("a", "b", "c"):
+        cache.set(k, KWS)
+    assert cache.snapshot()["mem_items"] == 2
+    assert cache.get("a") == KWS and cache.stats["disk_hits"] == 1
+    assert cache.get("a") == KWS and cache.stats["mem_hits"] == 1
+    # a new process starts with an empty memory tier but the same disk
+    fresh = KeywordCache(path)
+    assert fresh.get("c") == KWS
+    assert fresh.stats["disk_hits"] == 1 and fresh.stats["mem_hits"] == 0
+    assert fresh.get("missing") is None and fresh.stats["misses"] == 1
+
+
+def test_disk_tier_drops_least_recently_accessed(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(kwcache.time, "time", lambda: clock[0])
+    cache = KeywordCache(str(tmp_path / "kw.sqlite3"), mem_max=1, disk_max=2)
+    for k in ("a", "b"):
+        clock[0] += 1
+        cache.set(k, KWS)
+    clock[0] += 1
+    cache.get("a")          # read from disk: now more recent than b
+    clock[0] += 1
+    cache.set("c", KWS)
+    assert cache.snapshot()["disk_items"] == 2
+    assert cache.get("b") is None and cache.get("a") == KWS
+
+
+def test_entries_expire_in_both_tiers(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(kwcache.time, "time", lambda: clock[0])
+    cache = KeywordCache(str(tmp_path / "kw.sqlite3"), ttl=60)
+    cache.set("a", KWS)
+    clock[0] += 61
+    assert cache.get("a") is None
+    assert cache.snapshot()["mem_items"] == 0 and cache.snapshot()["disk_items"] == 0
+
+
+def test_shared_tier_is_read_last_and_backfills_locally(tmp_path):
+    shared = _Shared()
+    KeywordCache(str(tmp_path / "one.sqlite3"), shared=shared).set("a", KWS)
+    other = KeywordCache(str(tmp_path / "two.sqlite3"), shared=shared)
+    assert other.get("a") == KWS and other.stats["shared_hits"] == 1
+    shared.data.clear()
+    assert other.get("a") == KWS and other.stats["mem_hits"] == 1
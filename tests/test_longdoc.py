@@ -0,0 +1,24 @@
+import time
+
+from longdoc import map_reduce_keywords
+
+TEXT = "\n\n".join(f"Paragraph {i} " + "about grid storage and inverters. " * 150 for i in range(3))
+
+
+def test_chunks_waiting_to_send_give_up_at_the_deadline():
+    sent = []
+    def extract(chunk, deadline):
+        time.sleep(0.3)             # e.g. waiting for a rate-limit token
+        deadline.check()
+        sent.append(chunk)
+        return [{"keyword": "grid", "score": 1.0}]
+    kws, info = map_reduce_keywords(TEXT, extract, workers=3, budget_s=0.05)
+    assert info["chunks"] == 3 and info["timed_out"] == 3
+    time.sleep(0.5)
+    assert sent == []
+
+
+def test_chunks_within_budget_are_merged():
+    kws, info = map_reduce_keywords(TEXT, lambda chunk, deadline: [{"keyword": "grid", "score": 1.0}])
+    assert info["done"] == info["chunks"] == 3
+    assert kws[0]["keyword"] == "grid"
@@ -0,0 +1,17 @@
+from metrics import Registry
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.inc("lexis_api_requests", route='/v1/a"b\\c\nd')
+    assert 'lexis_api_requests{route="/v1/a\\"b\\\\c\\nd"} 1' in reg.render()
+
+
+def test_histogram_exposition():
+    reg = Registry()
+    reg.observe("lexis_stage_seconds", 0.2, buckets=(0.1, 1.0), stage="fetch")
+    lines = reg.render().splitlines()
+    assert lines[0] == "# TYPE lexis_stage_seconds histogram"
+    assert 'lexis_stage_seconds_bucket{le="0.1",stage="fetch"} 0' in lines
+    assert 'lexis_stage_seconds_bucket{le="+Inf",stage="fetch"} 1' in lines
+    assert 'lexis_stage_seconds_count{stage="fetch"} 1' in lines
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+
+from neardup import NearDupIndex, minhash, similarity
+
+WORDS = ("grid battery solar wind turbine inverter storage demand forecast dispatch frequency market "
+         "carbon price policy transmission utility panel capacity load").split()
+
+
+def _article(seed, n=400):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def test_short_text_is_not_fingerprinted():
+    assert minhash("too short to fingerprint " * 5) is None
+    assert minhash(_article(1)).dtype == np.uint32
+
+
+def test_edited_copy_is_found_and_unrelated_text_is_not(tmp_path):
+    index = NearDupIndex(str(tmp_path / "nd.sqlite3"), threshold=0.85)
+    page  = _article(1)
+    index.add(minhash(page), "ns", [{"keyword": "grid", "score": 1.0}])
+    edited = "Updated 2026-10-18 09:14. " + page + " Share this article. Advertisement: solar deals."
+    hit = index.lookup(minhash(edited), "ns")
+    assert hit is not None and hit[0] == [{"keyword": "grid", "score": 1.0}] and hit[1] >= 0.85
+    assert index.lookup(minhash(_article(2)), "ns") is None
+    # results of another engine/model/prompt are never mixed in
+    assert index.lookup(minhash(edited), "other") is None
+
+
+def test_lsh_only_compares_band_candidates(tmp_path):
+    index = NearDupIndex(str(tmp_path / "nd.sqlite3"))
+    for seed in range(50):
+        index.add(minhash(_article(seed)), "ns", seed)
+    before = index.stats["candidates"]
+    assert index.lookup(minhash(_article(7)), "ns") == (7, 1.0)
+    # unrelated documents almost never share a band with the probe
+    assert index.stats["candidates"] - before <= 3
+
+
+def test_similarity_estimates_jaccard():
+    a, b = _article(3, 2000).split(), _article(4, 2000).split()
+    text_a, text_b = " ".join(a), " ".join(a[:1500] + b[:500])
+    shingles = lambda ws: {" ".join(ws[i:i + 3]) for i in range(len(ws) - 2)}
+    sa, sb = shingles(text_a.split()), shingles(text_b.split())
+    exact = len(sa & sb) / len(sa | sb)
+    assert abs(similarity(minhash(text_a), minhash(text_b)) - exact) < 0.15
+
+
+def test_oldest_entries_are_evicted_and_index_persists(tmp_path):
+    path  = str(tmp_path / "nd.sqlite3")
+    index = NearDupIndex(path, max_items=10)
+    sigs  = [minhash(_article(seed, 60)) for seed in range(1000)]
+    for i, sig in enumerate(sigs):
+        index.add(sig, "ns", i)
+    assert index.stats["evictions"] == 990
+    reopened = NearDupIndex(path)
+    assert reopened.lookup(sigs[0], "ns") is None
+    assert reopened.lookup(sigs[-1], "ns") == (999, 1.0)
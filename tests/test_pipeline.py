@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+
+import pipeline
+import salience
+from metrics import Registry
+from neardup import NearDupIndex
+from scheduler import BULK
+
+
+class _FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, priority, parse=None, messages=(), **kw):
+        self.prompts.append(messages[-1]["content"])
+        return SimpleNamespace(value=[{"keyword": "menu", "score": 0.5}])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = _FakeLLM()
+    monkeypatch.setattr(pipeline, "get_llm", lambda: fake)
+    return fake
+
+
+def test_long_document_of_only_repeated_lines_is_still_analyzed(llm):
+    text = "\n".join(["Home", "Products", "Contact"] * 3000)
+    kws, note, complete, tokens = pipeline._analyze(text, True, "LLM only", pipeline.INTERACTIVE, None, None)
+    assert kws and complete and tokens
+    assert llm.prompts
+    assert note.startswith("Analyzed ")
+
+
+def test_gate_runs_once_per_llm_request(llm, monkeypatch):
+    monkeypatch.setattr(pipeline, "get_index", lambda: SimpleNamespace(lookup=lambda *a: None, add=lambda *a: None))
+    calls = []
+    text  = " ".join(f"Sentence {i} talks about solar inverters, batteries and the grid." for i in range(1500))
+    pipeline.analyze(text, True, "LLM only", BULK, gate=lambda: calls.append(1))
+    assert len(calls) == len(llm.prompts) > 1
+    calls.clear()
+    pipeline.analyze(text, True, "Local only", BULK, gate=lambda: calls.append(1))
+    assert calls == []
+
+
+def test_empty_explanation_is_not_cached(monkeypatch):
+    empty = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=""))])
+    class _Stream:
+        def __iter__(self):
+            return iter([empty])
+        def close(self):
+            pass
+    monkeypatch.setattr(pipeline, "get_llm", lambda: SimpleNamespace(stream=lambda *a, **kw: _Stream()))
+    kws = [{"keyword": "test-empty-explanation", "score": 1.0}]
+    assert "".join(pipeline.explain_keywords_stream(kws)) == ""
+    assert pipeline.get_cache().get(pipeline.explain_cache_key(kws)) is None
+
+
+def test_parse_json_array_drops_malformed_rows():
+    rows = pipeline.parse_json_array('```json\n[{"keyword": " solar ", "score": 1.7}, "x", {"score": 0.4}, '
+                                     '{"keyword": "wind", "score": "n/a"}, {"keyword": "grid"}]\n```')
+    assert rows == [{"keyword": "solar", "score": 1.0}, {"keyword": "wind", "score": 0.0},
+                    {"keyword": "grid", "score": 0.0}]
+    assert pipeline.parse_json_array("[]") == []
+    with pytest.raises(ValueError):
+        pipeline.parse_json_array('[1, 2, {"score": 0.5}]')
+
+
+def test_neardup_reuse_records_metrics_and_original_cost(llm, monkeypatch):
+    index = NearDupIndex(":memory:")
+    monkeypatch.setattr(pipeline, "get_index", lambda: index)
+    monkeypatch.setattr(pipeline, "registry", Registry())
+    monkeypatch.setattr(salience, "registry", pipeline.registry)
+    text = " ".join(f"Paragraph {i} covers heat pumps, district heating and insulation." for i in range(60))
+    kws, _ = pipeline.analyze(text, engine="LLM only", priority=BULK)
+    saved = pipeline.registry.counters.get(("lexis_input_tokens", (("kind", "saved"),)), 0)
+    sent  = pipeline.budget_input(text)[1]["tokens_out"]
+    again, note = pipeline.analyze(text + " Updated today.", engine="LLM only", priority=BULK)
+    assert again == kws and note.startswith("♻")
+    assert len(llm.prompts) == 1
+    counters = pipeline.registry.counters
+    assert counters[("lexis_input_tokens", (("kind", "saved"),))] == saved + sent
+    assert counters[("lexis_neardup_saved_seconds", ())] >= 0
+    hists = {labels: h.count for (name, labels), h in pipeline.registry.hists.items() if name == "lexis_analyze_seconds"}
+    assert hists == {(("engine", "LLM only"), ("source", "llm")): 1, (("engine", "LLM only"), ("source", "neardup")): 1}
+
+
+def test_neardup_reads_entries_without_a_stored_cost(llm, monkeypatch):
+    hit = [{"keyword": "legacy", "score": 1.0}]
+    monkeypatch.setattr(pipeline, "get_index", lambda: SimpleNamespace(lookup=lambda *a: (hit, 0.97), add=None))
+    text = " ".join(f"Paragraph {i} covers heat pumps, district heating and insulation." for i in range(60))
+    assert pipeline.analyze(text, priority=BULK)[0] == hit
+    assert llm.prompts == []
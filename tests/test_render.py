@@ -0,0 +1,17 @@
+from render import render_chat_msg, render_kw_cards
+
+PAYLOAD = '<img src=x onerror="alert(1)">'
+
+
+def test_keyword_cards_escape_keywords():
+    html = render_kw_cards([{"keyword": PAYLOAD, "score": 0.9}, {"keyword": "a & b", "score": 0.4}])
+    assert "<img" not in html
+    assert "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;" in html
+    assert "a &amp; b" in html
+
+
+def test_chat_messages_escape_both_roles():
+    for role in ("user", "ai"):
+        html = render_chat_msg({"role": role, "text": PAYLOAD + "</div><script>x()</script>"}, cursor=True)
+        assert "<img" not in html and "<script>" not in html
+        assert html.count("<div") == html.count("</div>")
@@ -0,0 +1,115 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cancel import CancelToken, Cancelled
+from router import ModelRouter
+from scheduler import BULK, INTERACTIVE
+
+
+def _response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class _FakeScheduler:
+    """Answers with the model name; models in ``failing`` raise, a set token raises Cancelled"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls   = []
+
+    def complete(self, priority, coalesce=True, token=None, **kwargs):
+        self.calls.append(kwargs["model"])
+        if token is not None:
+            token.check()
+        if kwargs["model"] in self.failing:
+            raise RuntimeError("upstream down")
+        return _response(kwargs["model"])
+
+
+def test_cancelled_request_does_not_fall_back():
+    llm, token = _FakeScheduler(), CancelToken()
+    token.set()
+    router = ModelRouter(llm, fallback="backup")
+    with pytest.raises(Cancelled):
+        router.complete(INTERACTIVE, token=token, model="primary", messages=[])
+    assert llm.calls == ["primary"]
+    assert router.stats["fallbacks"] == 0
+
+
+def test_failed_primary_falls_back():
+    router = ModelRouter(_FakeScheduler(failing={"primary"}), fallback="backup")
+    routed = router.complete(INTERACTIVE, model="primary", messages=[])
+    assert routed.value == "backup"
+    assert routed.decision["winner"] == "fallback" and routed.decision["fallback_reason"].startswith("RuntimeError")
+
+
+def test_stats_are_exact_under_concurrency():
+    router  = ModelRouter(_FakeScheduler(failing={"primary"}), fallback="backup")
+    threads = [threading.Thread(target=lambda: [router.complete(INTERACTIVE, model="primary", messages=[])
+                                                for _ in range(50)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert router.stats["requests"] == router.stats["fallbacks"] == 400
+
+
+class _SlowFirstScheduler(_FakeScheduler):
+    """The first call hangs for ``first_s``; later ones answer at once"""
+
+    def __init__(self, first_s):
+        super().__init__()
+        self.first_s   = first_s
+        self.coalesced = []
+
+    def complete(self, priority, coalesce=True, token=None, **kwargs):
+        self.coalesced.append(coalesce)
+        if len(self.calls) == 0:
+            self.calls.append(kwargs["model"])
+            time.sleep(self.first_s)
+            return _response("slow")
+        return super().complete(priority, coalesce, token, **kwargs)
+
+
+def test_slow_interactive_call_is_hedged_and_the_hedge_wins():
+    llm    = _SlowFirstScheduler(first_s=1.0)
+    router = ModelRouter(llm, fallback=None)
+    router.hedge_delay = lambda model: 0.05
+    t0 = time.monotonic()
+    routed = router.complete(INTERACTIVE, model="primary", messages=[])
+    assert time.monotonic() - t0 < 0.5
+    assert routed.value == "primary" and routed.decision["hedged"] and routed.decision["winner"] == "hedge"
+    # the duplicate must not coalesce onto the slow call it is racing
+    assert llm.coalesced == [True, False]
+    assert router.stats["hedged"] == router.stats["hedge_wins"] == 1
+
+
+def test_bulk_calls_are_never_hedged():
+    llm    = _SlowFirstScheduler(first_s=0.2)
+    router = ModelRouter(llm, fallback=None)
+    router.hedge_delay = lambda model: 0.01
+    routed = router.complete(BULK, model="primary", messages=[])
+    assert routed.value == "slow" and not routed.decision["hedged"]
+    assert len(llm.calls) == 1
+
+
+def test_hedge_delay_follows_observed_latency():
+    router = ModelRouter(_FakeScheduler(), hedge_pct=90)
+    assert router.hedge_delay("m") == 3.0     # HEDGE_DEFAULT_S until there are enough samples
+    for i in range(100):
+        router.latency.add("m", i / 100)
+    assert router.hedge_delay("m") == 0.89
+
+
+def test_unparseable_primary_output_falls_back():
+    router = ModelRouter(_FakeScheduler(), fallback="backup")
+    def parse(text):
+        if text != "backup":
+            raise ValueError("not JSON")
+        return text
+    routed = router.complete(INTERACTIVE, parse=parse, model="primary", messages=[])
+    assert routed.value == "backup"
+    assert routed.decision["winner"] == "fallback" and routed.decision["fallback_reason"].startswith("ValueError")
@@ -0,0 +1,41 @@
+from htmltext import drop_banner_lines, html_to_text
+from salience import budget_input
+
+CONTENT = [
+    "Chocolate chip cookies are best baked at 180C for ten to twelve minutes.",
+    "Informed consent is the cornerstone of medical ethics and research practice.",
+    "Third-party cookies let advertisers track users across unrelated sites.",
+]
+
+
+def test_pasted_sentences_about_cookies_and_consent_are_kept():
+    text = "\n".join(CONTENT)
+    packed, info = budget_input(text)
+    assert packed == text
+    assert info["dropped"] == 0
+
+
+def test_long_pasted_text_drops_nothing_before_ranking():
+    filler = [f"Batch {i} of cookies needed {i % 7 + 8} minutes and consent form {i} was signed."
+              for i in range(250)]
+    packed, info = budget_input("\n".join(CONTENT + filler))
+    assert info["dropped"] == 0
+    assert info["sentences"] == len(CONTENT) + len(filler)
+    assert 0 < info["kept"] < info["sentences"]
+
+
+def test_banner_lines_are_dropped_from_fetched_pages():
+    html = ("<html><body><nav>Skip to main content</nav>"
+            "<div>We use cookies to improve your experience. Accept all cookies</div>"
+            "<a>Privacy Policy</a><a>Share on Twitter</a>"
+            + "".join(f"<p>{s}</p>" for s in CONTENT) +
+            "<footer>© 2024 Example Corp. All rights reserved.</footer></body></html>")
+    text = drop_banner_lines(html_to_text(html))
+    assert [line.strip() for line in text.split("\n") if line.strip()] == CONTENT
+
+
+def test_sentences_mentioning_policies_are_not_banner_lines():
+    text = "Read the privacy policy before you sign.\nShare this with your team"
+    assert drop_banner_lines(text).split("\n") == ["Read the privacy policy before you sign."]
+    assert drop_banner_lines("Privacy policy reforms dominated the 2023 session.") == \
+        "Privacy policy reforms dominated the 2023 session."
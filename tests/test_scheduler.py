@@ -0,0 +1,153 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cancel import CancelToken, Cancelled
+from metrics import registry
+from scheduler import BULK, INTERACTIVE, GroqScheduler
+
+
+class _FakeClient:
+    """Just enough of groq.Groq for the scheduler: a slow create with usage in the result"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.chat  = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return SimpleNamespace(headers={}, parse=lambda: SimpleNamespace(usage=usage))
+
+
+def _tokens(model):
+    return registry.counters.get(("lexis_llm_tokens_total", (("kind", "prompt"), ("model", model))), 0)
+
+
+def test_coalesced_callers_record_usage_once():
+    client = _FakeClient()
+    sched  = GroqScheduler(client)
+    model  = "test-coalesce-usage"
+    calls  = [threading.Thread(target=sched.complete, args=(INTERACTIVE,),
+                               kwargs={"model": model, "messages": [{"role": "user", "content": "hi"}]})
+              for _ in range(5)]
+    for t in calls:
+        t.start()
+    for t in calls:
+        t.join()
+    assert client.calls == 1
+    assert _tokens(model) == 100
+
+
+class _FakeStreamClient(_FakeClient):
+    def create(self, **kwargs):
+        self.calls += 1
+        if not kwargs.get("stream"):
+            return super().create(**kwargs)
+        return SimpleNamespace(headers={}, parse=lambda: iter(["a", "b", "c"]))
+
+
+def test_stream_holds_its_slot_until_closed():
+    sched  = GroqScheduler(_FakeStreamClient(delay=0), max_inflight=1)
+    stream = sched.stream(INTERACTIVE, model="test-stream-slot", messages=[])
+    assert next(stream) == "a"
+    done = threading.Event()
+    other = threading.Thread(target=lambda: (sched.complete(INTERACTIVE, model="test-stream-slot", messages=[]),
+                                             done.set()))
+    other.start()
+    assert not done.wait(0.2)
+    stream.close()
+    assert done.wait(2)
+    other.join()
+    assert sched._inflight == 0
+
+
+def test_queued_call_with_callable_priority_is_promoted():
+    sched = GroqScheduler(_FakeStreamClient(delay=0), max_inflight=3)
+    held  = sched.stream(INTERACTIVE, model="test-promote", messages=[])
+    next(held)          # with the default reserve of 2, bulk work may only use 1 of 3 slots
+    level  = {"p": BULK}
+    opened = threading.Event()
+    def speculative():
+        next(sched.stream(lambda: level["p"], model="test-promote", messages=[]))
+        opened.set()
+    threading.Thread(target=speculative, daemon=True).start()
+    assert not opened.wait(0.3)
+    level["p"] = INTERACTIVE
+    assert opened.wait(2)
+    held.close()
+
+
+class _RateLimited(Exception):
+    status_code = 429
+    response    = SimpleNamespace(status_code=429, headers={"retry-after": "30"})
+
+
+class _RateLimitedClient(_FakeClient):
+    def create(self, **kwargs):
+        self.calls += 1
+        raise _RateLimited()
+
+
+def _cancel_soon(token, after=0.2):
+    threading.Timer(after, token.set).start()
+    return time.monotonic()
+
+
+def test_cancel_cuts_backoff_and_rate_limit_waits_short():
+    sched = GroqScheduler(_RateLimitedClient())
+    token = CancelToken()
+    t0 = _cancel_soon(token)
+    with pytest.raises(Cancelled):
+        sched.complete(INTERACTIVE, token=token, model="test-cancel-backoff", messages=[])
+    assert time.monotonic() - t0 < 5
+    assert sched.client.calls == 1
+    # the 429 blocked the limiter for 30 s: a fresh call waits on it, and is cancellable too
+    token = CancelToken()
+    t0 = _cancel_soon(token)
+    with pytest.raises(Cancelled):
+        sched.complete(INTERACTIVE, token=token, model="test-cancel-backoff", messages=[])
+    assert time.monotonic() - t0 < 5
+    assert sched.client.calls == 1 and sched.stats["rate_waits"] == 1
+
+
+def test_cancel_while_queued_for_a_slot():
+    sched = GroqScheduler(_FakeStreamClient(delay=0), max_inflight=1)
+    held  = sched.stream(INTERACTIVE, model="test-cancel-queue", messages=[])
+    next(held)
+    token = CancelToken()
+    _cancel_soon(token)
+    with pytest.raises(Cancelled):
+        sched.complete(INTERACTIVE, token=token, model="test-cancel-queue", messages=[])
+    assert sched._waiting == {INTERACTIVE: 0, BULK: 0}
+    held.close()
+    assert sched._inflight == 0
+
+
+def test_follower_of_a_cancelled_leader_makes_the_call_itself():
+    sched  = GroqScheduler(_FakeClient(delay=0.3))
+    token  = CancelToken()
+    kwargs = {"model": "test-cancel-leader", "messages": []}
+    sched.limits.block_for(0.5)     # the leader waits here when it is cancelled
+    outcome = {}
+    def lead():
+        try:
+            sched.complete(INTERACTIVE, token=token, **kwargs)
+        except Cancelled:
+            outcome["leader"] = "cancelled"
+    def follow():
+        outcome["follower"] = sched.complete(INTERACTIVE, **kwargs)
+    leader, follower = threading.Thread(target=lead), threading.Thread(target=follow)
+    leader.start()
+    time.sleep(0.1)
+    follower.start()
+    time.sleep(0.1)
+    token.set()
+    leader.join()
+    follower.join()
+    assert outcome["leader"] == "cancelled" and outcome["follower"] is not None
+    assert sched.client.calls == 1
@@ -0,0 +1,24 @@
+from sessmem import MemoryManager
+
+
+def test_pinned_session_is_not_evicted(tmp_path):
+    mgr = MemoryManager(directory=str(tmp_path), idle=0)
+    with mgr.pinned("a") as mem:
+        mem.append({"role": "user", "text": "hello"})
+        mgr.get("b")
+        assert mgr.get("a") is mem
+        mgr.get("b")
+        # still the same object a running job would write its summary to
+        assert mgr._sessions.get("a") is mem
+    mgr.get("b")
+    assert "a" not in mgr._sessions
+    assert mgr.get("a").recent == [{"role": "user", "text": "hello"}]
+
+
+def test_lru_eviction_skips_pinned_sessions(tmp_path):
+    mgr = MemoryManager(directory=str(tmp_path), total_bytes=1, idle=3600)
+    with mgr.pinned("old") as mem:
+        mem.append({"role": "user", "text": "x" * 50})
+        mgr.get("new").append({"role": "user", "text": "y" * 50})
+        mgr.get("newest")
+        assert "old" in mgr._sessions and "new" not in mgr._sessions
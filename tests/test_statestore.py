@@ -0,0 +1,30 @@
+import sqlite3
+import time
+
+from statestore import SQLiteStore
+
+
+def _rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM state").fetchone()[0]
+
+
+def test_expired_rows_are_purged_without_being_read(tmp_path):
+    path  = str(tmp_path / "state.sqlite3")
+    store = SQLiteStore(path, purge_every=10)
+    for i in range(9):
+        store.set(f"gone:{i}", i, ttl=0.01)
+    time.sleep(0.05)
+    assert _rows(path) == 9
+    store.set("kept", 1)
+    assert _rows(path) == 1
+    assert store.stats["purged"] == 9
+    assert store.get("kept") == 1
+
+
+def test_expired_rows_are_purged_on_open(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    SQLiteStore(path).set("gone", 1, ttl=0.01)
+    time.sleep(0.05)
+    SQLiteStore(path)
+    assert _rows(path) == 0